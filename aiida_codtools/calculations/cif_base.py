@@ -4,7 +4,7 @@ import copy
 
 from aiida.common import datastructures, exceptions
 from aiida.engine import CalcJob
-from aiida.orm import CifData, Dict
+from aiida.orm import CifData, Dict, SinglefileData
 
 
 class CifBaseCalculation(CalcJob):
@@ -27,6 +27,13 @@ class CifBaseCalculation(CalcJob):
             help='Define the parser to be used by setting its entry point name.')
         spec.input('metadata.options.attach_messages', valid_type=bool, default=False,
             help='When True, warnings and errors written to stderr will be attached as the `messages` output node')
+        spec.input('metadata.options.max_messages', valid_type=int, default=100,
+            help='The maximum number of distinct errors and of distinct warnings that are included in the `messages` '
+                 'output node, keeping the ones that occur most often. The total number of occurrences is always '
+                 'included.')
+        spec.input('metadata.options.attach_messages_file', valid_type=bool, default=False,
+            help='When True, the full content of stderr will be attached as the gzip compressed `messages_file` output '
+                 'node.')
 
         spec.input('cif', valid_type=CifData, required=True,
             help='The CIF to be processed.')
@@ -34,7 +41,11 @@ class CifBaseCalculation(CalcJob):
             help='Command line parameters.')
 
         spec.output('messages', valid_type=Dict, required=False,
-            help='Warning and error messages returned by script.')
+            help='Warning and error messages returned by script. The `errors` and `warnings` contain the distinct '
+                 'messages ordered by decreasing number of occurrences, limited by the `max_messages` option, with '
+                 'their counts in `error_counts` and `warning_counts`. See `CifBaseParser.format_messages`.')
+        spec.output('messages_file', valid_type=SinglefileData, required=False,
+            help='The full content written by the script to stderr, compressed with gzip.')
 
         spec.exit_code(300, 'ERROR_NO_OUTPUT_FILES',
             message='Neither the output for the error file could be read from the retrieved folder.')
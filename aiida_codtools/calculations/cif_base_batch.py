@@ -0,0 +1,91 @@
+# -*- coding: utf-8 -*-
+"""Generic `CalcJob` implementation to run any of the filter-like `cod-tools` scripts on a batch of CIF files."""
+import copy
+import os
+
+from aiida.common import datastructures, exceptions
+from aiida.orm import CifData
+
+from aiida_codtools.calculations.cif_base import CifBaseCalculation
+
+
+class CifBaseBatchCalculation(CifBaseCalculation):
+    """Generic `CalcJob` implementation to run any of the filter-like `cod-tools` scripts on a batch of CIF files.
+
+    Each `CifData` of the `cifs` input namespace is written to its own input file and the script is invoked once for
+    each of those files, serially within a single job. The content written to stdout and stderr for each invocation is
+    redirected to files in the output directory whose names are based on the label of the corresponding input, such
+    that the parser can map each produced CIF back onto the input it originated from.
+    """
+
+    directory_input = 'input'
+    directory_output = 'output'
+
+    _default_parser = 'codtools.cif_base_batch'
+
+    @classmethod
+    def define(cls, spec):
+        # yapf: disable
+        super().define(spec)
+        spec.inputs.pop('cif')
+        spec.input_namespace('cifs', valid_type=CifData, dynamic=True,
+            help='The CIFs to be processed, where the key of each CIF will be used as its label.')
+        spec.output_namespace('cifs', valid_type=CifData, dynamic=True,
+            help='The CIFs produced by the script, with the same label as the corresponding input CIF.')
+        spec.exit_code(411, 'ERROR_PARSING_CIF_DATA_PARTIAL',
+            message='The output files of one or more CIFs are missing or could not be parsed into a CifData object.')
+
+    def prepare_for_submission(self, folder):
+        """This method is called prior to job submission with a set of calculation input nodes.
+
+        The inputs will be validated and sanitized, after which the necessary input files will be written to disk in a
+        temporary folder. A CalcInfo instance will be returned that contains lists of files that need to be copied to
+        the remote machine before job submission, as well as file lists that are to be retrieved after job completion.
+
+        :param folder: an aiida.common.folders.Folder to temporarily write files on disk
+        :returns: CalcInfo instance
+        """
+        from aiida_codtools.cli.utils.parameters import CliParameters
+
+        try:
+            parameters = self.inputs.parameters.get_dict()
+        except AttributeError:
+            parameters = {}
+
+        if not self.inputs.get('cifs', None):
+            raise exceptions.InputValidationError('the `cifs` input namespace should contain at least one CifData.')
+
+        self._validate_resources()
+
+        cli_parameters = copy.deepcopy(self._default_cli_parameters)
+        cli_parameters.update(parameters)
+        cmdline_params = CliParameters.from_dictionary(cli_parameters).get_list()
+
+        folder.get_subfolder(self.directory_input, create=True)
+        folder.get_subfolder(self.directory_output, create=True)
+
+        codes_info = []
+        local_copy_list = []
+
+        for label, cif in sorted(self.inputs.cifs.items()):
+            filename_input = os.path.join(self.directory_input, f'{label}.cif')
+
+            codeinfo = datastructures.CodeInfo()
+            codeinfo.code_uuid = self.inputs.code.uuid
+            codeinfo.cmdline_params = list(cmdline_params)
+            codeinfo.stdin_name = filename_input
+            codeinfo.stdout_name = os.path.join(self.directory_output, f'{label}.out')
+            codeinfo.stderr_name = os.path.join(self.directory_output, f'{label}.err')
+
+            codes_info.append(codeinfo)
+            local_copy_list.append((cif.uuid, cif.filename, filename_input))
+
+        calcinfo = datastructures.CalcInfo()
+        calcinfo.uuid = str(self.uuid)
+        calcinfo.codes_info = codes_info
+        calcinfo.codes_run_mode = datastructures.CodeRunMode.SERIAL
+        calcinfo.retrieve_list = [self.directory_output]
+        calcinfo.local_copy_list = local_copy_list
+        calcinfo.remote_copy_list = []
+
+        return calcinfo
@@ -0,0 +1,78 @@
+# -*- coding: utf-8 -*-
+"""CalcJob plugin that chains the `cif_filter` and `cif_select` scripts of the `cod-tools` package in a single job."""
+import copy
+
+from aiida.common import datastructures, exceptions
+from aiida.orm import CifData, Code, Dict
+
+from aiida_codtools.calculations.cif_base import CifBaseCalculation
+
+
+class CifFilterSelectCalculation(CifBaseCalculation):
+    """CalcJob plugin that chains the `cif_filter` and `cif_select` scripts of the `cod-tools` package in a single job.
+
+    The `code` input should reference the `cif_filter` script, which is run first on the input CIF. Its output is
+    written to an intermediate file in the working directory, which is then fed to the `cif_select` script, referenced
+    by the `select_code` input, whose output is retrieved and parsed as the final CIF. This saves a full round trip
+    through the scheduler and the storage of the intermediate `CifData` compared to running the two separately.
+    """
+
+    filename_filter_output = 'aiida.filter.out'
+    filename_filter_error = 'aiida.filter.err'
+
+    _default_parser = 'codtools.cif_filter_select'
+    _default_select_cli_parameters = {}
+
+    @classmethod
+    def define(cls, spec):
+        # yapf: disable
+        super().define(spec)
+        spec.input('select_code', valid_type=Code,
+            help='The `Code` that references the `cif_select` script, which should be on the same computer as `code`.')
+        spec.input('select_parameters', valid_type=Dict, required=False,
+            help='Command line parameters for the `cif_select` script.')
+        spec.output('cif', valid_type=CifData, help='The CIF produced by the `cif_select` script.')
+
+    def prepare_for_submission(self, folder):
+        """This method is called prior to job submission with a set of calculation input nodes.
+
+        The inputs will be validated and sanitized, after which the necessary input files will be written to disk in a
+        temporary folder. A CalcInfo instance will be returned that contains lists of files that need to be copied to
+        the remote machine before job submission, as well as file lists that are to be retrieved after job completion.
+
+        :param folder: an aiida.common.folders.Folder to temporarily write files on disk
+        :returns: CalcInfo instance
+        """
+        from aiida_codtools.cli.utils.parameters import CliParameters
+
+        try:
+            select_parameters = self.inputs.select_parameters.get_dict()
+        except AttributeError:
+            select_parameters = {}
+
+        if not self.inputs.select_code.can_run_on(self.node.computer):
+            raise exceptions.InputValidationError(
+                f'the `select_code` cannot be run on the computer `{self.node.computer.label}` of the calculation.'
+            )
+
+        calcinfo = super().prepare_for_submission(folder)
+
+        cli_parameters = copy.deepcopy(self._default_select_cli_parameters)
+        cli_parameters.update(select_parameters)
+
+        codeinfo_filter = calcinfo.codes_info[0]
+        codeinfo_filter.stdout_name = self.filename_filter_output
+        codeinfo_filter.stderr_name = self.filename_filter_error
+
+        codeinfo_select = datastructures.CodeInfo()
+        codeinfo_select.code_uuid = self.inputs.select_code.uuid
+        codeinfo_select.cmdline_params = CliParameters.from_dictionary(cli_parameters).get_list()
+        codeinfo_select.stdin_name = self.filename_filter_output
+        codeinfo_select.stdout_name = self.options.output_filename
+        codeinfo_select.stderr_name = self.options.error_filename
+
+        calcinfo.codes_info = [codeinfo_filter, codeinfo_select]
+        calcinfo.codes_run_mode = datastructures.CodeRunMode.SERIAL
+        calcinfo.retrieve_list.append(self.filename_filter_error)
+
+        return calcinfo
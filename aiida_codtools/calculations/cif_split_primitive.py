@@ -18,6 +18,13 @@ class CifSplitPrimitiveCalculation(CifBaseCalculation):
     def define(cls, spec):
         # yapf: disable
         super().define(spec)
+        spec.input('metadata.options.parse_policy', valid_type=str, default='eager', validator=validate_parse_policy,
+            help='The parse policy of the `CifData` output nodes. With `eager` each CIF is parsed by PyCifRW when the '
+                 'node is created to set its `formulae` and `spacegroup_numbers` attributes, with `lazy` the files are '
+                 'stored as is and only parsed when their values are first accessed.')
+        spec.input('metadata.options.parser_workers', valid_type=int, default=1,
+            help='The number of threads used by the parser to parse the outputs listed in stdout. The results are '
+                 'attached in the order in which they are listed, regardless of the number of threads.')
         spec.output_namespace('cifs', valid_type=CifData, help='The CIFs produced by the script.', dynamic=True)
 
     def prepare_for_submission(self, folder):
@@ -30,3 +37,9 @@ class CifSplitPrimitiveCalculation(CifBaseCalculation):
         calcinfo.retrieve_list.append(self._directory_split)
 
         return calcinfo
+
+
+def validate_parse_policy(value, _):
+    """Validate the `parse_policy` option."""
+    if value not in ('eager', 'lazy'):
+        return f'invalid parse policy `{value}`, choose from `eager` or `lazy`.'
@@ -3,18 +3,27 @@
 from aiida.common import exceptions
 from aiida.engine import calcfunction
 from aiida.plugins import WorkflowFactory
-from aiida.tools import get_kpoints_path
-from aiida.tools.data.cif import InvalidOccupationsError
-from seekpath.hpkot import SymmetryDetectionError
+from aiida.orm import StructureData
+from aiida.tools.data.structure import spglib_tuple_to_structure, structure_to_spglib_tuple
+
+from aiida_codtools.common.structure import (
+    EXTRA_PRIMITIVE_STRUCTURE_KEY, get_primitive_structure_key, get_seekpath_results, get_structure_extras,
+    parse_structure
+)
 
 
 @calcfunction
 def primitive_structure_from_cif(cif, parse_engine, symprec, site_tolerance):
     """Attempt to parse the given `CifData` and create a `StructureData` from it.
 
-    First the raw CIF file is parsed with the given `parse_engine`. The resulting `StructureData` is then passed through
-    SeeKpath to try and get the primitive cell. If that is successful, important structural parameters as determined by
-    SeeKpath will be set as extras on the structure node which is then returned as output.
+    First the raw CIF file is parsed with the given `parse_engine` through `parse_structure`. The resulting
+    `StructureData` is then passed through SeeKpath to try and get the primitive cell. If that is successful, important
+    structural parameters as determined by SeeKpath will be set as extras on the structure node which is then returned
+    as output. SeeKpath is called directly on the spglib tuple of the structure instead of through
+    `aiida.tools.get_kpoints_path`, which also creates the conventional structure and a `Dict` with the parameters,
+    which would be discarded immediately. The key returned by `get_primitive_structure_key` for the inputs is stored in
+    the extras as well, such that the structure can be reused for a `CifData` with the same content and the same
+    parsing inputs, without running this function again.
 
     :param cif: the `CifData` node
     :param parse_engine: the parsing engine, supported libraries 'ase' and 'pymatgen'
@@ -25,39 +34,37 @@ def primitive_structure_from_cif(cif, parse_engine, symprec, site_tolerance):
     """
     CifCleanWorkChain = WorkflowFactory('codtools.cif_clean')  # pylint: disable=invalid-name
 
+    result, exit_code = parse_structure(cif.get_content(), parse_engine.value, site_tolerance.value)
+
+    if exit_code is not None:
+        return CifCleanWorkChain.exit_codes[exit_code]
+
     try:
-        structure = cif.get_structure(converter=parse_engine.value, site_tolerance=site_tolerance.value, store=False)
+        if parse_engine.value == 'ase':
+            structure = StructureData(ase=result)
+        else:
+            structure = StructureData(pymatgen_structure=result)
     except exceptions.UnsupportedSpeciesError:
         return CifCleanWorkChain.exit_codes.ERROR_CIF_HAS_UNKNOWN_SPECIES
-    except InvalidOccupationsError:
-        return CifCleanWorkChain.exit_codes.ERROR_CIF_HAS_INVALID_OCCUPANCIES
     except Exception:  # pylint: disable=broad-except
         return CifCleanWorkChain.exit_codes.ERROR_CIF_STRUCTURE_PARSING_FAILED
 
-    try:
-        seekpath_results = get_kpoints_path(structure, symprec=symprec)
-    except ValueError:
-        return CifCleanWorkChain.exit_codes.ERROR_SEEKPATH_INCONSISTENT_SYMMETRY
-    except SymmetryDetectionError:
-        return CifCleanWorkChain.exit_codes.ERROR_SEEKPATH_SYMMETRY_DETECTION_FAILED
+    structure_tuple, kind_info, kinds = structure_to_spglib_tuple(structure)
+    parameters, exit_code = get_seekpath_results(structure_tuple, symprec.value)
+
+    if exit_code is not None:
+        return CifCleanWorkChain.exit_codes[exit_code]
+
+    primitive_tuple = (
+        parameters['primitive_lattice'], parameters['primitive_positions'], parameters['primitive_types']
+    )
+    structure = spglib_tuple_to_structure(primitive_tuple, kind_info, kinds)
 
     # Store important information that should be easily queryable as attributes in the StructureData
-    parameters = seekpath_results['parameters'].get_dict()
-    structure = seekpath_results['primitive_structure']
-
-    # Store the formula as a string, in both hill as well as hill-compact notation, so it can be easily queried for
-    extras = {
-        'formula_hill': structure.get_formula(mode='hill'),
-        'formula_hill_compact': structure.get_formula(mode='hill_compact'),
-        'chemical_system': f"-{'-'.join(sorted(structure.get_symbols_set()))}-",
-    }
-
-    for key in ['spacegroup_international', 'spacegroup_number', 'bravais_lattice', 'bravais_lattice_extended']:
-        try:
-            extras[key] = parameters[key]
-        except KeyError:
-            pass
-
-    structure.set_extra_many(extras)
+    structure.set_extra_many(get_structure_extras(structure, parameters))
+    structure.set_extra(
+        EXTRA_PRIMITIVE_STRUCTURE_KEY,
+        get_primitive_structure_key(cif.get_content(), parse_engine.value, symprec.value, site_tolerance.value)
+    )
 
     return structure
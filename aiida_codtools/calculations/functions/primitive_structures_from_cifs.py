@@ -0,0 +1,112 @@
+# -*- coding: utf-8 -*-
+"""Calculation function to generate primitive structures from many `CifData` in parallel using Seekpath."""
+import concurrent.futures
+import multiprocessing
+
+from aiida.common import exceptions
+from aiida.engine import calcfunction
+from aiida.orm import Dict, StructureData
+from aiida.plugins import WorkflowFactory
+
+from aiida_codtools.common.structure import (
+    EXTRA_PRIMITIVE_STRUCTURE_KEY, get_primitive_structure_key, get_seekpath_results, get_structure_extras,
+    parse_structure
+)
+
+
+@calcfunction
+def primitive_structures_from_cifs(parse_engine, symprec, site_tolerance, max_workers=None, **cifs):
+    """Attempt to parse each of the given `CifData` and create a primitive `StructureData` from it.
+
+    This is the batched equivalent of `primitive_structure_from_cif`. The parsing of the CIF files and the symmetry
+    analysis by SeeKpath, which are CPU bound, are distributed over a pool of worker processes. The creation of the
+    `StructureData` nodes from the results of the workers is done in the calling process. Just like for
+    `primitive_structure_from_cif`, the key returned by `get_primitive_structure_key` is stored in the extras of each
+    structure.
+
+    :param parse_engine: the parsing engine, supported libraries 'ase' and 'pymatgen'
+    :param symprec: a `Float` node with symmetry precision for determining primitive cell in SeeKpath
+    :param site_tolerance: a `Float` node with the fractional coordinate distance tolerance for finding overlapping
+        sites. This will only be used if the parse_engine is pymatgen
+    :param max_workers: an optional `Int` node with the maximum number of worker processes, by default determined by
+        the `ProcessPoolExecutor`, which is the number of processors of the machine
+    :param cifs: the `CifData` nodes, where the keys are used as the labels of the corresponding outputs
+    :return: dictionary with the primitive `StructureData` for each successfully parsed `CifData` in the `structures`
+        namespace and an `exit_statuses` `Dict`, which maps the label of each `CifData` on zero if it was successfully
+        parsed, or on the exit status of the `CifCleanWorkChain` that corresponds to the failure otherwise
+    """
+    from aiida.tools.data.structure import spglib_tuple_to_structure, structure_to_spglib_tuple
+
+    CifCleanWorkChain = WorkflowFactory('codtools.cif_clean')  # pylint: disable=invalid-name
+
+    labels = sorted(cifs.keys())
+    contents = {label: cifs[label].get_content() for label in labels}
+    exit_statuses = {}
+    structures = {}
+    spglib_tuples = {}
+
+    # The `spawn` start method is used because forking the multi-threaded daemon worker can deadlock the children
+    context = multiprocessing.get_context('spawn')
+
+    max_workers = max_workers.value if max_workers is not None else None
+
+    with concurrent.futures.ProcessPoolExecutor(max_workers=max_workers, mp_context=context) as executor:
+
+        results = executor.map(
+            parse_structure, [contents[label] for label in labels], [parse_engine.value] * len(labels),
+            [site_tolerance.value] * len(labels)
+        )
+
+        for label, (result, exit_code) in zip(labels, results):
+
+            if exit_code is not None:
+                exit_statuses[label] = CifCleanWorkChain.exit_codes[exit_code].status
+                continue
+
+            try:
+                if parse_engine.value == 'ase':
+                    structure = StructureData(ase=result)
+                else:
+                    structure = StructureData(pymatgen_structure=result)
+            except exceptions.UnsupportedSpeciesError:
+                exit_statuses[label] = CifCleanWorkChain.exit_codes.ERROR_CIF_HAS_UNKNOWN_SPECIES.status
+                continue
+            except Exception:  # pylint: disable=broad-except
+                exit_statuses[label] = CifCleanWorkChain.exit_codes.ERROR_CIF_STRUCTURE_PARSING_FAILED.status
+                continue
+
+            if structure.pbc != (True, True, True):
+                exit_statuses[label] = CifCleanWorkChain.exit_codes.ERROR_CIF_STRUCTURE_PARSING_FAILED.status
+                continue
+
+            spglib_tuples[label] = structure_to_spglib_tuple(structure)
+
+        labels = sorted(spglib_tuples.keys())
+        results = executor.map(
+            get_seekpath_results, [spglib_tuples[label][0] for label in labels], [symprec.value] * len(labels)
+        )
+
+        for label, (parameters, exit_code) in zip(labels, results):
+
+            if exit_code is not None:
+                exit_statuses[label] = CifCleanWorkChain.exit_codes[exit_code].status
+                continue
+
+            _, kind_info, kinds = spglib_tuples[label]
+            primitive_tuple = (
+                parameters['primitive_lattice'], parameters['primitive_positions'], parameters['primitive_types']
+            )
+            structure = spglib_tuple_to_structure(primitive_tuple, kind_info, kinds)
+            structure.set_extra_many(get_structure_extras(structure, parameters))
+            structure.set_extra(
+                EXTRA_PRIMITIVE_STRUCTURE_KEY,
+                get_primitive_structure_key(contents[label], parse_engine.value, symprec.value, site_tolerance.value)
+            )
+
+            structures[label] = structure
+            exit_statuses[label] = 0
+
+    results = {f'structures__{label}': structure for label, structure in structures.items()}
+    results['exit_statuses'] = Dict(dict=exit_statuses)
+
+    return results
@@ -0,0 +1,110 @@
+# -*- coding: utf-8 -*-
+"""Calculation function to run a `cod-tools` script directly on the local machine, bypassing the scheduler."""
+import io
+
+from aiida.engine import calcfunction
+from aiida.orm import CalcJobNode, Dict
+from aiida.plugins import CalculationFactory, ParserFactory
+from aiida.plugins.entry_point import format_entry_point_string
+
+from aiida_codtools.calculations.cif_base import CifBaseCalculation
+from aiida_codtools.common.executor import run_scripts
+
+PARSER_OPTIONS = ('attach_messages', 'attach_messages_file', 'max_messages')
+
+
+@calcfunction
+def run_cod_tools_script(code, parameters=None, options=None, **cifs):
+    """Run the `cod-tools` script of the given code directly on the local machine for each of the given `CifData`.
+
+    This is meant for scripts that run in a fraction of a second, such as `cif_filter`, `cif_select` and
+    `cif_cell_contents`, for which the overhead of a `CalcJob` (uploading, submitting to the scheduler, polling and
+    retrieving) dominates the total runtime. The scripts are run concurrently in a pool of subprocesses, writing the
+    content of each CIF to stdin and capturing stdout and stderr in memory. Those are then passed to the parser of the
+    calculation plugin of the code, exactly as if they had been retrieved by a `CalcJob`.
+
+    The outputs produced by the parser for each CIF are returned in a namespace with the same label as the input CIF,
+    e.g. `{label}__cif`. If the parser returns an exit code for one of the CIFs, its outputs are omitted and its label
+    is added to the `failed` output, which maps it on the exit status. If it does so for all of the CIFs, the exit code
+    of the first one is returned instead.
+
+    .. note:: the code has to be configured on a computer with a `local` transport and its calculation plugin should
+        use the default `CifBaseCalculation.prepare_for_submission`, so scripts that write additional files, such as
+        `cif_split_primitive`, or need additional input files, such as `cif_cod_deposit`, are not supported.
+
+    :param code: the `Code` of the script, whose input plugin determines the default parameters and the parser
+    :param parameters: optional `Dict` with command line parameters
+    :param options: optional `Dict` with any of the options of `PARSER_OPTIONS` of the calculation plugin, which
+        determine the outputs of the parser and otherwise take their default value
+    :param cifs: the `CifData` nodes to run the script for, where the keys are used as the output namespaces
+    :return: the outputs produced by the parser for each of the input CIFs and, if any of them failed, the `failed`
+        output with the exit status for each of the labels of the CIFs that failed
+    """
+    from aiida_codtools.cli.utils.parameters import CliParameters
+
+    entry_point_name = code.get_input_plugin_name()
+    process_class = CalculationFactory(entry_point_name)
+
+    if code.is_local() or code.computer.transport_type != 'local':
+        raise ValueError(f'code `{code.label}` is not installed on a computer with a `local` transport.')
+
+    if process_class.prepare_for_submission is not CifBaseCalculation.prepare_for_submission:
+        raise ValueError(f'the calculation plugin `{entry_point_name}` is not supported.')
+
+    if 'failed' in cifs:
+        raise ValueError('the label `failed` is reserved for the output with the labels of the failed CIFs.')
+
+    ports = process_class.spec().inputs['metadata']['options']
+    parser_class = ParserFactory(ports['parser_name'].default)
+
+    node_options = {name: ports[name].default for name in PARSER_OPTIONS + ('error_filename',)}
+
+    if options is not None:
+        unsupported = set(options.keys()) - set(PARSER_OPTIONS)
+
+        if unsupported:
+            raise ValueError(f'the options {unsupported} are not supported, choose from {PARSER_OPTIONS}.')
+
+        node_options.update(options.get_dict())
+
+    cli_parameters = dict(process_class._default_cli_parameters)  # pylint: disable=protected-access
+    cli_parameters.update(parameters.get_dict() if parameters is not None else {})
+
+    command = [code.get_execname()] + CliParameters.from_dictionary(cli_parameters).get_list()
+    labels = sorted(cifs.keys())
+    contents = []
+
+    for label in labels:
+        with cifs[label].open(mode='rb') as handle:
+            contents.append(handle.read())
+
+    results = {}
+    exit_codes = {}
+
+    for label, (stdout, stderr) in zip(labels, run_scripts(command, contents)):
+
+        # The parser requires a node of the calculation class to get its exit codes and options from
+        node = CalcJobNode(
+            computer=code.computer, process_type=format_entry_point_string('aiida.calculations', entry_point_name)
+        )
+        for name, value in node_options.items():
+            node.set_option(name, value)
+
+        parser = parser_class(node)
+
+        exit_code = parser.parse_stderr(io.StringIO(stderr)) or parser.parse_stdout(io.BytesIO(stdout))
+
+        if exit_code:
+            exit_codes[label] = exit_code
+            continue
+
+        for link_label, output in parser.outputs.items():
+            results[f'{label}__{link_label}'] = output
+
+    if exit_codes and not results:
+        return next(iter(exit_codes.values()))
+
+    if exit_codes:
+        results['failed'] = Dict(dict={label: exit_code.status for label, exit_code in exit_codes.items()})
+
+    return results
@@ -16,3 +16,4 @@ def cmd_launch():
 
 # Import the sub commands to register them with the CLI
 from .cod_tools import launch_calculation
+from .messages import calculation_messages
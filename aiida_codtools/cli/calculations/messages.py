@@ -0,0 +1,68 @@
+# -*- coding: utf-8 -*-
+"""Command line interface script to find calculations by the type of the messages that the cod-tools script emitted."""
+# yapf: disable
+
+from aiida.cmdline.utils import decorators
+import click
+
+from aiida_codtools.common.messages import MESSAGE_CODES
+
+from . import cmd_calculation
+
+
+@cmd_calculation.command('messages')
+@click.argument('codes', nargs=-1, required=True, type=click.Choice(MESSAGE_CODES, case_sensitive=False))
+@click.option(
+    '-k', '--kind', type=click.Choice(['error', 'warning']), default=None,
+    help='Only consider messages of this kind. By default both errors and warnings are considered.')
+@click.option(
+    '-l', '--limit', type=click.IntRange(min=1), default=None, required=False,
+    help='Maximum number of calculations to list, starting from the most recent one.')
+@click.option(
+    '-c', '--count', is_flag=True, default=False,
+    help='Only print the number of matching calculations.')
+@decorators.with_dbenv()
+def calculation_messages(codes, kind, limit, count):
+    """List the calculations whose `messages` output contains messages with any of the given CODES.
+
+    The messages written to stderr by the cod-tools scripts are classified into the codes of the catalog in
+    `aiida_codtools.common.messages` by the parser, which stores the number of messages per code in the `error_codes`
+    and `warning_codes` attributes of the `messages` output. The calculations are selected with a filter on the keys
+    of those attributes, which does not require matching the text of the individual messages. Example::
+
+        aiida-codtools calculation messages UNRECOGNISED_DATA_NAME SYNTAX_ERROR -k warning
+
+    Note that the `messages` output of batch calculations is nested per input and is therefore not considered.
+    """
+    from aiida import orm
+
+    codes = [code.upper() for code in codes]
+    kinds = [kind] if kind is not None else ['error', 'warning']
+    filters = {'or': [{f'attributes.{kind}_codes': {'has_key': code}} for kind in kinds for code in codes]}
+
+    builder = orm.QueryBuilder()
+    builder.append(orm.ProcessNode, tag='calculation', project=['id', 'attributes.process_label'])
+    builder.append(
+        orm.Dict,
+        with_incoming='calculation',
+        edge_filters={'label': {'like': '%messages'}},
+        filters=filters,
+        project=[f'attributes.{kind}_codes' for kind in kinds]
+    )
+
+    if count:
+        click.echo(builder.count())
+        return
+
+    builder.order_by({'calculation': {'id': 'desc'}})
+
+    if limit is not None:
+        builder.limit(limit)
+
+    click.echo(f"{'Pk':>10} {'Process label':30s} Number of messages per code")
+    click.echo(f"{'-' * 80}")
+
+    for pk, process_label, *counts in builder.iterall():
+        totals = {code: sum((counter or {}).get(code, 0) for counter in counts) for code in codes}
+        summary = ', '.join(f'{code}: {total}' for code, total in totals.items() if total)
+        click.echo(f'{pk:>10} {process_label or "":30s} {summary}')
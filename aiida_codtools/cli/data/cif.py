@@ -8,6 +8,8 @@ import click
 
 from . import cmd_data
 
+EXTRA_IMPORT_CURSOR = 'codtools_cif_import_cursor'
+
 
 @cmd_data.group('cif')
 def cmd_cif():
@@ -21,13 +23,23 @@ def cmd_cif():
     help='Select the database to import from.')
 @click.option(
     '-M', '--max-entries', type=click.INT, default=None, show_default=True, required=False,
-    help='Maximum number of entries to import.')
+    help='Maximum number of entries to import in this invocation, not counting those imported by previous ones.')
 @click.option(
     '-x', '--number-species', type=click.INT, default=None, show_default=True,
     help='Import only cif files with this number of different species.')
 @click.option(
     '-o', '--skip-partial-occupancies', is_flag=True, default=False,
     help='Skip entries that have partial occupancies.')
+@click.option(
+    '-I', '--include-elements', type=click.STRING, multiple=True,
+    help='Skip entries that contain elements other than these. Can be specified multiple times.')
+@click.option(
+    '-E', '--exclude-elements', type=click.STRING, multiple=True,
+    help='Skip entries that contain any of these elements. Can be specified multiple times.')
+@click.option(
+    '-s', '--source', type=click.Path(exists=True, dir_okay=True, file_okay=True), required=False,
+    help='Import the cif files from a local directory tree, or tar or zip archive, mirroring the database, instead of '
+         'querying the database through its importer. The name of each file without extension is used as its id.')
 @click.option(
     '-S', '--importer-server', type=click.STRING, required=False,
     help='Optional server address thats hosts the database.')
@@ -51,26 +63,48 @@ def cmd_cif():
     help='Return the number of entries the query yields and exit.')
 @click.option(
     '-b', '--batch-count', type=click.INT, default=1000, show_default=True,
-    help='Store imported cif nodes in batches of this size. This reduces the number of database operations '
-         'but if the script dies before a checkpoint the imported cif nodes of the current batch are lost.')
+    help='Store imported cif nodes in batches of this size, each in a single database transaction. This reduces the '
+         'number of database operations but if the script dies before a checkpoint the imported cif nodes of the '
+         'current batch are lost.')
+@click.option(
+    '-L', '--lookup-chunk-size', type=click.IntRange(min=1), default=None, required=False,
+    help='Instead of loading the source ids of all cif files in the group in memory upfront, check which entries are '
+         'already present in the group with a database query per chunk of this many entries. Recommended for very '
+         'large groups.')
+@click.option(
+    '-j', '--jobs', type=click.IntRange(min=1), default=1, show_default=True,
+    help='Number of cif files to download concurrently. The order in which entries are processed is not affected.')
+@click.option(
+    '-R', '--resume', is_flag=True, default=False,
+    help='Resume a previous import into the same group with the same query, skipping the query results whose source '
+         'id was processed before the last stored batch.')
 @click.option(
     '-n', '--dry-run', is_flag=True, default=False,
     help='Perform a dry-run.')
 @options.VERBOSE(help='Print entries that are skipped.')
 @decorators.with_dbenv()
-def launch_cif_import(group, database, max_entries, number_species, skip_partial_occupancies, importer_server,
-    importer_db_host, importer_db_name, importer_db_password, importer_api_url, importer_api_key, count_entries,
-    batch_count, dry_run, verbose):
+def launch_cif_import(group, database, max_entries, number_species, skip_partial_occupancies, include_elements,
+    exclude_elements, source, importer_server, importer_db_host, importer_db_name, importer_db_password,
+    importer_api_url, importer_api_key, count_entries, batch_count, lookup_chunk_size, jobs, resume, dry_run, verbose):
     """Import cif files from various structural databases, store them as CifData nodes and add them to a Group.
 
     Note that to determine which cif files are already contained within the Group in order to avoid duplication,
     the attribute 'source.id' of the CifData is compared to the source id of the imported cif entry. Since there
     is no guarantee that these id's do not overlap between different structural databases and we do not check
     explicitly for the database, it is advised to use separate groups for different structural databases.
+
+    Each time a batch is stored, and at the end of the import, a cursor is stored in the extras of the Group with the
+    source ids of all processed query results and the number of results that were stored, already present, skipped or
+    failed. If the import is interrupted, it can be restarted with the `--resume` option, which will skip the query
+    results whose source id was processed, instead of downloading them again only to find they are already present or
+    filtered out, and continue to count from the stored numbers. Since the source ids are stored as a set, this does
+    not depend on the order of the query results, and entries that were added to the database since are not skipped.
+    The integer source ids are stored as ranges of consecutive ids, such that the cursor remains small.
     """
     # pylint: disable=too-many-arguments,too-many-locals,too-many-statements,too-many-branches,import-error
     from datetime import datetime
     import inspect
+    import os
     from urllib.error import HTTPError
 
     from CifFile.StarFile import StarError
@@ -78,6 +112,9 @@ def launch_cif_import(group, database, max_entries, number_species, skip_partial
     from aiida.plugins import factories
 
     from aiida_codtools.cli.utils.display import echo_utc
+    from aiida_codtools.common.cif import has_partial_occupancies, scan_atom_sites
+    from aiida_codtools.common.sources import SourceIdSet, iterate_local_entries
+    from aiida_codtools.common.utils import iter_chunks, map_ordered, store_nodes
 
     if not count_entries and group is None:
         raise click.BadParameter('you have to specify a group unless the option --count-entries is specified')
@@ -104,10 +141,15 @@ def launch_cif_import(group, database, max_entries, number_species, skip_partial
     if importer_api_key is not None:
         importer_parameters['api_key'] = importer_api_key
 
-    importer_class = factories.DbImporterFactory(database)
-    importer = importer_class(**importer_parameters)
+    # Filters that cannot be applied by the query are applied by scanning the raw content of each cif file
+    filter_number_species = False
+
+    if source is not None:
 
-    if database == 'mpds':
+        filter_number_species = number_species is not None
+        query_parameters = {'source': os.path.abspath(source)}
+
+    elif database == 'mpds':
 
         if number_species is None:
             raise click.BadParameter(f'the number of species has to be defined for the {database} database')
@@ -128,10 +170,9 @@ def launch_cif_import(group, database, max_entries, number_species, skip_partial
         elif number_species == 5:
             query_parameters['query']['classes'] = 'quinary'
         else:
-            # Limitation of MPDS: retrieve everything with more than 5 elements and filter on retrieved cifs. Since it
-            # is impossible to quickly determine the number of elements in a raw CIF file without parsing it, we cannot
-            # actually apply the filtering in the import here.
+            # Limitation of MPDS: retrieve everything with more than 5 elements and filter on retrieved cifs.
             query_parameters['query']['classes'] = 'multinary'
+            filter_number_species = True
 
     else:
 
@@ -153,43 +194,125 @@ def launch_cif_import(group, database, max_entries, number_species, skip_partial
         click.echo('-' * 80)
 
     try:
-        query_results = importer.query(**query_parameters)
+        if source is not None:
+            query_results = iterate_local_entries(source, database)
+        else:
+            importer_class = factories.DbImporterFactory(database)
+            importer = importer_class(**importer_parameters)
+            query_results = importer.query(**query_parameters)
     except Exception as exception:  # pylint: disable=broad-except
         echo.echo_critical(f'database query failed: {exception}')
 
-    if not count_entries:
+    if count_entries:
+        # Some query result generators fetch in batches, so we cannot simply return the length of the result set
+        click.echo(f'{sum(1 for _ in query_results)}')
+        return
+
+    cursor = {'database': database, 'query_parameters': query_parameters}
+    counters = {'stored': 0, 'present': 0, 'skipped': 0, 'failed': 0}
+    processed = SourceIdSet()
+
+    if resume:
+        previous = group.get_extra(EXTRA_IMPORT_CURSOR, None)
+
+        if previous is None or 'processed' not in previous or 'counters' not in previous:
+            echo.echo_critical(f'group {group.label} does not contain the cursor of a previous import to resume from')
+
+        if previous['database'] != database or previous['query_parameters'] != query_parameters:
+            echo.echo_critical(f'the cursor of group {group.label} corresponds to a different database or query')
+
+        processed = SourceIdSet(**previous['processed'])
+        counters.update(previous['counters'])
+        echo_utc(f'Resuming after {len(processed)} processed source ids: {counters}')
+        query_results = (entry for entry in query_results if entry.source['id'] not in processed)
+
+    def get_existing_source_ids(source_ids=None):
+        """Return the set of source ids of the cif files in the group, optionally restricted to the given ids."""
+        filters = {'attributes.source.id': {'in': source_ids}} if source_ids is not None else {}
         builder = orm.QueryBuilder()
-        builder.append(orm.Group, filters={'label': group.label}, tag='group')
-        builder.append(orm.CifData, with_group='group', project='attributes.source.id')
-        existing_source_ids = [entry[0] for entry in builder.all()]
+        builder.append(orm.Group, filters={'id': group.pk}, tag='group')
+        builder.append(orm.CifData, with_group='group', filters=filters, project='attributes.source.id')
+        return {source_id for source_id, in builder.iterall()}
+
+    def get_new_entries(entries):
+        """Yield the entries that are not yet present in the group."""
+        if lookup_chunk_size is None:
+            chunks = [(entries, get_existing_source_ids())]
+        else:
+            chunks = (
+                (chunk, get_existing_source_ids([entry.source['id'] for entry in chunk]))
+                for chunk in iter_chunks(entries, lookup_chunk_size)
+            )
+
+        for chunk, existing_source_ids in chunks:
+            for entry in chunk:
+                source_id = entry.source['id']
+
+                if source_id in existing_source_ids:
+                    if verbose:
+                        echo_utc(f'Cif<{source_id}> skipping: already present in group {group.label}')
+                    processed.add(source_id)
+                    counters['present'] += 1
+                    continue
+
+                yield entry
+
+    scan_content = skip_partial_occupancies or filter_number_species or include_elements or exclude_elements
+
+    def fetch_cif(entry):
+        """Download the content of the cif file of the entry, which will be cached on the entry, and scan it."""
+        return scan_atom_sites(entry.cif) if scan_content else entry.cif
+
+    def get_skip_reason(atom_sites):
+        """Return the reason to skip an entry based on the scanned atom sites of its cif file, or None."""
+        elements = atom_sites['elements']
+
+        if skip_partial_occupancies and has_partial_occupancies(atom_sites['occupancies']):
+            return 'contains partial occupancies'
+
+        if filter_number_species and len(elements) != number_species:
+            return f'contains {len(elements)} instead of {number_species} species'
+
+        if include_elements and not elements.issubset(include_elements):
+            return f'contains elements that are not included: {sorted(elements.difference(include_elements))}'
+
+        if exclude_elements and elements.intersection(exclude_elements):
+            return f'contains excluded elements: {sorted(elements.intersection(exclude_elements))}'
+
+        return None
+
+    def store_batch(batch):
+        """Store the batch of nodes, add them to the group and save the processed source ids and the counters."""
+        if batch:
+            echo_utc(f'Storing batch of {len(batch)} CifData nodes')
+            store_nodes(batch, group)
+
+        cursor['processed'] = processed.get_dict()
+        cursor['counters'] = counters
+        group.set_extra(EXTRA_IMPORT_CURSOR, cursor)
 
     counter = 0
     batch = []
 
-    for entry in query_results:
-
-        # Some query result generators fetch in batches, so we cannot simply return the length of the result set
-        if count_entries:
-            counter += 1
-            continue
+    for entry, future in map_ordered(fetch_cif, get_new_entries(query_results), max_workers=jobs):
 
         source_id = entry.source['id']
-
-        if source_id in existing_source_ids:
-            if verbose:
-                echo_utc(f'Cif<{source_id}> skipping: already present in group {group.label}')
-            continue
+        processed.add(source_id)
 
         try:
-            cif = entry.get_cif_node()
+            result = future.result()
+            skip_reason = get_skip_reason(result) if scan_content else None
+            cif = entry.get_cif_node() if skip_reason is None else None
         except (AttributeError, UnicodeDecodeError, StarError, HTTPError) as exception:
             if verbose:
                 name = exception.__class__.__name__
                 echo_utc(f'Cif<{source_id}> skipping: encountered an error retrieving cif data: {name}')
+            counters['failed'] += 1
         else:
-            if skip_partial_occupancies and cif.has_partial_occupancies:
+            if skip_reason is not None:
                 if verbose:
-                    echo_utc(f'Cif<{source_id}> skipping: contains partial occupancies')
+                    echo_utc(f'Cif<{source_id}> skipping: {skip_reason}')
+                counters['skipped'] += 1
             else:
                 if not dry_run:
                     batch.append(cif)
@@ -198,27 +321,21 @@ def launch_cif_import(group, database, max_entries, number_species, skip_partial
                     template = 'Cif<{}> would have added: CifData<{}> to group {}'
 
                 echo_utc(template.format(source_id, cif.uuid, group.label))
+                counters['stored'] += 1
                 counter += 1
 
-        if not dry_run and counter % batch_count == 0:
-            echo_utc(f'Storing batch of {len(batch)} CifData nodes')
-            nodes = [node.store() for node in batch]
-            group.add_nodes(nodes)
+        if not dry_run and len(batch) >= batch_count:
+            store_batch(batch)
             batch = []
 
         if max_entries is not None and counter >= max_entries:
             break
 
-    if count_entries:
-        click.echo(f'{counter}')
-        return
-
-    if not dry_run and batch:
-        echo_utc(f'Storing batch of {len(batch)} CifData nodes')
-        nodes = [node.store() for node in batch]
-        group.add_nodes(nodes)
+    if not dry_run:
+        store_batch(batch)
 
     click.echo('-' * 80)
     click.echo(f'Stored {counter} new entries')
+    click.echo(f'Totals of the import: {counters}')
     click.echo(f'Stopping on {datetime.utcnow().isoformat()}')
     click.echo('=' * 80)
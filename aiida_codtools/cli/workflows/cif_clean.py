@@ -36,36 +36,96 @@ from . import cmd_launch
 @click.option(
     '-f', '--skip-check', is_flag=True, default=False,
     help='Skip the check whether the CifData node is an input to an already submitted workchain.')
+@click.option(
+    '-b', '--query-batch-size', type=click.IntRange(min=1), default=1000, show_default=True,
+    help='Number of CifData nodes of the raw group that are retrieved from the database per query.')
 @click.option(
     '-p', '--parse-engine', type=click.Choice(['ase', 'pymatgen']), default='pymatgen', show_default=True,
     help='Select the parse engine for parsing the structure from the cleaned cif if requested.')
+@click.option(
+    '-P', '--pipeline', is_flag=True, default=False,
+    help='Chain the cif_filter and cif_select scripts in a single calculation job instead of running them separately.')
+@click.option(
+    '-x', '--precheck', is_flag=True, default=False,
+    help='Scan the raw CifData before cleaning and exit early if the parsing of the structure is certain to fail.')
+@click.option(
+    '-D', '--deduplicate', is_flag=True, default=False,
+    help='Reuse the outputs of a previous successful workchain for a CifData with identical content and inputs.')
+@click.option(
+    '-K', '--cache-structures', is_flag=True, default=False,
+    help='Reuse the primitive structure previously parsed from a cleaned CifData with identical content and inputs.')
+@click.option(
+    '-B', '--bulk-chunk-size', type=click.INT, default=None, required=False,
+    help='Launch a single CifCleanBulkWorkChain for all nodes of the raw group, cleaning them in batches of this size.')
+@click.option(
+    '-W', '--max-workers', type=click.IntRange(min=1), default=None, required=False,
+    help='Maximum number of worker processes used to parse the structures of each chunk with --bulk-chunk-size, by '
+         'default the number of processors of the machine that runs the daemon worker.')
 @click.option(
     '-d', '--daemon', is_flag=True, default=False, show_default=True,
     help='Submit the process to the daemon instead of running it locally.')
+@click.option(
+    '-C', '--max-concurrent', type=click.IntRange(min=1), default=None, required=False,
+    help='Only submit a new workchain when fewer than this number of workchains submitted by this command are still '
+         'active, waiting as long as necessary. Requires the --daemon option.')
+@click.option(
+    '-I', '--poll-interval', type=click.IntRange(min=1), default=30, show_default=True,
+    help='Number of seconds between checks of the number of active workchains when --max-concurrent is used.')
 @decorators.with_dbenv()
 def launch_cif_clean(cif_filter, cif_select, group_cif_raw, group_cif_clean, group_structure, group_workchain, node,
-    max_entries, skip_check, parse_engine, daemon):
+    max_entries, skip_check, query_batch_size, parse_engine, pipeline, precheck, deduplicate, cache_structures,
+    bulk_chunk_size, max_workers, daemon, max_concurrent, poll_interval):
     """Run the `CifCleanWorkChain` on the entries in a group with raw imported CifData nodes.
 
     It will use the `cif_filter` and `cif_select` scripts of `cod-tools` to clean the input cif file. Additionally, if
     the `group-structure` option is passed, the workchain will also attempt to use the given parse engine to parse the
     cleaned `CifData` to obtain the structure and then use SeeKpath to find the primitive structure, which, if
     successful, will be added to the `group-structure` group.
+
+    With the `bulk-chunk-size` option, a single `CifCleanBulkWorkChain` is launched for the `group-cif-raw` group, which
+    queries the nodes of the group itself, such that all of them are cleaned and the `max-entries`, `skip-check` and
+    `max-concurrent` options do not apply.
+
+    With the `max-concurrent` option, the command acts as a long-running submission controller, which keeps at most
+    the given number of workchains active at any time, submitting a new one as soon as another one has terminated.
     """
     # pylint: disable=too-many-arguments,too-many-locals,too-many-statements,too-many-branches
     from datetime import datetime
     import inspect
+    import itertools
+    import time
 
     from aiida import orm
     from aiida.engine import launch
-    from aiida.plugins import DataFactory, WorkflowFactory
+    from aiida.plugins import WorkflowFactory
 
     from aiida_codtools.cli.utils.display import echo_utc
     from aiida_codtools.common.resources import get_default_options
-    from aiida_codtools.common.utils import get_input_node
+    from aiida_codtools.common.utils import get_active_process_pks, get_input_node, iterate_unprocessed_nodes
 
-    CifData = DataFactory('cif')  # pylint: disable=invalid-name
     CifCleanWorkChain = WorkflowFactory('codtools.cif_clean')  # pylint: disable=invalid-name
+    CifCleanBulkWorkChain = WorkflowFactory('codtools.cif_clean_bulk')  # pylint: disable=invalid-name
+
+    if pipeline and bulk_chunk_size is not None:
+        raise click.BadOptionUsage('pipeline', 'cannot use the `--pipeline` and `--bulk-chunk-size` options together')
+
+    if precheck and bulk_chunk_size is not None:
+        raise click.BadOptionUsage('precheck', 'the `--precheck` option cannot be used with `--bulk-chunk-size`')
+
+    if deduplicate and bulk_chunk_size is not None:
+        raise click.BadOptionUsage('deduplicate', 'the `--deduplicate` option cannot be used with `--bulk-chunk-size`')
+
+    if max_concurrent is not None and bulk_chunk_size is not None:
+        raise click.BadOptionUsage('max_concurrent', 'cannot use `--max-concurrent` together with `--bulk-chunk-size`')
+
+    if max_entries is not None and bulk_chunk_size is not None:
+        raise click.BadOptionUsage('max_entries', 'the `--max-entries` option cannot be used with `--bulk-chunk-size`')
+
+    if max_workers is not None and bulk_chunk_size is None:
+        raise click.BadOptionUsage('max_workers', 'the `--max-workers` option requires the `--bulk-chunk-size` option')
+
+    if max_concurrent is not None and not daemon:
+        raise click.BadOptionUsage('max_concurrent', 'the `--max-concurrent` option requires the `--daemon` option')
 
     # Collect the dictionary of not None parameters passed to the launch script and print to screen
     local_vars = locals()
@@ -79,38 +139,24 @@ def launch_cif_clean(cif_filter, cif_select, group_cif_raw, group_cif_clean, gro
     click.echo(f'Launch parameters: {launch_paramaters}')
     click.echo('-' * 80)
 
-    if group_cif_raw is not None:
-
-        # Get CifData nodes that should actually be submitted according to the input filters
-        builder = orm.QueryBuilder()
-        builder.append(orm.Group, filters={'id': {'==': group_cif_raw.pk}}, tag='group')
+    if group_cif_raw is not None and bulk_chunk_size is not None:
 
-        if skip_check:
-            builder.append(CifData, with_group='group', project=['*'])
-        else:
-            # Get CifData nodes that already have an associated workchain node in the `group_workchain` group.
-            submitted = orm.QueryBuilder()
-            submitted.append(orm.WorkChainNode, tag='workchain')
-            submitted.append(orm.Group, filters={'id': {'==': group_workchain.pk}}, with_node='workchain')
-            submitted.append(orm.CifData, with_outgoing='workchain', tag='data', project=['id'])
-            submitted_nodes = set(pk for entry in submitted.all() for pk in entry)
-
-            if submitted_nodes:
-                filters = {'id': {'!in': submitted_nodes}}
-            else:
-                filters = {}
+        # The bulk workchain queries the nodes of the group itself, instead of receiving them all as explicit inputs
+        pks = None
 
-            # Get all CifData nodes that are not included in the submitted node list
-            builder.append(CifData, with_group='group', filters=filters, project=['*'])
+    elif group_cif_raw is not None:
 
-        if max_entries is not None:
-            builder.limit(int(max_entries))
+        if not skip_check and group_workchain is None:
+            raise click.BadParameter('the --group-workchain has to be specified unless --skip-check is used')
 
-        nodes = [entry[0] for entry in builder.all()]
+        # Stream the pks of the CifData nodes that are not yet an input of a workchain in the `group_workchain` group.
+        # The nodes themselves are only loaded right before they are submitted, to keep the memory usage constant.
+        pks = iterate_unprocessed_nodes(group_cif_raw, None if skip_check else group_workchain, query_batch_size)
+        pks = itertools.islice(pks, max_entries)
 
     elif node is not None:
 
-        nodes = [node]
+        pks = [node.pk]
 
     else:
         raise click.BadParameter('you have to specify either --group-cif-raw or --node')
@@ -134,11 +180,15 @@ def launch_cif_clean(cif_filter, cif_select, group_cif_raw, group_cif_clean, gro
     node_parse_engine = get_input_node(orm.Str, parse_engine)
     node_site_tolerance = get_input_node(orm.Float, 5E-4)
     node_symprec = get_input_node(orm.Float, 5E-3)
+    node_pipeline = get_input_node(orm.Bool, pipeline)
+    node_precheck = get_input_node(orm.Bool, precheck)
+    node_deduplicate = get_input_node(orm.Bool, deduplicate)
+    node_cache_structures = get_input_node(orm.Bool, cache_structures)
 
-    for cif in nodes:
+    if bulk_chunk_size is not None:
 
         inputs = {
-            'cif': cif,
+            'chunk_size': orm.Int(bulk_chunk_size),
             'cif_filter': {
                 'code': cif_filter,
                 'parameters': node_cif_filter_parameters,
@@ -156,8 +206,19 @@ def launch_cif_clean(cif_filter, cif_select, group_cif_raw, group_cif_clean, gro
             'parse_engine': node_parse_engine,
             'site_tolerance': node_site_tolerance,
             'symprec': node_symprec,
+            'cache_structure': node_cache_structures,
         }
 
+        if max_workers is not None:
+            inputs['max_workers'] = orm.Int(max_workers)
+
+        if pks is None:
+            inputs['group'] = group_cif_raw
+            label = f'Group<{group_cif_raw.label}>'
+        else:
+            inputs['cifs'] = {f'cif_{pk}': orm.load_node(pk) for pk in pks}
+            label = f'{len(pks)} CifData'
+
         if group_cif_clean is not None:
             inputs['group_cif'] = group_cif_clean
 
@@ -165,19 +226,77 @@ def launch_cif_clean(cif_filter, cif_select, group_cif_raw, group_cif_clean, gro
             inputs['group_structure'] = group_structure
 
         if daemon:
-            workchain = launch.submit(CifCleanWorkChain, **inputs)
-            echo_utc(f'CifData<{cif.pk}> submitting: {CifCleanWorkChain.__name__}<{workchain.pk}>')
+            workchain = launch.submit(CifCleanBulkWorkChain, **inputs)
+            echo_utc(f'{label} submitting: {CifCleanBulkWorkChain.__name__}<{workchain.pk}>')
         else:
-            echo_utc(f'CifData<{cif.pk}> running: {CifCleanWorkChain.__name__}')
-            _, workchain = launch.run_get_node(CifCleanWorkChain, **inputs)
+            echo_utc(f'{label} running: {CifCleanBulkWorkChain.__name__}')
+            _, workchain = launch.run_get_node(CifCleanBulkWorkChain, **inputs)
 
         if group_workchain is not None:
             group_workchain.add_nodes([workchain])
 
-        counter += 1
+        counter = 1
+
+    else:
+
+        active = set()
+
+        for pk in pks:
+
+            if max_concurrent is not None:
+                active = get_active_process_pks(active)
+
+                while len(active) >= max_concurrent:
+                    time.sleep(poll_interval)
+                    active = get_active_process_pks(active)
+
+            cif = orm.load_node(pk)
+            inputs = {
+                'cif': cif,
+                'cif_filter': {
+                    'code': cif_filter,
+                    'parameters': node_cif_filter_parameters,
+                    'metadata': {
+                        'options': get_default_options()
+                    }
+                },
+                'cif_select': {
+                    'code': cif_select,
+                    'parameters': node_cif_select_parameters,
+                    'metadata': {
+                        'options': get_default_options()
+                    }
+                },
+                'parse_engine': node_parse_engine,
+                'site_tolerance': node_site_tolerance,
+                'symprec': node_symprec,
+                'pipeline': node_pipeline,
+                'precheck': node_precheck,
+                'deduplicate': node_deduplicate,
+                'cache_structure': node_cache_structures,
+            }
+
+            if group_cif_clean is not None:
+                inputs['group_cif'] = group_cif_clean
+
+            if group_structure is not None:
+                inputs['group_structure'] = group_structure
+
+            if daemon:
+                workchain = launch.submit(CifCleanWorkChain, **inputs)
+                active.add(workchain.pk)
+                echo_utc(f'CifData<{cif.pk}> submitting: {CifCleanWorkChain.__name__}<{workchain.pk}>')
+            else:
+                echo_utc(f'CifData<{cif.pk}> running: {CifCleanWorkChain.__name__}')
+                _, workchain = launch.run_get_node(CifCleanWorkChain, **inputs)
+
+            if group_workchain is not None:
+                group_workchain.add_nodes([workchain])
+
+            counter += 1
 
-        if max_entries is not None and counter >= max_entries:
-            break
+            if max_entries is not None and counter >= max_entries:
+                break
 
     click.echo('-' * 80)
     click.echo(f'Submitted {counter} new workchains')
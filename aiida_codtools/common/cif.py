@@ -0,0 +1,259 @@
+# -*- coding: utf-8 -*-
+"""Utilities to extract information from the raw content of CIF files without parsing them with PyCifRW."""
+import re
+import shlex
+
+REGEX_ELEMENT = re.compile(r'^([A-Z][a-z]?)')
+REGEX_UNCERTAINTY = re.compile(r'\(\d+\)$')
+
+TAG_LABEL = '_atom_site_label'
+TAG_OCCUPANCY = '_atom_site_occupancy'
+TAG_TYPE_SYMBOL = '_atom_site_type_symbol'
+
+
+def tokenize(line):
+    """Split a line of a CIF file into its values, respecting quoted values.
+
+    :param line: a line of a CIF file
+    :return: list of values, which is empty for blank lines and comments
+    """
+    # Only fall back on the considerably slower `shlex` if the line actually contains quotes
+    if "'" not in line and '"' not in line:
+        return line.split('#', 1)[0].split()
+
+    try:
+        return shlex.split(line, comments=True)
+    except ValueError:
+        # Unbalanced quotes, for example in values such as `O'`, which are valid in CIF but not for `shlex`
+        return line.split('#', 1)[0].split()
+
+
+def parse_float(value):
+    """Return the float of a CIF numerical value, ignoring its standard uncertainty, or None if it is not defined.
+
+    :param value: a numerical value of a CIF file, e.g. `0.5(1)`
+    :return: the value as a float or None for the unknown `?` and inapplicable `.` values
+    """
+    try:
+        return float(REGEX_UNCERTAINTY.sub('', value))
+    except ValueError:
+        return None
+
+
+def get_element(value):
+    """Return the element symbol from a value of the `_atom_site_type_symbol` or `_atom_site_label` tag.
+
+    :param value: a type symbol, such as `Fe3+`, or a site label, such as `Fe1`
+    :return: the element symbol or None if it cannot be determined
+    """
+    match = REGEX_ELEMENT.match(value)
+    return match.group(1) if match else None
+
+
+def scan_atom_sites(content):
+    """Scan the raw content of a CIF file in a single pass for the element symbols and occupancies of the atom sites.
+
+    This is a lightweight alternative to parsing the file with PyCifRW, intended to quickly reject CIF files based on
+    their composition. Only the `_atom_site_type_symbol`, `_atom_site_label` and `_atom_site_occupancy` tags are read,
+    both from loops and as single key-value pairs. If the type symbol of a site is not specified, the element symbol is
+    derived from its label. The sites of all data blocks are included.
+
+    :param content: the content of a CIF file as a string
+    :return: dictionary with the set of element symbols under `elements`, the list of occupancies, excluding undefined
+        values, under `occupancies` and the number of atom sites under `number_of_sites`
+    """
+    # pylint: disable=too-many-branches
+    elements = set()
+    occupancies = []
+    number_of_sites = 0
+
+    loop_tags = None
+    loop_values = []
+    in_loop_header = False
+    in_text_field = False
+    singles = {}
+
+    def flush_loop():
+        if not loop_tags or not any(tag in loop_tags for tag in (TAG_LABEL, TAG_TYPE_SYMBOL)):
+            return
+
+        width = len(loop_tags)
+
+        for index in range(0, len(loop_values) - width + 1, width):
+            add_site(dict(zip(loop_tags, loop_values[index:index + width])))
+
+    def flush_singles():
+        if TAG_LABEL in singles or TAG_TYPE_SYMBOL in singles:
+            add_site(singles)
+        singles.clear()
+
+    def add_site(site):
+        nonlocal number_of_sites
+
+        number_of_sites += 1
+        symbols = [site.get(tag) for tag in (TAG_TYPE_SYMBOL, TAG_LABEL) if site.get(tag) not in (None, '?', '.')]
+        element = get_element(symbols[0]) if symbols else None
+
+        if element is not None:
+            elements.add(element)
+
+        occupancy = parse_float(site.get(TAG_OCCUPANCY, '?'))
+
+        if occupancy is not None:
+            occupancies.append(occupancy)
+
+    for line in content.splitlines():
+
+        # Text fields are delimited by lines starting with a semicolon and their content is never relevant here
+        if line.startswith(';'):
+            in_text_field = not in_text_field
+            if loop_tags is not None and not in_text_field:
+                loop_values.append('')
+            continue
+
+        if in_text_field:
+            continue
+
+        tokens = tokenize(line)
+
+        if not tokens:
+            continue
+
+        keyword = tokens[0].lower()
+
+        if keyword == 'loop_' or keyword.startswith('data_') or keyword.startswith('save_'):
+            flush_loop()
+            if keyword.startswith('data_'):
+                flush_singles()
+            loop_tags = [] if keyword == 'loop_' else None
+            loop_values = []
+            in_loop_header = keyword == 'loop_'
+            continue
+
+        if keyword.startswith('_'):
+            if in_loop_header:
+                loop_tags.append(keyword)
+                continue
+
+            flush_loop()
+            loop_tags = None
+            loop_values = []
+
+            if keyword in (TAG_LABEL, TAG_TYPE_SYMBOL, TAG_OCCUPANCY) and len(tokens) > 1:
+                singles[keyword] = tokens[1]
+            continue
+
+        if loop_tags is not None:
+            in_loop_header = False
+            loop_values.extend(tokens)
+
+    flush_loop()
+    flush_singles()
+
+    return {'elements': elements, 'occupancies': occupancies, 'number_of_sites': number_of_sites}
+
+
+def scan_tag_values(content, tags):
+    """Scan the raw content of a CIF file in a single pass for all the values of the given tags.
+
+    The values are collected both from loops and from single key-value pairs, where the value may also be on the line
+    following the tag, from all data blocks. Values in text fields are recorded as None, since their content is skipped
+    and therefore unknown. Tag names are compared case insensitively.
+
+    :param content: the content of a CIF file as a string
+    :param tags: iterable of tag names
+    :return: dictionary mapping each of the lowercase tag names on the list of its values in order of appearance
+    """
+    # pylint: disable=too-many-branches
+    values = {tag.lower(): [] for tag in tags}
+
+    loop_tags = None
+    loop_index = 0
+    in_loop_header = False
+    in_text_field = False
+    pending_tag = None
+
+    def add_value(value):
+        nonlocal loop_index, pending_tag
+
+        if pending_tag is not None:
+            if pending_tag in values:
+                values[pending_tag].append(value)
+            pending_tag = None
+        elif loop_tags:
+            tag = loop_tags[loop_index % len(loop_tags)]
+            if tag in values:
+                values[tag].append(value)
+            loop_index += 1
+
+    for line in content.splitlines():
+
+        if line.startswith(';'):
+            in_text_field = not in_text_field
+            if not in_text_field:
+                add_value(None)
+            continue
+
+        if in_text_field:
+            continue
+
+        tokens = tokenize(line)
+
+        if not tokens:
+            continue
+
+        keyword = tokens[0].lower()
+
+        if keyword == 'loop_' or keyword.startswith('data_') or keyword.startswith('save_'):
+            loop_tags = [] if keyword == 'loop_' else None
+            loop_index = 0
+            in_loop_header = keyword == 'loop_'
+            pending_tag = None
+            continue
+
+        if keyword.startswith('_'):
+            if in_loop_header:
+                loop_tags.append(keyword)
+                continue
+
+            loop_tags = None
+            pending_tag = keyword
+
+            if len(tokens) > 1:
+                add_value(tokens[1])
+            continue
+
+        in_loop_header = False
+
+        for token in tokens:
+            add_value(token)
+
+    return values
+
+
+def has_partial_occupancies(occupancies, epsilon=1e-6):
+    """Return whether any of the given occupancies differs from one by more than `epsilon`.
+
+    :param occupancies: list of occupancies as returned by `scan_atom_sites`
+    :param epsilon: tolerance, the same as the one used by `CifData.has_partial_occupancies`
+    :return: boolean
+    """
+    return any(abs(occupancy - 1) > epsilon for occupancy in occupancies)
+
+
+def get_content_hash(content):
+    """Return a hash of the content of a CIF file that is insensitive to differences in line endings and whitespace.
+
+    Line endings are normalized, trailing whitespace is removed from each line and blank lines are ignored, such that
+    CIF files that only differ in formatting, for example after having been re-imported from another source, have the
+    same hash.
+
+    :param content: the content of a CIF file as a string
+    :return: the hexadecimal SHA-256 digest of the normalized content
+    """
+    import hashlib
+
+    lines = (line.rstrip() for line in content.splitlines())
+    normalized = '\n'.join(line for line in lines if line)
+
+    return hashlib.sha256(normalized.encode('utf-8')).hexdigest()
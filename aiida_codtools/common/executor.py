@@ -0,0 +1,34 @@
+# -*- coding: utf-8 -*-
+"""Utilities to run scripts directly as subprocesses on the local machine, bypassing the scheduler."""
+import concurrent.futures
+import functools
+import subprocess
+
+
+def run_script(command, content, timeout=None):
+    """Run a script as a subprocess with the given content written to stdin and return the content of stdout and stderr.
+
+    :param command: list with the executable followed by its command line parameters
+    :param content: bytes that are written to stdin of the script
+    :param timeout: optional number of seconds after which the script is killed
+    :return: tuple of the content written to stdout as bytes and the content written to stderr as a string
+    :raises subprocess.TimeoutExpired: if the script did not finish within the given timeout
+    """
+    process = subprocess.run(
+        command, input=content, stdout=subprocess.PIPE, stderr=subprocess.PIPE, timeout=timeout, check=False
+    )
+    return process.stdout, process.stderr.decode('utf-8', errors='replace')
+
+
+def run_scripts(command, contents, max_workers=None, timeout=None):
+    """Run a script for each of the given contents concurrently, with at most `max_workers` subprocesses at a time.
+
+    :param command: list with the executable followed by its command line parameters
+    :param contents: iterable of bytes, each of which is written to the stdin of a separate invocation of the script
+    :param max_workers: the maximum number of concurrent subprocesses, by default determined by `ThreadPoolExecutor`
+    :param timeout: optional number of seconds after which each script is killed
+    :return: list of tuples of the content of stdout and stderr, in the same order as the given contents
+    """
+    # Each thread merely waits on its subprocess, so a thread pool is sufficient to run the scripts in parallel
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+        return list(executor.map(functools.partial(run_script, command, timeout=timeout), contents))
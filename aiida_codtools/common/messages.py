@@ -0,0 +1,60 @@
+# -*- coding: utf-8 -*-
+"""Catalog of the error and warning messages written to stderr by the `cod-tools` scripts.
+
+Each message is classified into a stable code by the first pattern of `MESSAGE_PATTERNS` that matches it. The parsers
+store the number of messages per code in the `error_codes` and `warning_codes` attributes of the `messages` output,
+such that calculations can be selected on the type of message they produced with a filter on a single key, rather
+than by matching the free text of each message. Messages that match none of the patterns are counted under
+`MESSAGE_CODE_UNCLASSIFIED`. New patterns should be added to the end of the table, since changing the code of a message
+that is already classified would make the stored counts inconsistent.
+"""
+import collections
+import functools
+import re
+
+MESSAGE_CODE_UNCLASSIFIED = 'UNCLASSIFIED'
+
+MESSAGE_PATTERNS = tuple((code, re.compile(pattern, re.IGNORECASE)) for code, pattern in (
+    ('UNKNOWN_OPTION', r'unknown option'),
+    ('UNRECOGNISED_DATA_NAME', r'data name .* is not recognised'),
+    ('UNDEFINED_DATA_NAME', r'^_\S+ is undefined'),
+    ('UNDEFINED_DATA_NAME_ALTERNATIVES', r'^neither _\S+ nor _\S+ is defined'),
+    ('SYNTAX_ERROR', r'syntax error'),
+    ('SPACE_GROUP', r'space group'),
+    ('UNIT_CELL', r'unit cell|cell (?:length|angle|volume)'),
+    ('OCCUPANCY', r'occupanc'),
+    ('ATOM_SITE', r'atom(?:ic)? sites?'),
+    ('CHEMICAL_FORMULA', r'formula'),
+))
+
+MESSAGE_CODES = tuple(code for code, _ in MESSAGE_PATTERNS) + (MESSAGE_CODE_UNCLASSIFIED,)
+
+
+@functools.lru_cache(maxsize=4096)
+def classify_message(message):
+    """Return the code of the given error or warning message.
+
+    The result is memoized, since the scripts tend to emit the same messages for many different CIF files.
+
+    :param message: the message without the prefix up to and including the `ERROR,` or `WARNING,` marker
+    :return: the code of the first pattern of `MESSAGE_PATTERNS` that matches or `MESSAGE_CODE_UNCLASSIFIED`
+    """
+    for code, pattern in MESSAGE_PATTERNS:
+        if pattern.search(message):
+            return code
+
+    return MESSAGE_CODE_UNCLASSIFIED
+
+
+def count_message_codes(messages):
+    """Return the total number of occurrences of the messages per code.
+
+    :param messages: `collections.Counter` of messages
+    :return: dictionary mapping the codes, of which at least one message occurred, on the number of occurrences
+    """
+    codes = collections.Counter()
+
+    for message, count in messages.items():
+        codes[classify_message(message)] += count
+
+    return dict(codes)
@@ -0,0 +1,216 @@
+# -*- coding: utf-8 -*-
+"""Utilities to import CIF files from a local mirror of a structural database instead of through a `DbImporter`."""
+import bisect
+import os
+import tarfile
+import zipfile
+
+from aiida.tools.dbimporters.baseclasses import CifEntry
+
+CIF_EXTENSION = '.cif'
+
+
+class LocalCifEntry(CifEntry):
+    """Represents a CIF file of a structural database in a local directory or archive.
+
+    The content of the file is only read when the `cif` property is accessed for the first time, such that reading it
+    can be delegated to a thread pool, just like downloading the content of the entries returned by a `DbImporter`.
+    """
+
+    def __init__(self, loader, **kwargs):
+        """Construct a new instance.
+
+        :param loader: callable without arguments that returns the content of the CIF file as bytes
+        :param kwargs: keyword arguments that are passed to the constructor of `CifEntry`
+        """
+        super().__init__(**kwargs)
+        self._loader = loader
+
+    @property
+    def contents(self):
+        """Return the content of the CIF file as a string, reading it from the local file the first time."""
+        if self._contents is None:
+            self.contents = self._loader().decode('utf-8')
+        return self._contents
+
+    @contents.setter
+    def contents(self, contents):
+        """Set the content of the CIF file as a string."""
+        CifEntry.contents.fset(self, contents)
+
+
+def iterate_local_entries(path, database):
+    """Return a generator of a `LocalCifEntry` for each CIF file in the given directory tree or archive.
+
+    The files are yielded in a deterministic order, such that an interrupted import can be resumed. The identifier of
+    each entry is the name of the file without extension, which corresponds to the identifier used by the database for
+    a mirror of COD.
+
+    :param path: path to a directory, or a tar or zip archive, that contains CIF files with the `.cif` extension
+    :param database: the name of the structural database that is mirrored, used for the `db_name` of the source
+    :return: generator of `LocalCifEntry` instances
+    :raises ValueError: if the path is neither a directory nor a supported archive
+    """
+    path = os.path.abspath(path)
+
+    if os.path.isdir(path):
+        entries = iterate_directory(path)
+    elif tarfile.is_tarfile(path):
+        entries = iterate_tar_archive(path)
+    elif zipfile.is_zipfile(path):
+        entries = iterate_zip_archive(path)
+    else:
+        raise ValueError(f'`{path}` is neither a directory nor a tar or zip archive.')
+
+    return (
+        LocalCifEntry(loader, db_name=database.upper(), db_uri=path, id=get_identifier(uri), uri=uri)
+        for uri, loader in entries
+    )
+
+
+def get_identifier(uri):
+    """Return the identifier of the entry with the given uri, which is the name of the file without extension.
+
+    For a file in an archive, the uri is that of the archive followed by `#` and the path of the file in the archive.
+
+    :param uri: the uri of the CIF file
+    :return: the identifier
+    """
+    return os.path.splitext(os.path.basename(uri.rsplit('#', 1)[-1]))[0]
+
+
+def iterate_directory(path):
+    """Yield the uri and a loader for each CIF file in the directory tree, sorted by relative path.
+
+    :param path: absolute path of the directory
+    :return: generator of tuples of the uri of the file and a callable that returns its content
+    """
+
+    def get_loader(filepath):
+
+        def load():
+            with open(filepath, 'rb') as handle:
+                return handle.read()
+
+        return load
+
+    for dirpath, dirnames, filenames in os.walk(path):
+        dirnames.sort()
+        for filename in sorted(filenames):
+            if filename.endswith(CIF_EXTENSION):
+                filepath = os.path.join(dirpath, filename)
+                yield f'file://{filepath}', get_loader(filepath)
+
+
+def iterate_tar_archive(path):
+    """Yield the uri and a loader for each CIF file in the tar archive, in the order in which they are stored.
+
+    The archive is read as a stream, since random access in compressed tar archives is very slow. This means the
+    content of each file has to be read before the next one is yielded.
+
+    :param path: absolute path of the tar archive
+    :return: generator of tuples of the uri of the file and a callable that returns its content
+    """
+    with tarfile.open(path, mode='r|*') as archive:
+        for member in archive:
+            if member.isfile() and member.name.endswith(CIF_EXTENSION):
+                content = archive.extractfile(member).read()
+                yield f'file://{path}#{member.name}', lambda content=content: content
+
+
+def iterate_zip_archive(path):
+    """Yield the uri and a loader for each CIF file in the zip archive, in the order in which they are stored.
+
+    The content of each file is read before it is yielded, since the archive is closed once the generator is exhausted,
+    which can be before the content of the last entries is loaded.
+
+    :param path: absolute path of the zip archive
+    :return: generator of tuples of the uri of the file and a callable that returns its content
+    """
+    with zipfile.ZipFile(path) as archive:
+        for info in archive.infolist():
+            if not info.is_dir() and info.filename.endswith(CIF_EXTENSION):
+                content = archive.read(info)
+                yield f'file://{path}#{info.filename}', lambda content=content: content
+
+
+class SourceIdSet:
+    """Set of source ids of the entries of a structural database that can be serialized compactly to JSON.
+
+    The ids of most databases are integers, of which large ranges are consecutive, so the integer ids are stored as a
+    sorted list of disjoint ranges of consecutive integers. Only ids that are the canonical string representation of an
+    integer are stored as such, such that for example `0999999` and `999999` are distinct. Any other ids are stored as
+    is. The order in which the ids are added does not matter.
+    """
+
+    def __init__(self, ranges=(), others=()):
+        """Construct a new instance.
+
+        :param ranges: iterable of pairs of the first and last integer of each range of consecutive integer ids, which
+            should be disjoint and not adjacent, as returned by `get_dict`
+        :param others: iterable of the ids that are not integers
+        """
+        ranges = sorted(ranges)
+        self._starts = [start for start, _ in ranges]
+        self._stops = [stop for _, stop in ranges]
+        self._others = set(others)
+
+    def __contains__(self, source_id):
+        value = self.get_integer(source_id)
+
+        if value is None:
+            return str(source_id) in self._others
+
+        index = bisect.bisect_right(self._starts, value) - 1
+        return index >= 0 and value <= self._stops[index]
+
+    def __len__(self):
+        return sum(stop - start + 1 for start, stop in zip(self._starts, self._stops)) + len(self._others)
+
+    @staticmethod
+    def get_integer(source_id):
+        """Return the source id as an integer if it is the canonical string representation of one, otherwise None."""
+        try:
+            value = int(source_id)
+        except (TypeError, ValueError):
+            return None
+
+        return value if str(value) == str(source_id) else None
+
+    def add(self, source_id):
+        """Add the given source id, merging it with the ranges of consecutive integer ids that it is adjacent to.
+
+        :param source_id: the source id
+        """
+        value = self.get_integer(source_id)
+
+        if value is None:
+            self._others.add(str(source_id))
+            return
+
+        index = bisect.bisect_right(self._starts, value) - 1
+
+        if index >= 0 and value <= self._stops[index]:
+            return
+
+        merge_previous = index >= 0 and self._stops[index] == value - 1
+        merge_next = index + 1 < len(self._starts) and self._starts[index + 1] == value + 1
+
+        if merge_previous and merge_next:
+            self._stops[index] = self._stops.pop(index + 1)
+            self._starts.pop(index + 1)
+        elif merge_previous:
+            self._stops[index] = value
+        elif merge_next:
+            self._starts[index + 1] = value
+        else:
+            self._starts.insert(index + 1, value)
+            self._stops.insert(index + 1, value)
+
+    def get_dict(self):
+        """Return the set as a JSON serializable dictionary, which can be passed to the constructor as keywords.
+
+        :return: dictionary with the list of ranges of consecutive integer ids and the sorted list of other ids
+        """
+        ranges = [[start, stop] for start, stop in zip(self._starts, self._stops)]
+        return {'ranges': ranges, 'others': sorted(self._others)}
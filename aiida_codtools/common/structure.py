@@ -0,0 +1,337 @@
+# -*- coding: utf-8 -*-
+"""Utilities to parse structures from CIF files and reduce them to their primitive cell.
+
+The `parse_structure` and `get_seekpath_results` functions only operate on plain python objects and do not require a
+loaded profile, such that they can be run in the worker processes of a `concurrent.futures.ProcessPoolExecutor`.
+Failures are returned as the name of the corresponding exit code of the `CifCleanWorkChain`, since exceptions and
+exit codes are not guaranteed to be picklable.
+"""
+import io
+import re
+
+EXTRAS_SEEKPATH_PARAMETERS = ('spacegroup_international', 'spacegroup_number', 'bravais_lattice',
+                              'bravais_lattice_extended')
+
+EXTRA_PRIMITIVE_STRUCTURE_KEY = 'codtools_primitive_structure_key'
+
+
+def parse_structure(content, parse_engine, site_tolerance):
+    """Parse the content of a CIF file into a structure object of the given parse engine.
+
+    For pymatgen, the structure is built from the data blocks parsed by the `CifParser` through `build_structure`,
+    which replaces the pairwise comparisons of sites that the parser performs in pure python, and which dominate the
+    parsing time of large cells, by queries of a periodic KD-tree. If the CIF contains features that are not supported
+    by it, the structure is generated by the same `CifParser` instance, such that the content is only parsed once.
+
+    :param content: the content of the CIF file as a string
+    :param parse_engine: the parsing engine, supported libraries 'ase' and 'pymatgen'
+    :param site_tolerance: the fractional coordinate distance tolerance for finding overlapping sites. This will only
+        be used if the parse_engine is pymatgen
+    :return: tuple of the `pymatgen.core.Structure` or `ase.Atoms` and None if successful, otherwise a tuple of None and
+        the name of the exit code of the `CifCleanWorkChain` that corresponds to the failure
+    """
+    if parse_engine == 'ase':
+        from aiida.orm import CifData
+
+        try:
+            return CifData.read_cif(io.StringIO(content)), None
+        except Exception:  # pylint: disable=broad-except
+            return None, 'ERROR_CIF_STRUCTURE_PARSING_FAILED'
+
+    if parse_engine != 'pymatgen':
+        return None, 'ERROR_CIF_STRUCTURE_PARSING_FAILED'
+
+    from pymatgen.io.cif import CifParser
+
+    try:
+        parser = CifParser(io.StringIO(content), site_tolerance=site_tolerance)
+
+        try:
+            return build_structure(parser, site_tolerance), None
+        except NotImplementedError:
+            return parser.get_structures(primitive=False)[0], None
+
+    except ValueError:
+        # Verify whether the failure was due to wrong occupancy numbers, in the same way as `CifData.get_structure`
+        try:
+            CifParser(io.StringIO(content), site_tolerance=site_tolerance, occupancy_tolerance=1E10).get_structures()
+        except Exception:  # pylint: disable=broad-except
+            return None, 'ERROR_CIF_STRUCTURE_PARSING_FAILED'
+        return None, 'ERROR_CIF_HAS_INVALID_OCCUPANCIES'
+    except Exception:  # pylint: disable=broad-except
+        return None, 'ERROR_CIF_STRUCTURE_PARSING_FAILED'
+
+
+def build_structure(parser, site_tolerance, occupancy_tolerance=1.):
+    """Build the structure of the first data block of the given pymatgen `CifParser` that defines one.
+
+    This returns the same structure as `parser.get_structures(primitive=False)[0]`, for which it follows the same steps
+    as the `CifParser` itself, relying on its public API only, but compares the sites with `get_overlapping_sites`:
+
+        * the sites of the asymmetric unit for which a symmetry image overlaps with a preceding site that was not
+          merged itself, are merged into that site, adding up the occupancies;
+        * the sites with the same composition are expanded with the symmetry operations, dropping the images that
+          overlap with a preceding image that was not dropped itself.
+
+    Oxidation states, special and implicit hydrogen symbols and magnetic CIFs are not supported, in which case the
+    structure should be generated by the `CifParser` instead.
+
+    :param parser: the `pymatgen.io.cif.CifParser`
+    :param site_tolerance: the fractional coordinate distance tolerance for finding overlapping sites, which should be
+        the same as the one of the parser
+    :param occupancy_tolerance: sites with a total occupancy between one and this tolerance are scaled down to one
+    :return: the `pymatgen.core.Structure`, sorted in the same way as by the `CifParser`
+    :raises NotImplementedError: if the CIF contains features that are not supported
+    :raises ValueError: if none of the data blocks defines a valid structure
+    """
+    from pymatgen.io.cif import CifBlock
+
+    if parser.feature_flags.get('magcif') or parser.feature_flags.get('magcif_incommensurate'):
+        raise NotImplementedError('magnetic CIFs are not supported')
+
+    for header, data in parser.as_dict().items():
+        try:
+            structure = build_block_structure(parser, CifBlock(data, [], header), site_tolerance, occupancy_tolerance)
+        except (KeyError, ValueError):
+            # The `CifParser` skips the data blocks that raise these exceptions in the same way
+            continue
+
+        if structure is not None:
+            return structure
+
+    raise ValueError('Invalid cif file with no structures!')
+
+
+def build_block_structure(parser, block, site_tolerance, occupancy_tolerance=1.):
+    """Build the structure of a single data block of a pymatgen `CifParser`, as described in `build_structure`.
+
+    :param parser: the `pymatgen.io.cif.CifParser`, used to parse the lattice and the symmetry operations
+    :param block: the `pymatgen.io.cif.CifBlock`
+    :param site_tolerance: the fractional coordinate distance tolerance for finding overlapping sites
+    :param occupancy_tolerance: sites with a total occupancy between one and this tolerance are scaled down to one
+    :return: the `pymatgen.core.Structure` or None if the data block does not define any sites
+    :raises NotImplementedError: if the data block contains features that are not supported
+    """
+    # pylint: disable=too-many-locals
+    import itertools
+
+    import numpy
+    from pymatgen.core import Composition, Element, Structure
+    from pymatgen.core.periodic_table import get_el_sp
+    from pymatgen.io.cif import str2float
+
+    if '_atom_type_oxidation_number' in block.data:
+        raise NotImplementedError('oxidation states are not supported')
+
+    lattice = parser.get_lattice(block)
+    operations = parser.get_symops(block)
+
+    labels = block['_atom_site_label']
+    type_symbols = block['_atom_site_type_symbol'] if '_atom_site_type_symbol' in block.data else labels
+
+    if not isinstance(labels, list) or not isinstance(type_symbols, list):
+        raise NotImplementedError('data blocks with a single site that is not defined in a loop are not supported')
+
+    compositions = []
+    positions = []
+
+    for index in range(len(labels)):
+
+        type_symbol = type_symbols[index]
+
+        if re.match('Hw|Ow|Wat|wat|OH|NO3|O-H', type_symbol):
+            raise NotImplementedError('special symbols and implicit hydrogens are not supported')
+
+        if Element.is_valid_symbol(type_symbol[:2].title()):
+            symbol = type_symbol[:2].title()
+        elif Element.is_valid_symbol(type_symbol[0].upper()):
+            symbol = type_symbol[0].upper()
+        else:
+            raise NotImplementedError(f'the symbol `{type_symbol}` is not supported')
+
+        position = [str2float(block[f'_atom_site_fract_{axis}'][index]) for axis in 'xyz']
+
+        try:
+            occupancy = str2float(block['_atom_site_occupancy'][index])
+        except (KeyError, ValueError):
+            occupancy = 1
+
+        if occupancy > 0:
+            compositions.append(Composition({get_el_sp(symbol): occupancy}))
+            positions.append(position)
+
+    if not positions:
+        return None
+
+    affine = numpy.array([operation.affine_matrix for operation in operations])
+    positions = numpy.array(positions)
+    images = numpy.einsum('mij,nj->nmi', affine[:, :3, :3], positions) + affine[:, :3, 3]
+
+    # Merge the sites whose images overlap with a preceding site, summing the compositions in the same order
+    groups = get_overlapping_sites(positions, site_tolerance, images=images)
+    species = {}
+
+    for group, composition in zip(groups.tolist(), compositions):
+        species[group] = species[group] + composition if group in species else composition
+
+    structure_species = []
+    structure_positions = []
+
+    for composition, items in itertools.groupby(sorted(species.items(), key=lambda x: x[1]), key=lambda x: x[1]):
+        coordinates = images[[group for group, _ in items]].reshape(-1, 3)
+        coordinates -= numpy.floor(coordinates)
+        unique = coordinates[get_overlapping_sites(coordinates, site_tolerance) == numpy.arange(len(coordinates))]
+
+        total = sum(composition.values())
+
+        if 1 < total <= occupancy_tolerance:
+            composition = composition / total
+
+        structure_positions.extend(unique)
+        structure_species.extend([composition] * len(unique))
+
+    return Structure(lattice, structure_species, structure_positions).get_sorted_structure()
+
+
+def get_overlapping_sites(positions, site_tolerance, images=None, chunk_size=65536):
+    """Return for each site the index of the representative site of the group of overlapping sites it belongs to.
+
+    A site overlaps with another site if each of the components of the difference between their fractional
+    coordinates, reduced to the nearest periodic image, is smaller than `site_tolerance`, which is the same criterion as
+    the one used by the `CifParser` of pymatgen. If `images` are given, a site overlaps with another site if any of its
+    images does. In the same way as the `CifParser`, the sites are only compared with the representatives of the
+    preceding groups: a site is assigned to the first representative that its first overlapping image overlaps with,
+    and it becomes the representative of a new group if none of its images overlaps with any of them.
+
+    The candidate pairs are found with a periodic `scipy.spatial.cKDTree`, querying at most `chunk_size` images at the
+    same time, such that the memory scales with the number of overlapping pairs instead of the number of all pairs.
+
+    :param positions: array-like of shape (N, 3) with the fractional coordinates of the sites
+    :param site_tolerance: the fractional coordinate distance tolerance for finding overlapping sites
+    :param images: optional array-like of shape (N, M, 3) with the fractional coordinates of M images of each site,
+        for example generated by the symmetry operations of the space group, by default the sites themselves
+    :param chunk_size: the number of images whose overlapping sites are queried at the same time
+    :return: integer numpy array of length N with the index of the representative site of the group of each site
+    """
+    import numpy
+    from scipy.spatial import cKDTree
+
+    def get_tree(coordinates):
+        coordinates = coordinates - numpy.floor(coordinates)
+        # Coordinates that are rounded up to one by the subtraction are wrapped as well, as required by `boxsize`
+        coordinates[coordinates >= 1] = 0
+        return cKDTree(coordinates, boxsize=1)
+
+    positions = numpy.asarray(positions, dtype=float).reshape(-1, 3)
+    images = positions[:, numpy.newaxis, :] if images is None else numpy.asarray(images, dtype=float)
+    multiplicity = images.shape[1]
+    step = max(1, chunk_size // multiplicity)
+    tree = get_tree(positions)
+    candidates = []
+
+    for start in range(0, len(positions), step):
+        chunk = images[start:start + step].reshape(-1, 3)
+
+        # The tree is queried with a slightly larger distance, since the pairs are filtered with the exact criterion
+        pairs = get_tree(chunk).sparse_distance_matrix(tree, 2 * site_tolerance, p=numpy.inf, output_type='ndarray')
+        sites = start + pairs['i'] // multiplicity
+        operations = pairs['i'] % multiplicity
+        preceding = pairs['j'] < sites
+
+        differences = chunk[pairs['i'][preceding]] - positions[pairs['j'][preceding]]
+        differences -= numpy.round(differences)
+        overlapping = numpy.all(numpy.abs(differences) < site_tolerance, axis=-1)
+
+        candidates.append(
+            numpy.stack([sites[preceding], operations[preceding], pairs['j'][preceding]])[:, overlapping]
+        )
+
+    groups = numpy.arange(len(positions))
+    sites, operations, others = numpy.concatenate(candidates, axis=1) if candidates else numpy.empty((3, 0), int)
+
+    # Sort the candidates by site, then by image and finally by the index of the preceding site
+    order = numpy.lexsort((others, operations, sites))
+    sites, indices = numpy.unique(sites[order], return_index=True)
+
+    # The sites are resolved in order, such that the groups of all preceding sites are final
+    for site, preceding in zip(sites.tolist(), numpy.split(others[order], indices[1:])):
+        representatives = preceding[groups[preceding] == preceding]
+
+        if len(representatives):
+            groups[site] = representatives[0]
+
+    return groups
+
+
+def get_seekpath_results(structure_tuple, symprec):
+    """Return the results of SeeKpath for the given structure tuple.
+
+    SeeKpath is used instead of calling `spglib.standardize_cell` directly, because the extended Bravais lattice that
+    is set in the extras is only determined by SeeKpath and because its primitive cell follows the conventions of the
+    HPKOT paper, which differ from those of spglib for the mC and oA lattices. Nearly all of the time is spent in the
+    symmetry analysis by spglib, which would be needed either way, and not in the construction of the k-point path.
+
+    :param structure_tuple: the structure in the tuple format of spglib
+    :param symprec: the symmetry precision used by SeeKpath for crystal symmetry refinement
+    :return: tuple of the dictionary returned by `seekpath.get_path` and None if successful, otherwise a tuple of None
+        and the name of the exit code of the `CifCleanWorkChain` that corresponds to the failure
+    """
+    import seekpath
+    from seekpath.hpkot import SymmetryDetectionError
+
+    try:
+        return seekpath.get_path(structure=structure_tuple, symprec=symprec), None
+    except ValueError:
+        return None, 'ERROR_SEEKPATH_INCONSISTENT_SYMMETRY'
+    except SymmetryDetectionError:
+        return None, 'ERROR_SEEKPATH_SYMMETRY_DETECTION_FAILED'
+
+
+def get_structure_extras(structure, parameters):
+    """Return the extras that should be set on a primitive structure to make it easily queryable.
+
+    :param structure: the primitive `StructureData`
+    :param parameters: dictionary with the parameters returned by SeeKpath
+    :return: dictionary of extras
+    """
+    # Store the formula as a string, in both hill as well as hill-compact notation, so it can be easily queried for
+    extras = {
+        'formula_hill': structure.get_formula(mode='hill'),
+        'formula_hill_compact': structure.get_formula(mode='hill_compact'),
+        'chemical_system': f"-{'-'.join(sorted(structure.get_symbols_set()))}-",
+    }
+
+    for key in EXTRAS_SEEKPATH_PARAMETERS:
+        try:
+            extras[key] = parameters[key]
+        except KeyError:
+            pass
+
+    return extras
+
+
+def get_primitive_structure_key(content, parse_engine, symprec, site_tolerance):
+    """Return the key under which the primitive structure parsed from a CIF file with the given inputs is cached.
+
+    The primitive structure is fully determined by the content of the CIF file and the parsing inputs, so the key is a
+    hash of the normalized content and the values of those inputs.
+
+    :param content: the content of the CIF file as a string
+    :param parse_engine: the parsing engine, supported libraries 'ase' and 'pymatgen'
+    :param symprec: the symmetry precision used by SeeKpath for crystal symmetry refinement
+    :param site_tolerance: the fractional coordinate distance tolerance for finding overlapping sites
+    :return: the hexadecimal digest of the key
+    """
+    import hashlib
+    import json
+
+    from aiida_codtools.common.cif import get_content_hash
+
+    key = {
+        'cif': get_content_hash(content),
+        'parse_engine': parse_engine,
+        'symprec': symprec,
+        'site_tolerance': site_tolerance,
+    }
+
+    return hashlib.sha256(json.dumps(key, sort_keys=True).encode('utf-8')).hexdigest()
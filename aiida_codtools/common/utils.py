@@ -1,36 +1,223 @@
 # -*- coding: utf-8 -*-
 """Common utilities."""
+import functools
+import json
+
+INPUT_NODE_CACHE_SIZE = 256
 
 
 def get_input_node(cls, value):
     """Return a `Node` of a given class and given value.
 
     If a `Node` of the given type and value already exists, that will be returned, otherwise a new one will be created,
-    stored and returned.
+    stored and returned. The pk of the node is memoized in a process-local cache, keyed on the class and the value, of
+    at most `INPUT_NODE_CACHE_SIZE` entries, such that repeated calls with the same arguments do not hit the database.
+    The cache can be invalidated with `clear_input_node_cache`.
 
     :param cls: the `Node` class
     :param value: the value of the `Node`
     """
     from aiida import orm
+    from aiida.common import exceptions
+
+    if cls not in (orm.Bool, orm.Float, orm.Int, orm.Str, orm.Dict):
+        raise NotImplementedError
+
+    # Canonicalize the value such that equal dictionaries map onto the same key regardless of their order
+    key = json.dumps(value, sort_keys=True)
 
-    if cls in (orm.Bool, orm.Float, orm.Int, orm.Str):
+    try:
+        return orm.load_node(_get_input_node_pk(cls, key))
+    except exceptions.NotExistent:
+        # The cached node has been deleted in the meantime
+        clear_input_node_cache()
+        return orm.load_node(_get_input_node_pk(cls, key))
 
-        result = orm.QueryBuilder().append(cls, filters={'attributes.value': value}).first()
 
-        if result is None:
-            node = cls(value).store()
-        else:
-            node = result[0]
+def clear_input_node_cache():
+    """Clear the process-local cache of `get_input_node`."""
+    _get_input_node_pk.cache_clear()
 
-    elif cls is orm.Dict:
-        result = orm.QueryBuilder().append(cls, filters={'attributes': {'==': value}}).first()
 
-        if result is None:
-            node = cls(dict=value).store()
-        else:
-            node = result[0]
+@functools.lru_cache(maxsize=INPUT_NODE_CACHE_SIZE)
+def _get_input_node_pk(cls, key):
+    """Return the pk of a `Node` of the given class with the value that is serialized as JSON in the given key.
+
+    Base types are looked up by their value attribute. A `Dict` is looked up by the hash that is stored in its extras
+    when the node is stored, which avoids a comparison of the full attributes of every `Dict` in the database. Note that
+    the public `get_hash` can only be called for stored nodes, so the hash of the unstored node is computed with the
+    same `_get_hash`, which `get_hash` calls for stored nodes.
+
+    :param cls: the `Node` class
+    :param key: the value of the `Node` serialized as JSON with sorted keys
+    :return: the pk of the existing or newly stored `Node`
+    """
+    from aiida import orm
+    from aiida.common.hashing import _HASH_EXTRA_KEY
+
+    value = json.loads(key)
 
+    if cls is orm.Dict:
+        node = cls(dict=value)
+        filters = {f'extras.{_HASH_EXTRA_KEY}': node._get_hash()}  # pylint: disable=protected-access
     else:
-        raise NotImplementedError
+        node = cls(value)
+        filters = {'attributes.value': value}
+
+    result = orm.QueryBuilder().append(cls, filters=filters, project='id').first()
+
+    if result is None:
+        return node.store().pk
+
+    return result[0]
+
+
+def map_ordered(function, iterable, max_workers=1, max_pending=None):
+    """Apply a function to each element of an iterable in a thread pool, yielding the results in the original order.
+
+    The iterable is consumed lazily in the calling thread, with at most `max_pending` elements being processed or
+    waiting to be yielded at any time, such that arbitrarily long iterables, such as the results of a database query,
+    can be processed in bounded memory. Instead of the result itself, the future is yielded together with the element,
+    such that the caller can handle exceptions raised by the function per element, by calling `future.result()`.
+
+    :param function: callable that takes a single element of the iterable
+    :param iterable: iterable of elements
+    :param max_workers: the number of threads in the pool
+    :param max_pending: the maximum number of elements submitted to the pool at any time, by default twice the number
+        of workers
+    :return: generator of tuples of each element and the future of the function applied to it
+    """
+    import collections
+    import concurrent.futures
+
+    if max_pending is None:
+        max_pending = 2 * max_workers
+
+    pending = collections.deque()
+    executor = concurrent.futures.ThreadPoolExecutor(max_workers=max_workers)
+
+    try:
+        for element in iterable:
+            pending.append((element, executor.submit(function, element)))
+
+            if len(pending) >= max_pending:
+                yield pending.popleft()
+
+        while pending:
+            yield pending.popleft()
+    finally:
+        # If the generator is closed before being exhausted, do not wait for the elements that were not yielded
+        for _, future in pending:
+            future.cancel()
+        executor.shutdown(wait=True)
+
+
+def iter_chunks(iterable, chunk_size):
+    """Consume the iterable lazily and yield its elements in lists of at most `chunk_size` elements.
+
+    :param iterable: iterable of elements
+    :param chunk_size: the maximum number of elements per chunk
+    :return: generator of lists of elements
+    """
+    import itertools
+
+    iterator = iter(iterable)
+
+    while True:
+        chunk = list(itertools.islice(iterator, chunk_size))
+
+        if not chunk:
+            return
+
+        yield chunk
+
+
+def store_nodes(nodes, group=None):
+    """Store the given nodes and optionally add them to a group in a single database transaction.
+
+    This is considerably faster than storing the nodes one by one, which commits a separate transaction for each node,
+    followed by `Group.add_nodes`. Note that the files of each node are still written to the repository individually.
+
+    :param nodes: list of unstored `Node` instances without incoming links
+    :param group: optional `Group` to which the nodes are added
+    :return: the list of stored nodes
+    """
+    from aiida.manage.manager import get_manager
+
+    backend = get_manager().get_backend()
+
+    with backend.transaction() as session:
+        for node in nodes:
+            node.store(with_transaction=False)
+
+        # For the SqlAlchemy backend, the nodes only get a primary key, which is required to add them to the group, once
+        # the session is flushed. The Django backend saves each model immediately and does not return a session.
+        if session is not None:
+            session.flush()
+
+        if group is not None and nodes:
+            group.backend_entity.add_nodes([node.backend_entity for node in nodes], skip_orm=True)
+
+    return nodes
+
+
+def iterate_unprocessed_nodes(group, group_workchain=None, page_size=1000):
+    """Yield the pks of the `CifData` nodes in the group that are not an input of a workchain in `group_workchain`.
+
+    The nodes of the group are iterated in pages of `page_size` in order of increasing pk, using the last pk of the
+    previous page as the lower bound of the next. For each page, a single query determines which of its nodes are
+    already an input of a workchain in `group_workchain`. This keeps the size of each query bounded, regardless of the
+    number of nodes in either group, and allows to start processing the first nodes straight away.
+
+    :param group: the `Group` with the `CifData` nodes
+    :param group_workchain: optional `Group` with workchains, whose input `CifData` nodes should be skipped
+    :param page_size: the number of nodes to retrieve per query
+    :return: generator of pks of `CifData` nodes
+    """
+    from aiida import orm
+
+    last_pk = -1
+
+    while True:
+        builder = orm.QueryBuilder()
+        builder.append(orm.Group, filters={'id': group.pk}, tag='group')
+        builder.append(orm.CifData, with_group='group', filters={'id': {'>': last_pk}}, project='id', tag='cif')
+        builder.order_by({'cif': {'id': 'asc'}})
+        builder.limit(page_size)
+        page = [pk for pk, in builder.iterall()]
+
+        if not page:
+            return
+
+        last_pk = page[-1]
+        processed = set()
+
+        if group_workchain is not None:
+            builder = orm.QueryBuilder()
+            builder.append(orm.Group, filters={'id': group_workchain.pk}, tag='group')
+            builder.append(orm.WorkChainNode, with_group='group', tag='workchain')
+            builder.append(orm.CifData, with_outgoing='workchain', filters={'id': {'in': page}}, project='id')
+            processed = {pk for pk, in builder.iterall()}
+
+        for pk in page:
+            if pk not in processed:
+                yield pk
+
+
+def get_active_process_pks(pks):
+    """Return the subset of the given process pks that correspond to processes that have not yet terminated.
+
+    :param pks: collection of pks of `ProcessNode` instances
+    :return: set of pks of the processes that are created, waiting or running
+    """
+    from aiida import orm
+    from aiida.engine import ProcessState
+
+    if not pks:
+        return set()
+
+    states = [ProcessState.CREATED.value, ProcessState.WAITING.value, ProcessState.RUNNING.value]
+    filters = {'id': {'in': list(pks)}, 'attributes.process_state': {'in': states}}
+    builder = orm.QueryBuilder().append(orm.ProcessNode, filters=filters, project='id')
 
-    return node
+    return {pk for pk, in builder.iterall()}
@@ -1,9 +1,12 @@
 # -*- coding: utf-8 -*-
 """Generic `Parser` implementation that can easily be extended to work with any of the `cod-tools` scripts."""
+import collections
+import io
+import os
 import traceback
 
 from aiida.common import exceptions
-from aiida.orm import Dict
+from aiida.orm import Dict, SinglefileData
 from aiida.parsers.parser import Parser
 from aiida.plugins import CalculationFactory, DataFactory
 
@@ -53,20 +56,68 @@ class CifBaseParser(Parser):
         if exit_code:
             return exit_code
 
+    def map_outputs(self, function, iterable):
+        """Apply the function to each element of the iterable, yielding the results in the order of the iterable.
+
+        If the `parser_workers` option of the calculation is larger than one, the function is applied concurrently in a
+        thread pool of that size through `map_ordered`, which consumes the iterable lazily. Any exception raised by the
+        function is reraised when its result is yielded, just as when the function would have been applied directly.
+
+        .. note:: the function should only read data, such as the content of retrieved files, and should not create any
+            nodes, since the storage backend is not thread-safe. The nodes should be created from the results, which
+            are yielded in the thread of the parser.
+
+        :param function: callable that takes a single element of the iterable
+        :param iterable: iterable of independent elements, such as the lines of stdout
+        :return: generator of the results of the function
+        """
+        from aiida_codtools.common.utils import map_ordered
+
+        workers = self.node.get_option('parser_workers') or 1
+
+        if workers == 1:
+            for element in iterable:
+                yield function(element)
+            return
+
+        for _, future in map_ordered(function, iterable, max_workers=workers):
+            yield future.result()
+
+    @staticmethod
+    def iterate_lines(filelike):
+        """Yield the non-empty lines of the given filelike object in binary mode, decoded and stripped.
+
+        :param filelike: filelike object in binary mode, whose content is assumed to be encoded in `utf-8`
+        :return: generator of lines
+        """
+        for line in filelike:
+            line = line.decode('utf-8').strip()
+            if line:
+                yield line
+
     def parse_stdout(self, filelike):
         """Parse the content written by the script to standard out into a `CifData` object.
 
+        The content is read only once and the `CifData` is constructed from an in-memory buffer of it, instead of
+        reading the file again. A `BytesIO` initialized with bytes shares their memory until it is written to, so this
+        does not copy the content either, which matters for large CIF files.
+
         :param filelike: filelike object of stdout
         :returns: an exit code in case of an error, None otherwise
         """
         from CifFile import StarError
 
-        if not filelike.read().strip():
+        content = filelike.read()
+
+        # Note that `isspace` is False for empty content and, unlike `strip`, does not create a copy of the content
+        if not content or content.isspace():
             return self.exit_codes.ERROR_EMPTY_OUTPUT_FILE
 
+        # Keep the name of the original file, which would otherwise be lost when constructing from the buffer
+        filename = os.path.basename(getattr(filelike, 'name', '')) or None
+
         try:
-            filelike.seek(0)
-            cif = CifData(file=filelike)
+            cif = CifData(file=io.BytesIO(content), filename=filename)
         except StarError:
             self.logger.exception('Failed to parse a `CifData` from the stdout file\n%s', traceback.format_exc())
             return self.exit_codes.ERROR_PARSING_CIF_DATA
@@ -78,25 +129,89 @@ class CifBaseParser(Parser):
     def parse_stderr(self, filelike):
         """Parse the content written by the script to standard err.
 
+        The content is processed line by line, such that the memory usage only depends on the number of distinct
+        messages. If the `attach_messages_file` option is set, the content is compressed into the `messages_file` output
+        in the same pass.
+
         :param filelike: filelike object of stderr
         :returns: an exit code in case of an error, None otherwise
         """
-        marker_error = 'ERROR,'
-        marker_warning = 'WARNING,'
+        if self.node.get_option('attach_messages_file'):
+            import gzip
+            import tempfile
 
-        messages = {'errors': [], 'warnings': []}
+            # Note that a `TemporaryFile` cannot be used, since its `name` is the file descriptor, which is not accepted
+            # by `SinglefileData.set_file`, even if an explicit filename is passed
+            with tempfile.NamedTemporaryFile() as handle:
+                with gzip.GzipFile(fileobj=handle, mode='wb') as archive:
 
-        for line in filelike.readlines():
-            if marker_error in line:
-                messages['errors'].append(line.split(marker_error)[-1].strip())
-            if marker_warning in line:
-                messages['warnings'].append(line.split(marker_warning)[-1].strip())
+                    def iterate_lines():
+                        for line in filelike:
+                            archive.write(line.encode('utf-8'))
+                            yield line
+
+                    errors, warnings = self.count_messages(iterate_lines())
+
+                handle.seek(0)
+                filename = f"{self.node.get_option('error_filename')}.gz"
+                self.out('messages_file', SinglefileData(file=handle, filename=filename))
+        else:
+            errors, warnings = self.count_messages(filelike)
 
         if self.node.get_option('attach_messages'):
+            messages = self.format_messages(errors, warnings, self.node.get_option('max_messages'))
             self.out('messages', Dict(dict=messages))
 
-        for error in messages['errors']:
+        for error in errors:
             if 'unknown option' in error:
                 return self.exit_codes.ERROR_INVALID_COMMAND_LINE_OPTION
 
         return
+
+    @staticmethod
+    def count_messages(lines):
+        """Count the occurrences of each distinct error and warning message in the lines written to standard err.
+
+        :param lines: iterable of lines, such as a filelike object of stderr, which is consumed lazily
+        :returns: tuple of a `collections.Counter` of the error messages and one of the warning messages
+        """
+        marker_error = 'ERROR,'
+        marker_warning = 'WARNING,'
+
+        errors = collections.Counter()
+        warnings = collections.Counter()
+
+        for line in lines:
+            if marker_error in line:
+                errors[line.split(marker_error)[-1].strip()] += 1
+            if marker_warning in line:
+                warnings[line.split(marker_warning)[-1].strip()] += 1
+
+        return errors, warnings
+
+    @staticmethod
+    def format_messages(errors, warnings, max_messages=None):
+        """Return the counted error and warning messages in a dictionary that can be stored in a `Dict` node.
+
+        :param errors: `collections.Counter` of the error messages
+        :param warnings: `collections.Counter` of the warning messages
+        :param max_messages: optional maximum number of distinct errors and of distinct warnings to include
+        :returns: dictionary with the lists of distinct messages, ordered by decreasing number of occurrences, for the
+            keys `errors` and `warnings`, the number of occurrences of each of those messages for the keys
+            `error_counts` and `warning_counts`, the total number of messages, including those that were left out,
+            for the keys `number_of_errors` and `number_of_warnings` and the number of messages per code, as
+            classified by `aiida_codtools.common.messages.classify_message`, for the keys `error_codes` and
+            `warning_codes`
+        """
+        from aiida_codtools.common.messages import count_message_codes
+
+        messages = {}
+
+        for key, counter in (('error', errors), ('warning', warnings)):
+            most_common = counter.most_common(max_messages)
+            messages[f'{key}s'] = [message for message, _ in most_common]
+            messages[f'{key}_counts'] = [count for _, count in most_common]
+            messages[f'number_of_{key}s'] = sum(counter.values())
+            messages[f'{key}_codes'] = count_message_codes(counter)
+
+        return messages
@@ -0,0 +1,103 @@
+# -*- coding: utf-8 -*-
+"""Parser implementation for the `CifBaseBatchCalculation` plugin."""
+import io
+import os
+import traceback
+
+from aiida.common.links import LinkType
+from aiida.orm import CifData, Dict
+
+from aiida_codtools.calculations.cif_base_batch import CifBaseBatchCalculation
+from aiida_codtools.parsers.cif_base import CifBaseParser
+
+
+class CifBaseBatchParser(CifBaseParser):
+    """Parser implementation for the `CifBaseBatchCalculation` plugin.
+
+    The output directory contains a stdout and stderr file for each of the input CIFs, whose base name corresponds to
+    the label of the input. Each stdout file is parsed into a `CifData` that is attached in the `cifs` output namespace
+    under the same label, such that it can be mapped back to the input it originated from. The labels are taken from
+    the inputs of the calculation, such that inputs whose output files are missing, for example because the job was
+    killed before all of them were processed, are reported as failed.
+    """
+
+    # pylint: disable=inconsistent-return-statements
+
+    _supported_calculation_class = CifBaseBatchCalculation
+
+    def parse(self, **kwargs):
+        """Parse the contents of the output files retrieved in the `FolderData`."""
+        from CifFile import StarError
+
+        directory = CifBaseBatchCalculation.directory_output
+
+        try:
+            filenames = set(self.retrieved.list_object_names(directory))
+        except (OSError, IOError):
+            self.logger.exception('Failed to list the output directory\n%s', traceback.format_exc())
+            return self.exit_codes.ERROR_NO_OUTPUT_FILES
+
+        if not filenames:
+            return self.exit_codes.ERROR_NO_OUTPUT_FILES
+
+        cifs = {}
+        failed = []
+        messages = {}
+
+        for label in self.get_input_labels():
+
+            if f'{label}.err' not in filenames or f'{label}.out' not in filenames:
+                self.logger.warning('The output files of `%s` are missing', label)
+                failed.append(label)
+                continue
+
+            try:
+                with self.retrieved.open(os.path.join(directory, f'{label}.err'), 'r') as handle:
+                    errors, warnings = self.count_messages(handle)
+            except (OSError, IOError):
+                self.logger.exception('Failed to read the stderr file of `%s`\n%s', label, traceback.format_exc())
+                return self.exit_codes.ERROR_READING_ERROR_FILE
+
+            if any('unknown option' in error for error in errors):
+                return self.exit_codes.ERROR_INVALID_COMMAND_LINE_OPTION
+
+            messages[label] = self.format_messages(errors, warnings, self.node.get_option('max_messages'))
+
+            try:
+                with self.retrieved.open(os.path.join(directory, f'{label}.out'), 'rb') as handle:
+                    content = handle.read()
+            except (OSError, IOError):
+                self.logger.exception('Failed to read the stdout file of `%s`\n%s', label, traceback.format_exc())
+                return self.exit_codes.ERROR_READING_OUTPUT_FILE
+
+            if not content.strip():
+                self.logger.warning('The stdout file of `%s` is empty', label)
+                failed.append(label)
+                continue
+
+            try:
+                cifs[label] = CifData(file=io.BytesIO(content), filename=f'{label}.cif')
+            except StarError:
+                self.logger.warning('Failed to parse a `CifData` from the stdout file of `%s`', label)
+                failed.append(label)
+
+        if self.node.get_option('attach_messages'):
+            self.out('messages', Dict(dict=messages))
+
+        if not cifs:
+            return self.exit_codes.ERROR_PARSING_CIF_DATA
+
+        self.out('cifs', cifs)
+
+        if failed:
+            return self.exit_codes.ERROR_PARSING_CIF_DATA_PARTIAL
+
+    def get_input_labels(self):
+        """Return the sorted labels of the `CifData` nodes in the `cifs` input namespace of the calculation.
+
+        :return: list of labels
+        """
+        prefix = 'cifs__'
+        triples = self.node.get_incoming(link_type=LinkType.INPUT_CALC).all()
+
+        return sorted(triple.link_label[len(prefix):] for triple in triples if triple.link_label.startswith(prefix))
@@ -17,28 +17,28 @@ class CifCellContentsParser(CifBaseParser):
     def parse_stdout(self, filelike):
         """Parse the formulae from the content written by the script to standard out.
 
+        Each line contains the name of a data block and its formula. The lines are parsed serially: the work per line
+        is a single regular expression split that holds the GIL, and all results go into a single `Dict`, so there is
+        no I/O that threads could overlap and a thread pool through `map_outputs` would only add overhead.
+
         :param filelike: filelike object of stdout
         :returns: an exit code in case of an error, None otherwise
         """
         from aiida.orm import Dict
 
         formulae = {}
-        content = filelike.read().strip()
-
-        if not content:
-            return self.exit_codes.ERROR_EMPTY_OUTPUT_FILE
-
-        # The filelike should be in binary mode, so we should decode the bytes, assuming the content is in `utf-8`
-        content = content.decode('utf-8')
 
         try:
-            for line in content.split('\n'):
-                datablock, formula = re.split(r'\s+', line.strip(), 1)
+            for line in self.iterate_lines(filelike):
+                datablock, formula = re.split(r'\s+', line, 1)
                 formulae[datablock] = formula
         except Exception:  # pylint: disable=broad-except
             self.logger.exception('Failed to parse formulae from the stdout file\n%s', traceback.format_exc())
             return self.exit_codes.ERROR_PARSING_OUTPUT_DATA
-        else:
-            self.out('formulae', Dict(dict=formulae))
+
+        if not formulae:
+            return self.exit_codes.ERROR_EMPTY_OUTPUT_FILE
+
+        self.out('formulae', Dict(dict=formulae))
 
         return
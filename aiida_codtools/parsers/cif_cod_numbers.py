@@ -17,28 +17,27 @@ class CifCodNumbersParser(CifBaseParser):
     def parse_stdout(self, filelike):
         """Parse the content written by the script to standard out.
 
+        Each line contains the formula, the COD ID, the count and the filename. The lines are parsed serially, for the
+        same reason as in `CifCellContentsParser.parse_stdout`.
+
         :param filelike: filelike object of stdout
         :returns: an exit code in case of an error, None otherwise
         """
         from aiida.orm import Dict
 
         numbers = {}
-        content = filelike.read().strip()
-
-        if not content:
-            return self.exit_codes.ERROR_EMPTY_OUTPUT_FILE
-
-        # The filelike should be in binary mode, so we should decode the bytes, assuming the content is in `utf-8`
-        content = content.decode('utf-8')
 
         try:
-            for line in content.split('\n'):
-                formula, identifier, count, _ = re.split(r'\s+', line.strip())
+            for line in self.iterate_lines(filelike):
+                formula, identifier, count, _ = re.split(r'\s+', line)
                 numbers[identifier] = {'count': int(count), 'formula': formula}
         except Exception:  # pylint: disable=broad-except
             self.logger.exception('Failed to parse the numbers from the stdout file\n%s', traceback.format_exc())
             return self.exit_codes.ERROR_PARSING_OUTPUT_DATA
-        else:
-            self.out('numbers', Dict(dict=numbers))
+
+        if not numbers:
+            return self.exit_codes.ERROR_EMPTY_OUTPUT_FILE
+
+        self.out('numbers', Dict(dict=numbers))
 
         return
@@ -0,0 +1,21 @@
+# -*- coding: utf-8 -*-
+"""Parser implementation for the `CifFilterSelectCalculation` plugin."""
+import itertools
+
+from aiida_codtools.calculations.cif_filter_select import CifFilterSelectCalculation
+from aiida_codtools.parsers.cif_base import CifBaseParser
+
+
+class CifFilterSelectParser(CifBaseParser):
+    """Parser implementation for the `CifFilterSelectCalculation` plugin."""
+
+    _supported_calculation_class = CifFilterSelectCalculation
+
+    def parse_stderr(self, filelike):
+        """Parse the content written by both the `cif_filter` and `cif_select` script to standard err.
+
+        :param filelike: filelike object of stderr of the `cif_select` script
+        :returns: an exit code in case of an error, None otherwise
+        """
+        with self.retrieved.open(CifFilterSelectCalculation.filename_filter_error, 'r') as handle:
+            return super().parse_stderr(itertools.chain(handle, filelike))
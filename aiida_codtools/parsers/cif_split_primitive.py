@@ -1,5 +1,6 @@
 # -*- coding: utf-8 -*-
 """Parser implementation for the `CifSplitPrimitiveCalculation` plugin."""
+import io
 import os
 import traceback
 
@@ -18,32 +19,37 @@ class CifSplitPrimitiveParser(CifBaseParser):
         """Parse the content written by the script to standard out.
 
         The standard output will contain a list of relative filepaths where the generated CIF files have been written.
+        The list is processed line by line, creating a `CifData` for each file with the `parse_policy` option of the
+        calculation. With the `lazy` policy, the files are not parsed by PyCifRW, which otherwise dominates the time
+        spent by the parser for CIFs with many data blocks. The files are independent, so they can be read concurrently,
+        see `map_outputs`. The `CifData` nodes themselves are always created in the thread of the parser.
 
         :param filelike: filelike object of stdout
         :returns: an exit code in case of an error, None otherwise
         """
         from aiida.orm import CifData
 
-        content = filelike.read().strip()
+        parse_policy = self.node.get_option('parse_policy') or 'eager'
+        cifs = {}
 
-        if not content:
-            return self.exit_codes.ERROR_EMPTY_OUTPUT_FILE
+        # Resolve the retrieved folder once, since the property queries the database, which is not thread-safe
+        retrieved = self.retrieved
 
-        # The filelike should be in binary mode, so we should decode the bytes, assuming the content is in `utf-8`
-        content = content.decode('utf-8')
+        def read_file(filename):
+            with retrieved.open(filename, 'rb') as handle:
+                return os.path.basename(filename), handle.read()
 
         try:
-            cifs = {}
-            for line in content.split('\n'):
-                filename = line.strip()
-                output_name = os.path.splitext(os.path.basename(filename))[0]
-                with self.retrieved.open(filename, 'rb') as handle:
-                    cifs[output_name] = CifData(file=handle)
-
+            for filename, content in self.map_outputs(read_file, self.iterate_lines(filelike)):
+                output_name = os.path.splitext(filename)[0]
+                cifs[output_name] = CifData(file=io.BytesIO(content), filename=filename, parse_policy=parse_policy)
         except Exception:  # pylint: disable=broad-except
             self.logger.exception('Failed to open a generated from the stdout file\n%s', traceback.format_exc())
             return self.exit_codes.ERROR_PARSING_OUTPUT_DATA
 
+        if not cifs:
+            return self.exit_codes.ERROR_EMPTY_OUTPUT_FILE
+
         self.out('cifs', cifs)
 
         return
@@ -8,16 +8,33 @@ from aiida.engine import ToContext, WorkChain, if_
 from aiida.plugins import CalculationFactory
 
 CifFilterCalculation = CalculationFactory('codtools.cif_filter')  # pylint: disable=invalid-name
+CifFilterSelectCalculation = CalculationFactory('codtools.cif_filter_select')  # pylint: disable=invalid-name
 CifSelectCalculation = CalculationFactory('codtools.cif_select')  # pylint: disable=invalid-name
 
+EXTRA_DEDUPLICATION_KEY = 'codtools_cif_clean_key'
+
 
 class CifCleanWorkChain(WorkChain):
     """WorkChain to clean a `CifData` node using the `cif_filter` and `cif_select` scripts of `cod-tools`.
 
     It will first run `cif_filter` to correct syntax errors, followed by `cif_select` which will canonicalize the tags.
+    If the `pipeline` input is set to True, both scripts are chained in a single `CifFilterSelectCalculation` instead,
+    using the codes, parameters and the options of the `cif_filter` namespace.
     If a group is passed for the `group_structure` input, the atomic structure library defined by the `engine` input
     will be used to parse the final cleaned `CifData` to construct a `StructureData` object, which will then be passed
     to the `SeeKpath` library to analyze it and return the primitive structure
+
+    A deduplication key, computed from the normalized content of the input `CifData` and the inputs that determine the
+    result, is stored in the extras of the workchain node under `EXTRA_DEDUPLICATION_KEY`. If the `deduplicate` input
+    is set to True and a previous workchain with the same key finished successfully, its outputs are returned directly
+    instead of running any of the calculations. If only the `cache_structure` input is set to True, the calculations
+    are run, but the primitive structure is taken from the cache if a cleaned `CifData` with the same content was
+    already parsed with the same inputs, see `get_cached_primitive_structure`.
+
+    If the structure should be parsed and the `precheck` input is set to True, the raw content of the input `CifData`
+    is first scanned for conditions that are certain to make the parsing of the structure fail, see
+    `get_precheck_exit_code`, in which case the workchain exits with the corresponding exit code before running any of
+    the calculations.
     """
 
     @classmethod
@@ -34,18 +51,39 @@ class CifCleanWorkChain(WorkChain):
             help='The symmetry precision used by SeeKpath for crystal symmetry refinement.')
         spec.input('site_tolerance', valid_type=orm.Float, default=lambda: orm.Float(5E-4),
             help='The fractional coordinate distance tolerance for finding overlapping sites (pymatgen only).')
+        spec.input('pipeline', valid_type=orm.Bool, default=lambda: orm.Bool(False),
+            help='When True, run `cif_filter` and `cif_select` chained in a single `CifFilterSelectCalculation`.')
+        spec.input('precheck', valid_type=orm.Bool, default=lambda: orm.Bool(False),
+            help='When True, exit before cleaning if the raw CifData is certain to fail the parsing of the structure.')
+        spec.input('deduplicate', valid_type=orm.Bool, default=lambda: orm.Bool(False),
+            help='When True, return the outputs of a previous successful workchain for the same content and inputs.')
+        spec.input('cache_structure', valid_type=orm.Bool, default=lambda: orm.Bool(False),
+            help='When True, reuse the primitive structure previously parsed from a CifData with identical content.')
         spec.input('group_cif', valid_type=orm.Group, required=False, non_db=True,
             help='An optional Group to which the final cleaned CifData node will be added.')
         spec.input('group_structure', valid_type=orm.Group, required=False, non_db=True,
             help='An optional Group to which the final reduced StructureData node will be added.')
 
         spec.outline(
-            cls.run_filter_calculation,
-            cls.inspect_filter_calculation,
-            cls.run_select_calculation,
-            cls.inspect_select_calculation,
-            if_(cls.should_parse_cif_structure)(
-                cls.parse_cif_structure,
+            cls.setup,
+            if_(cls.should_reuse_previous)(
+                cls.reuse_previous,
+            ).else_(
+                if_(cls.should_run_precheck)(
+                    cls.run_precheck,
+                ),
+                if_(cls.should_run_pipeline)(
+                    cls.run_pipeline_calculation,
+                    cls.inspect_pipeline_calculation,
+                ).else_(
+                    cls.run_filter_calculation,
+                    cls.inspect_filter_calculation,
+                    cls.run_select_calculation,
+                    cls.inspect_select_calculation,
+                ),
+                if_(cls.should_parse_cif_structure)(
+                    cls.parse_cif_structure,
+                ),
             ),
             cls.results,
         )
@@ -59,6 +97,8 @@ class CifCleanWorkChain(WorkChain):
             message='The CifFilterCalculation step failed.')
         spec.exit_code(402, 'ERROR_CIF_SELECT_FAILED',
             message='The CifSelectCalculation step failed.')
+        spec.exit_code(403, 'ERROR_CIF_FILTER_SELECT_FAILED',
+            message='The CifFilterSelectCalculation step failed.')
         spec.exit_code(410, 'ERROR_CIF_HAS_UNKNOWN_SPECIES',
             message='The cleaned CifData contains sites with unknown species.')
         spec.exit_code(411, 'ERROR_CIF_HAS_UNDEFINED_ATOMIC_SITES',
@@ -74,6 +114,121 @@ class CifCleanWorkChain(WorkChain):
         spec.exit_code(421, 'ERROR_SEEKPATH_INCONSISTENT_SYMMETRY',
             message='SeeKpath detected inconsistent symmetry operations.')
 
+    def setup(self):
+        """Compute the deduplication key and store it in the extras of the node."""
+        self.ctx.key = self.get_deduplication_key()
+        self.node.set_extra(EXTRA_DEDUPLICATION_KEY, self.ctx.key)
+
+    def get_deduplication_key(self):
+        """Return the deduplication key for the inputs of this workchain.
+
+        The key is a hash of the normalized content of the input `CifData`, the codes and parameters of the `cif_filter`
+        and `cif_select` namespaces and, if the structure should be parsed, the inputs that control the parsing.
+
+        :return: the hexadecimal digest of the key
+        """
+        import hashlib
+        import json
+
+        from aiida_codtools.common.cif import get_content_hash
+
+        key = {'cif': get_content_hash(self.inputs.cif.get_content())}
+
+        for namespace in ['cif_filter', 'cif_select']:
+            inputs = self.inputs[namespace]
+            key[namespace] = {
+                'code': inputs.code.uuid,
+                'parameters': inputs.parameters.get_dict() if 'parameters' in inputs else {},
+            }
+
+        if self.should_parse_cif_structure():
+            for name in ['parse_engine', 'symprec', 'site_tolerance']:
+                key[name] = self.inputs[name].value
+
+        return hashlib.sha256(json.dumps(key, sort_keys=True).encode('utf-8')).hexdigest()
+
+    def should_reuse_previous(self):
+        """Return whether a previous successful workchain with the same deduplication key should be reused."""
+        if not self.inputs.deduplicate.value:
+            return False
+
+        filters = {
+            'id': {'!==': self.node.pk},
+            f'extras.{EXTRA_DEDUPLICATION_KEY}': self.ctx.key,
+            'attributes.exit_status': 0,
+        }
+        builder = orm.QueryBuilder().append(CifCleanWorkChain, filters=filters, project='*', tag='workchain')
+        builder.order_by({'workchain': {'id': 'desc'}})
+        result = builder.first()
+
+        if result is None:
+            return False
+
+        self.ctx.previous = result[0]
+        return True
+
+    def reuse_previous(self):
+        """Take the outputs of the previous workchain with the same deduplication key."""
+        previous = self.ctx.previous
+        self.ctx.cif = previous.outputs.cif
+
+        if 'structure' in previous.outputs:
+            self.ctx.structure = previous.outputs.structure
+
+        self.report(f'reusing the outputs of {CifCleanWorkChain.__name__}<{previous.pk}> with identical inputs')
+
+    def should_run_precheck(self):
+        """Return whether the raw input `CifData` should be checked for conditions that make the parsing fail."""
+        return self.inputs.precheck.value and self.should_parse_cif_structure()
+
+    def run_precheck(self):
+        """Check the raw input `CifData` for conditions that are certain to make the parsing of the structure fail."""
+        exit_code = get_precheck_exit_code(self.inputs.cif)
+
+        if exit_code is not None:
+            self.report(f'aborting: precheck of the raw CifData failed: {exit_code.message}')
+            return exit_code
+
+    def should_run_pipeline(self):
+        """Return whether `cif_filter` and `cif_select` should be chained in a single `CifFilterSelectCalculation`."""
+        return self.inputs.pipeline.value
+
+    def run_pipeline_calculation(self):
+        """Run the CifFilterSelectCalculation on the CifData input node."""
+        inputs_filter = self.exposed_inputs(CifFilterCalculation, namespace='cif_filter')
+        inputs_select = self.exposed_inputs(CifSelectCalculation, namespace='cif_select')
+
+        inputs = {
+            'cif': self.inputs.cif,
+            'code': inputs_filter.code,
+            'select_code': inputs_select.code,
+            'metadata': inputs_filter.metadata,
+        }
+
+        if 'parameters' in inputs_filter:
+            inputs['parameters'] = inputs_filter.parameters
+
+        if 'parameters' in inputs_select:
+            inputs['select_parameters'] = inputs_select.parameters
+
+        # The options of the `cif_filter` namespace define the parser of `CifFilterCalculation`, which shouldn't be used
+        inputs['metadata']['options'].pop('parser_name', None)
+        inputs['metadata']['call_link_label'] = 'cif_filter_select'
+
+        calculation = self.submit(CifFilterSelectCalculation, **inputs)
+        self.report(f'submitted {CifFilterSelectCalculation.__name__}<{calculation.uuid}>')
+
+        return ToContext(cif_filter_select=calculation)
+
+    def inspect_pipeline_calculation(self):
+        """Inspect the result of the CifFilterSelectCalculation, verifying that it produced a CifData output node."""
+        try:
+            node = self.ctx.cif_filter_select
+            self.ctx.cif = node.outputs.cif
+        except exceptions.NotExistent:
+            self.report(f'aborting: CifFilterSelectCalculation<{node.uuid}> did not return the required cif output')
+            return self.exit_codes.ERROR_CIF_FILTER_SELECT_FAILED
+
     def run_filter_calculation(self):
         """Run the CifFilterCalculation on the CifData input node."""
         inputs = self.exposed_inputs(CifFilterCalculation, namespace='cif_filter')
@@ -120,42 +275,16 @@ class CifCleanWorkChain(WorkChain):
 
     def parse_cif_structure(self):
         """Parse a `StructureData` from the cleaned `CifData` returned by the `CifSelectCalculation`."""
-        from aiida_codtools.calculations.functions.primitive_structure_from_cif import primitive_structure_from_cif
-
-        if self.ctx.cif.has_unknown_species:
-            self.ctx.exit_code = self.exit_codes.ERROR_CIF_HAS_UNKNOWN_SPECIES
-            self.report(self.ctx.exit_code.message)
-            return
-
-        if self.ctx.cif.has_undefined_atomic_sites:
-            self.ctx.exit_code = self.exit_codes.ERROR_CIF_HAS_UNDEFINED_ATOMIC_SITES
-            self.report(self.ctx.exit_code.message)
-            return
-
-        if self.ctx.cif.has_attached_hydrogens:
-            self.ctx.exit_code = self.exit_codes.ERROR_CIF_HAS_ATTACHED_HYDROGENS
-            self.report(self.ctx.exit_code.message)
-            return
-
-        parse_inputs = {
-            'cif': self.ctx.cif,
-            'parse_engine': self.inputs.parse_engine,
-            'site_tolerance': self.inputs.site_tolerance,
-            'symprec': self.inputs.symprec,
-            'metadata': {
-                'call_link_label': 'primitive_structure_from_cif'
-            }
-        }
-
-        try:
-            structure, node = primitive_structure_from_cif.run_get_node(**parse_inputs)
-        except Exception:  # pylint: disable=broad-except
-            self.ctx.exit_code = self.exit_codes.ERROR_CIF_STRUCTURE_PARSING_FAILED
-            self.report(self.ctx.exit_code.message)
-            return
+        structure, exit_code = get_primitive_structure(
+            self.ctx.cif,
+            self.inputs.parse_engine,
+            self.inputs.symprec,
+            self.inputs.site_tolerance,
+            use_cache=self.inputs.cache_structure.value
+        )
 
-        if node.is_failed:
-            self.ctx.exit_code = self.exit_codes(node.exit_status)  # pylint: disable=too-many-function-args
+        if exit_code is not None:
+            self.ctx.exit_code = exit_code
             self.report(self.ctx.exit_code.message)
         else:
             self.ctx.structure = structure
@@ -183,3 +312,154 @@ class CifCleanWorkChain(WorkChain):
                 self.out('structure', structure)
 
         self.report('workchain finished successfully')
+
+
+def get_cif_exit_code(cif):
+    """Check the cleaned `CifData` for conditions that are known to make the parsing of its structure fail.
+
+    :param cif: the cleaned `CifData` node
+    :return: the exit code of the `CifCleanWorkChain` that corresponds to the first failed condition or None
+    """
+    exit_codes = CifCleanWorkChain.exit_codes
+
+    if cif.has_unknown_species:
+        return exit_codes.ERROR_CIF_HAS_UNKNOWN_SPECIES
+
+    if cif.has_undefined_atomic_sites:
+        return exit_codes.ERROR_CIF_HAS_UNDEFINED_ATOMIC_SITES
+
+    if cif.has_attached_hydrogens:
+        return exit_codes.ERROR_CIF_HAS_ATTACHED_HYDROGENS
+
+    return None
+
+
+def get_precheck_exit_code(cif):
+    """Predict from the raw content of a `CifData` whether `get_cif_exit_code` will fail for the cleaned `CifData`.
+
+    This is a cheap equivalent of `get_cif_exit_code` that scans the raw content with `scan_tag_values` instead of
+    parsing it with PyCifRW, such that it can be run before cleaning. Since the content can still be changed by the
+    cleaning, a condition is only reported if there is positive evidence for it in the tags that are not changed by
+    `cif_filter` and `cif_select` with their default parameters. Values that are empty or that could not be scanned,
+    such as those in text fields, are therefore skipped. That is to say, if None is returned, the parsing can still
+    fail.
+
+    :param cif: the raw `CifData` node
+    :return: the exit code of the `CifCleanWorkChain` that corresponds to the first condition that is certain to fail
+        or None
+    """
+    from aiida.common.constants import elements
+    from aiida.orm.nodes.data.cif import parse_formula
+
+    from aiida_codtools.common.cif import parse_float, scan_tag_values
+
+    exit_codes = CifCleanWorkChain.exit_codes
+    tags_fract = ['_atom_site_fract_x', '_atom_site_fract_y', '_atom_site_fract_z']
+    tag_formula = '_chemical_formula_sum'
+    tag_hydrogens = '_atom_site_attached_hydrogens'
+    values = scan_tag_values(cif.get_content(), tags_fract + [tag_formula, tag_hydrogens])
+
+    values = {tag: [value for value in tag_values if value] for tag, tag_values in values.items()}
+    known_species = {element['symbol'] for element in elements.values() if element['symbol'] != 'X'}
+
+    for formula in values[tag_formula]:
+        if formula in ['.', '?']:
+            continue
+
+        try:
+            species = parse_formula(formula).keys()
+        except Exception:  # pylint: disable=broad-except
+            continue
+
+        if any(specie not in known_species for specie in species):
+            return exit_codes.ERROR_CIF_HAS_UNKNOWN_SPECIES
+
+    if any(parse_float(value) is None for tag in tags_fract for value in values[tag]):
+        return exit_codes.ERROR_CIF_HAS_UNDEFINED_ATOMIC_SITES
+
+    if any(value not in ['.', '?', '0'] for value in values[tag_hydrogens]):
+        return exit_codes.ERROR_CIF_HAS_ATTACHED_HYDROGENS
+
+    return None
+
+
+def get_cached_primitive_structure(cif, parse_engine, symprec, site_tolerance):
+    """Return the primitive `StructureData` previously parsed from a `CifData` with the same content and inputs.
+
+    The calculation functions that parse the primitive structure store the key returned by `get_primitive_structure_key`
+    in the extras of the structure, which is therefore used as a database-backed cache. Since the entries of the cache
+    are the structures themselves, which are part of the provenance, the cache is never evicted. If multiple structures
+    match, the most recent one is returned.
+
+    :param cif: the cleaned `CifData` node
+    :param parse_engine: a `Str` node with the parsing engine, supported libraries 'ase' and 'pymatgen'
+    :param symprec: a `Float` node with symmetry precision for determining primitive cell in SeeKpath
+    :param site_tolerance: a `Float` node with the fractional coordinate distance tolerance for finding overlapping
+        sites. This will only be used if the parse_engine is pymatgen
+    :return: the cached `StructureData` or None if there is no match
+    """
+    from aiida_codtools.common.structure import EXTRA_PRIMITIVE_STRUCTURE_KEY, get_primitive_structure_key
+
+    key = get_primitive_structure_key(cif.get_content(), parse_engine.value, symprec.value, site_tolerance.value)
+    filters = {f'extras.{EXTRA_PRIMITIVE_STRUCTURE_KEY}': key}
+
+    builder = orm.QueryBuilder().append(orm.StructureData, filters=filters, project='*', tag='structure')
+    builder.order_by({'structure': {'id': 'desc'}})
+    result = builder.first()
+
+    return result[0] if result is not None else None
+
+
+def get_primitive_structure(cif, parse_engine, symprec, site_tolerance, use_cache=False):
+    """Parse the primitive `StructureData` from a cleaned `CifData` through `primitive_structure_from_cif`.
+
+    If `use_cache` is True, a structure that was previously parsed from a `CifData` with the same content and inputs is
+    returned, if it exists. This lookup only requires the hash of the content and is done first, since content that
+    was parsed successfully before necessarily passes the checks. Otherwise, the `CifData` is checked for conditions
+    that are known to make the parsing fail, which requires parsing the content, in which case the function is not even
+    called. When called from within a process, the calculation function will be linked to it as a child.
+
+    :param cif: the cleaned `CifData` node
+    :param parse_engine: a `Str` node with the parsing engine, supported libraries 'ase' and 'pymatgen'
+    :param symprec: a `Float` node with symmetry precision for determining primitive cell in SeeKpath
+    :param site_tolerance: a `Float` node with the fractional coordinate distance tolerance for finding overlapping
+        sites. This will only be used if the parse_engine is pymatgen
+    :param use_cache: whether to return a previously parsed structure from `get_cached_primitive_structure`
+    :return: tuple of the primitive `StructureData` and None if successful, otherwise a tuple of None and the exit code
+        of the `CifCleanWorkChain` that corresponds to the failure
+    """
+    from aiida_codtools.calculations.functions.primitive_structure_from_cif import primitive_structure_from_cif
+
+    exit_codes = CifCleanWorkChain.exit_codes
+
+    # A cached structure was parsed from identical content, which therefore already passed the checks
+    if use_cache:
+        structure = get_cached_primitive_structure(cif, parse_engine, symprec, site_tolerance)
+
+        if structure is not None:
+            return structure, None
+
+    exit_code = get_cif_exit_code(cif)
+
+    if exit_code is not None:
+        return None, exit_code
+
+    parse_inputs = {
+        'cif': cif,
+        'parse_engine': parse_engine,
+        'site_tolerance': site_tolerance,
+        'symprec': symprec,
+        'metadata': {
+            'call_link_label': 'primitive_structure_from_cif'
+        }
+    }
+
+    try:
+        structure, node = primitive_structure_from_cif.run_get_node(**parse_inputs)
+    except Exception:  # pylint: disable=broad-except
+        return None, exit_codes.ERROR_CIF_STRUCTURE_PARSING_FAILED
+
+    if node.is_failed:
+        return None, exit_codes(node.exit_status)  # pylint: disable=too-many-function-args
+
+    return structure, None
@@ -0,0 +1,331 @@
+# -*- coding: utf-8 -*-
+"""WorkChain to clean many `CifData` nodes in chunks using batched `cif_filter` and `cif_select` calculations."""
+# pylint: disable=inconsistent-return-statements,no-member
+from aiida import orm
+from aiida.common.links import LinkType
+from aiida.engine import WorkChain, append_, calcfunction, if_, while_
+from aiida.plugins import CalculationFactory, WorkflowFactory
+
+from aiida_codtools.workflows.cif_clean import CifCleanWorkChain, get_cached_primitive_structure, get_cif_exit_code
+
+CifBaseBatchCalculation = CalculationFactory('codtools.cif_base_batch')  # pylint: disable=invalid-name
+PrimitiveStructuresWorkChain = WorkflowFactory('codtools.primitive_structures')  # pylint: disable=invalid-name
+
+
+@calcfunction
+def create_summary(totals):
+    """Create the summary of the results of a `CifCleanBulkWorkChain`.
+
+    :param totals: a `Dict` node that maps each exit status, as a string key, on the number of inputs with that status
+    :return: a `Dict` with the number of inputs for each exit status and the total number of inputs
+    """
+    totals = totals.get_dict()
+    return orm.Dict(dict={'totals': totals, 'number_of_cifs': sum(totals.values())})
+
+
+def get_nodes(pks):
+    """Return the nodes with the given pks, loaded with a single query.
+
+    :param pks: list of pks
+    :return: dictionary mapping each pk on its node
+    """
+    builder = orm.QueryBuilder().append(orm.Node, filters={'id': {'in': list(pks)}})
+    return {node.pk: node for node, in builder.iterall()} if pks else {}
+
+
+class CifCleanBulkWorkChain(WorkChain):
+    """WorkChain to clean many `CifData` nodes in chunks using batched `cif_filter` and `cif_select` calculations.
+
+    This is the bulk equivalent of the `CifCleanWorkChain`. Instead of launching a separate workchain with two
+    calculations for each `CifData`, the nodes are split in chunks of `chunk_size` and each chunk is cleaned by a
+    single `CifBaseBatchCalculation` for `cif_filter` followed by one for `cif_select`. If a group is passed for the
+    `group_structure` input, the primitive structure is parsed for each cleaned `CifData` in the same way as the
+    `CifCleanWorkChain` does, except that each chunk is parsed by a separately submitted `PrimitiveStructuresWorkChain`.
+
+    The nodes are processed in waves of at most `max_concurrent_batches` chunks, in order of increasing pk. Each wave
+    queries the next nodes with a pk larger than the last one of the previous wave, which serves as a cursor, such that
+    neither the number of calculations that are submitted at the same time nor the size of the context depend on the
+    total number of nodes. At the end of each wave, the cleaned `CifData` and primitive `StructureData` are added to
+    the groups, if specified, and the result of each input, which is the exit status of the `CifCleanWorkChain` that
+    corresponds to it, is counted. The counts are attached in the `summary` output.
+    """
+
+    @classmethod
+    def define(cls, spec):
+        # yapf: disable
+        super().define(spec)
+        spec.expose_inputs(CifBaseBatchCalculation, namespace='cif_filter', exclude=('cifs',))
+        spec.expose_inputs(CifBaseBatchCalculation, namespace='cif_select', exclude=('cifs',))
+        spec.input_namespace('cifs', valid_type=orm.CifData, dynamic=True, required=False,
+            help='The CifData nodes that are to be cleaned.')
+        spec.input('group', valid_type=orm.Group, required=False, non_db=True,
+            help='A Group whose CifData nodes are to be cleaned, in addition to those of the `cifs` namespace.')
+        spec.input('chunk_size', valid_type=orm.Int, default=lambda: orm.Int(100),
+            help='The number of CifData nodes that are cleaned by a single batch calculation.')
+        spec.input('max_concurrent_batches', valid_type=orm.Int, default=lambda: orm.Int(10),
+            help='The number of chunks per wave, which bounds the number of calculations submitted at the same time.')
+        spec.input('parse_engine', valid_type=orm.Str, default=lambda: orm.Str('pymatgen'),
+            help='The atomic structure engine to parse the cif and create the structure.')
+        spec.input('symprec', valid_type=orm.Float, default=lambda: orm.Float(5E-3),
+            help='The symmetry precision used by SeeKpath for crystal symmetry refinement.')
+        spec.input('site_tolerance', valid_type=orm.Float, default=lambda: orm.Float(5E-4),
+            help='The fractional coordinate distance tolerance for finding overlapping sites (pymatgen only).')
+        spec.input('max_workers', valid_type=orm.Int, required=False,
+            help='The maximum number of worker processes used to parse the structures of each chunk, by default the '
+                 'number of processors of the machine.')
+        spec.input('cache_structure', valid_type=orm.Bool, default=lambda: orm.Bool(False),
+            help='When True, reuse the primitive structures previously parsed from CifData with identical content.')
+        spec.input('group_cif', valid_type=orm.Group, required=False, non_db=True,
+            help='An optional Group to which the final cleaned CifData nodes will be added.')
+        spec.input('group_structure', valid_type=orm.Group, required=False, non_db=True,
+            help='An optional Group to which the final reduced StructureData nodes will be added.')
+
+        spec.outline(
+            cls.setup,
+            while_(cls.should_run_wave)(
+                cls.run_filter_calculations,
+                cls.inspect_filter_calculations,
+                cls.run_select_calculations,
+                cls.inspect_select_calculations,
+                if_(cls.should_parse_cif_structures)(
+                    cls.run_parse_cif_structures,
+                    cls.inspect_parse_cif_structures,
+                ),
+                cls.finalize_wave,
+            ),
+            cls.results,
+        )
+
+        spec.output('summary', valid_type=orm.Dict,
+            help='The number of inputs for each exit status of the `CifCleanWorkChain` that corresponds to its result.')
+
+        spec.exit_code(400, 'ERROR_NO_CIFS',
+            message='Neither the `cifs` nor the `group` input defined any CifData nodes to be cleaned.')
+        spec.exit_code(401, 'ERROR_ALL_FAILED',
+            message='None of the CifData nodes could be successfully cleaned.')
+
+    def setup(self):
+        """Initialize the cursor and the counters and verify that there are `CifData` nodes to be cleaned."""
+        self.ctx.last_pk = -1
+        self.ctx.totals = {}
+
+        if not self.get_next_pks(1):
+            return self.exit_codes.ERROR_NO_CIFS
+
+    def get_next_pks(self, limit):
+        """Return the pks of the first `CifData` nodes to be cleaned with a pk larger than the cursor.
+
+        :param limit: the maximum number of pks to return
+        :return: sorted list of at most `limit` pks
+        """
+        pks = {node.pk for node in self.inputs.get('cifs', {}).values() if node.pk > self.ctx.last_pk}
+
+        if 'group' in self.inputs:
+            builder = orm.QueryBuilder()
+            builder.append(orm.Group, filters={'id': self.inputs.group.pk}, tag='group')
+            builder.append(orm.CifData, with_group='group', filters={'id': {'>': self.ctx.last_pk}}, project='id',
+                tag='cif')
+            builder.order_by({'cif': {'id': 'asc'}})
+            builder.limit(limit)
+            pks.update(pk for pk, in builder.iterall())
+
+        return sorted(pks)[:limit]
+
+    def should_run_wave(self):
+        """Return whether there are `CifData` nodes left to be cleaned, in which case the next wave is initialized."""
+        pks = self.get_next_pks(self.inputs.chunk_size.value * self.inputs.max_concurrent_batches.value)
+
+        if not pks:
+            return False
+
+        for key in ('cif_filter', 'cif_select', 'primitive_structures'):
+            self.ctx.pop(key, None)
+
+        self.ctx.pks = pks
+        self.ctx.cifs = {}
+        self.ctx.parsing = []
+        self.ctx.results = {str(pk): {'exit_status': None} for pk in pks}
+
+        return True
+
+    def get_chunks(self, pks):
+        """Return the list of pks split into chunks of at most `chunk_size` elements.
+
+        :param pks: list of pks of `CifData` nodes
+        :return: list of chunks, each of which is a list of pks
+        """
+        chunk_size = self.inputs.chunk_size.value
+        return [pks[index:index + chunk_size] for index in range(0, len(pks), chunk_size)]
+
+    def submit_batches(self, namespace, pks):
+        """Submit a `CifBaseBatchCalculation` with the inputs of the given namespace for each chunk of the given pks.
+
+        :param namespace: the namespace of the exposed inputs of the `CifBaseBatchCalculation`
+        :param pks: list of pks of `CifData` nodes
+        """
+        for chunk in self.get_chunks(pks):
+            inputs = self.exposed_inputs(CifBaseBatchCalculation, namespace=namespace)
+            inputs.metadata.call_link_label = f'{namespace}_{chunk[0]}'
+            inputs.cifs = {f'cif_{pk}': node for pk, node in get_nodes(chunk).items()}
+
+            calculation = self.submit(CifBaseBatchCalculation, **inputs)
+            self.report(f'submitted {CifBaseBatchCalculation.__name__}<{calculation.uuid}> for {namespace}')
+            self.to_context(**{namespace: append_(calculation)})
+
+    def collect_batches(self, namespace):
+        """Collect the `CifData` outputs of the `CifBaseBatchCalculation` submitted for the given namespace.
+
+        Note that a batch calculation that failed for part of its inputs will still have attached the outputs of the
+        inputs that were successful.
+
+        :param namespace: the namespace of the exposed inputs of the `CifBaseBatchCalculation`
+        :return: dictionary mapping the pk of the input `CifData`, as a string, on the pk of the produced `CifData`
+        """
+        cifs = {}
+
+        for calculation in self.ctx.get(namespace, []):
+            outputs = calculation.get_outgoing(link_type=LinkType.CREATE, link_label_filter='cifs__%').all()
+            cifs.update({triple.link_label[len('cifs__cif_'):]: triple.node.pk for triple in outputs})
+
+            if not calculation.is_finished_ok:
+                self.report(f'{CifBaseBatchCalculation.__name__}<{calculation.pk}> failed: {calculation.exit_status}')
+
+        return cifs
+
+    def set_failed(self, exit_code):
+        """Assign the given exit code to all inputs without a result that do not have a cleaned `CifData`.
+
+        :param exit_code: the exit code to assign
+        """
+        for pk, result in self.ctx.results.items():
+            if result['exit_status'] is None and pk not in self.ctx.cifs:
+                result['exit_status'] = exit_code.status
+
+    def run_filter_calculations(self):
+        """Run a batched `cif_filter` calculation for each chunk of the `CifData` nodes."""
+        self.submit_batches('cif_filter', self.ctx.pks)
+
+    def inspect_filter_calculations(self):
+        """Collect the `CifData` nodes produced by the `cif_filter` calculations."""
+        self.ctx.cifs = self.collect_batches('cif_filter')
+        self.set_failed(CifCleanWorkChain.exit_codes.ERROR_CIF_FILTER_FAILED)
+
+    def run_select_calculations(self):
+        """Run a batched `cif_select` calculation for each chunk of the `CifData` nodes produced by `cif_filter`."""
+        self.submit_batches('cif_select', sorted(self.ctx.cifs.values()))
+
+    def inspect_select_calculations(self):
+        """Collect the `CifData` nodes produced by the `cif_select` calculations and map them onto the inputs."""
+        filtered = {str(pk_filtered): pk for pk, pk_filtered in self.ctx.cifs.items()}
+        selected = self.collect_batches('cif_select')
+
+        self.ctx.cifs = {filtered[pk_filtered]: pk for pk_filtered, pk in selected.items()}
+        self.set_failed(CifCleanWorkChain.exit_codes.ERROR_CIF_SELECT_FAILED)
+
+        for pk, pk_cleaned in self.ctx.cifs.items():
+            self.ctx.results[pk]['cif'] = pk_cleaned
+
+    def should_parse_cif_structures(self):
+        """Return whether the primitive structures should be created from the cleaned CifData nodes of this wave."""
+        return 'group_structure' in self.inputs and bool(self.ctx.cifs)
+
+    def run_parse_cif_structures(self):
+        """Submit a `PrimitiveStructuresWorkChain` for each chunk of the cleaned `CifData` nodes.
+
+        If the `cache_structure` input is True, the nodes for which a structure was previously parsed from the same
+        content with the same inputs reuse that structure. The other cleaned `CifData` nodes are checked for conditions
+        that are known to make the parsing fail. The remaining ones are parsed in chunks, each by a separate workchain,
+        which runs the `primitive_structures_from_cifs` calculation function that distributes the work over multiple
+        processes.
+        """
+        pks = []
+        cifs = get_nodes(list(self.ctx.cifs.values()))
+
+        for pk, pk_cleaned in self.ctx.cifs.items():
+            cif = cifs[pk_cleaned]
+
+            if self.inputs.cache_structure.value:
+                structure = get_cached_primitive_structure(
+                    cif, self.inputs.parse_engine, self.inputs.symprec, self.inputs.site_tolerance
+                )
+
+                if structure is not None:
+                    self.ctx.results[pk]['structure'] = structure.pk
+                    continue
+
+            exit_code = get_cif_exit_code(cif)
+
+            if exit_code is not None:
+                self.ctx.results[pk]['exit_status'] = exit_code.status
+                continue
+
+            pks.append(pk)
+
+        self.ctx.parsing = pks
+
+        for chunk in self.get_chunks(sorted(pks, key=int)):
+            inputs = {
+                'cifs': {f'cif_{pk}': cifs[self.ctx.cifs[pk]] for pk in chunk},
+                'parse_engine': self.inputs.parse_engine,
+                'symprec': self.inputs.symprec,
+                'site_tolerance': self.inputs.site_tolerance,
+                'metadata': {
+                    'call_link_label': f'primitive_structures_{chunk[0]}'
+                }
+            }
+
+            if 'max_workers' in self.inputs:
+                inputs['max_workers'] = self.inputs.max_workers
+
+            workchain = self.submit(PrimitiveStructuresWorkChain, **inputs)
+            self.report(f'submitted {PrimitiveStructuresWorkChain.__name__}<{workchain.pk}> for chunk {chunk[0]}')
+            self.to_context(primitive_structures=append_(workchain))
+
+    def inspect_parse_cif_structures(self):
+        """Collect the primitive structures parsed by the `PrimitiveStructuresWorkChain` for each chunk."""
+        exit_codes = CifCleanWorkChain.exit_codes
+
+        for workchain in self.ctx.get('primitive_structures', []):
+
+            if not workchain.is_finished_ok:
+                self.report(f'{PrimitiveStructuresWorkChain.__name__}<{workchain.pk}> failed: {workchain.exit_status}')
+                continue
+
+            for label, exit_status in workchain.outputs.exit_statuses.get_dict().items():
+                pk = label[len('cif_'):]
+
+                if exit_status:
+                    self.ctx.results[pk]['exit_status'] = exit_status
+                else:
+                    self.ctx.results[pk]['structure'] = workchain.outputs[f'structures__{label}'].pk
+
+        for pk in self.ctx.parsing:
+            result = self.ctx.results[pk]
+            if result['exit_status'] is None and 'structure' not in result:
+                result['exit_status'] = exit_codes.ERROR_CIF_STRUCTURE_PARSING_FAILED.status
+
+    def finalize_wave(self):
+        """Add the cleaned `CifData` and `StructureData` nodes of this wave to the groups and count the results."""
+        if 'group_cif' in self.inputs:
+            self.inputs.group_cif.add_nodes(list(get_nodes(list(self.ctx.cifs.values())).values()))
+
+        if 'group_structure' in self.inputs:
+            pks = [result['structure'] for result in self.ctx.results.values() if 'structure' in result]
+            self.inputs.group_structure.add_nodes(list(get_nodes(pks).values()))
+
+        for result in self.ctx.results.values():
+            key = str(result['exit_status'] or 0)
+            self.ctx.totals[key] = self.ctx.totals.get(key, 0) + 1
+
+        self.report(f'finished wave of {len(self.ctx.pks)} CifData up to pk {self.ctx.pks[-1]}: {self.ctx.totals}')
+        self.ctx.last_pk = self.ctx.pks[-1]
+
+    def results(self):
+        """Attach the summary with the number of inputs for each exit status."""
+        summary = create_summary(orm.Dict(dict=self.ctx.totals), metadata={'call_link_label': 'create_summary'})
+        self.out('summary', summary)
+
+        if not self.ctx.totals.get('0'):
+            return self.exit_codes.ERROR_ALL_FAILED
+
+        self.report('workchain finished successfully')
@@ -0,0 +1,70 @@
+# -*- coding: utf-8 -*-
+"""WorkChain to parse the primitive structures of a chunk of cleaned `CifData` nodes."""
+# pylint: disable=inconsistent-return-statements,no-member
+from aiida import orm
+from aiida.engine import WorkChain
+
+
+class PrimitiveStructuresWorkChain(WorkChain):
+    """WorkChain to parse the primitive structures of a chunk of cleaned `CifData` nodes.
+
+    This is a thin wrapper around the `primitive_structures_from_cifs` calculation function, whose only purpose is to
+    allow the function to be submitted to the daemon, which is not possible for process functions themselves. This
+    allows the `CifCleanBulkWorkChain` to submit a separate process for each chunk, such that the chunks can be parsed
+    concurrently by different daemon workers, instead of blocking a single one for all of them. The outputs of the
+    calculation function are returned as is.
+    """
+
+    @classmethod
+    def define(cls, spec):
+        # yapf: disable
+        super().define(spec)
+        spec.input_namespace('cifs', valid_type=orm.CifData, dynamic=True,
+            help='The cleaned CifData nodes whose primitive structure should be parsed.')
+        spec.input('parse_engine', valid_type=orm.Str, default=lambda: orm.Str('pymatgen'),
+            help='The atomic structure engine to parse the cif and create the structure.')
+        spec.input('symprec', valid_type=orm.Float, default=lambda: orm.Float(5E-3),
+            help='The symmetry precision used by SeeKpath for crystal symmetry refinement.')
+        spec.input('site_tolerance', valid_type=orm.Float, default=lambda: orm.Float(5E-4),
+            help='The fractional coordinate distance tolerance for finding overlapping sites (pymatgen only).')
+        spec.input('max_workers', valid_type=orm.Int, required=False,
+            help='The maximum number of worker processes, by default the number of processors of the machine.')
+
+        spec.outline(
+            cls.parse_structures,
+        )
+
+        spec.output_namespace('structures', valid_type=orm.StructureData, dynamic=True,
+            help='The primitive structure for each of the CifData nodes that was successfully parsed.')
+        spec.output('exit_statuses', valid_type=orm.Dict,
+            help='The exit status of the `CifCleanWorkChain` that corresponds to the result of each CifData node.')
+
+        spec.exit_code(400, 'ERROR_PARSING_FAILED',
+            message='The `primitive_structures_from_cifs` calculation function excepted.')
+
+    def parse_structures(self):
+        """Run the `primitive_structures_from_cifs` calculation function for all the `CifData` nodes."""
+        from aiida_codtools.calculations.functions.primitive_structures_from_cifs import primitive_structures_from_cifs
+
+        inputs = {
+            'parse_engine': self.inputs.parse_engine,
+            'symprec': self.inputs.symprec,
+            'site_tolerance': self.inputs.site_tolerance,
+            'metadata': {
+                'call_link_label': 'primitive_structures_from_cifs'
+            }
+        }
+        inputs.update(self.inputs.cifs)
+
+        if 'max_workers' in self.inputs:
+            inputs['max_workers'] = self.inputs.max_workers
+
+        try:
+            outputs = primitive_structures_from_cifs(**inputs)
+        except Exception:  # pylint: disable=broad-except
+            self.report('primitive_structures_from_cifs excepted')
+            return self.exit_codes.ERROR_PARSING_FAILED
+
+        prefix = 'structures__'
+        self.out('structures', {key[len(prefix):]: node for key, node in outputs.items() if key.startswith(prefix)})
+        self.out('exit_statuses', outputs['exit_statuses'])
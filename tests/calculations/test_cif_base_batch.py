@@ -0,0 +1,43 @@
+# -*- coding: utf-8 -*-
+# pylint: disable=unused-argument,too-many-arguments
+"""Tests for the `CifBaseBatchCalculation` class."""
+import os
+
+from aiida import orm
+from aiida.common import datastructures
+
+from aiida_codtools.calculations.cif_base_batch import CifBaseBatchCalculation
+from aiida_codtools.common.resources import get_default_options
+
+
+def test_cif_base_batch(clear_database, fixture_code, fixture_sandbox, fixture_calc_job, generate_cif_data):
+    """Test a default `CifBaseBatchCalculation`."""
+    entry_point_name = 'codtools.cif_base_batch'
+
+    cifs = {'cod_1000000': generate_cif_data('Si'), 'cod_1000002': generate_cif_data('Si')}
+    inputs = {
+        'cifs': cifs,
+        'code': fixture_code(entry_point_name),
+        'parameters': orm.Dict(dict={'use-c-parser': True}),
+        'metadata': {
+            'options': get_default_options()
+        }
+    }
+
+    _, calc_info = fixture_calc_job(fixture_sandbox, entry_point_name, inputs)
+
+    directory_input = CifBaseBatchCalculation.directory_input
+    directory_output = CifBaseBatchCalculation.directory_output
+
+    assert isinstance(calc_info, datastructures.CalcInfo)
+    assert calc_info.retrieve_list == [directory_output]
+    assert len(calc_info.codes_info) == len(cifs)
+
+    for (label, cif), code_info in zip(sorted(cifs.items()), calc_info.codes_info):
+        assert code_info.cmdline_params == ['--use-c-parser']
+        assert code_info.stdin_name == os.path.join(directory_input, f'{label}.cif')
+        assert code_info.stdout_name == os.path.join(directory_output, f'{label}.out')
+        assert code_info.stderr_name == os.path.join(directory_output, f'{label}.err')
+        assert (cif.uuid, cif.filename, code_info.stdin_name) in calc_info.local_copy_list
+
+    assert sorted(fixture_sandbox.get_content_list()) == sorted([directory_input, directory_output])
@@ -0,0 +1,44 @@
+# -*- coding: utf-8 -*-
+# pylint: disable=unused-argument,too-many-arguments
+"""Tests for the `CifFilterSelectCalculation` class."""
+from aiida import orm
+from aiida.common import datastructures
+
+from aiida_codtools.calculations.cif_filter_select import CifFilterSelectCalculation
+from aiida_codtools.common.resources import get_default_options
+
+
+def test_cif_filter_select(clear_database, fixture_code, fixture_sandbox, fixture_calc_job, generate_cif_data):
+    """Test a default `CifFilterSelectCalculation`."""
+    entry_point_name = 'codtools.cif_filter_select'
+
+    inputs = {
+        'cif': generate_cif_data('Si'),
+        'code': fixture_code('codtools.cif_filter'),
+        'select_code': fixture_code('codtools.cif_select'),
+        'parameters': orm.Dict(dict={'fix-syntax-errors': True}),
+        'select_parameters': orm.Dict(dict={'canonicalize-tag-names': True}),
+        'metadata': {
+            'options': get_default_options()
+        }
+    }
+
+    process, calc_info = fixture_calc_job(fixture_sandbox, entry_point_name, inputs)
+    options = process.inputs.metadata.options
+    codeinfo_filter, codeinfo_select = calc_info.codes_info
+
+    assert isinstance(calc_info, datastructures.CalcInfo)
+    assert calc_info.codes_run_mode == datastructures.CodeRunMode.SERIAL
+    assert sorted(calc_info.retrieve_list) == sorted([
+        options.output_filename, options.error_filename, CifFilterSelectCalculation.filename_filter_error
+    ])
+
+    assert codeinfo_filter.cmdline_params == ['--fix-syntax-errors']
+    assert codeinfo_filter.stdin_name == options.input_filename
+    assert codeinfo_filter.stdout_name == CifFilterSelectCalculation.filename_filter_output
+
+    assert codeinfo_select.code_uuid == inputs['select_code'].uuid
+    assert codeinfo_select.cmdline_params == ['--canonicalize-tag-names']
+    assert codeinfo_select.stdin_name == CifFilterSelectCalculation.filename_filter_output
+    assert codeinfo_select.stdout_name == options.output_filename
+    assert codeinfo_select.stderr_name == options.error_filename
@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+# pylint: disable=unused-argument,redefined-outer-name
+"""Tests for the `run_cod_tools_script` calculation function."""
+import io
+import os
+import stat
+
+from aiida import orm
+import pytest
+
+from aiida_codtools.calculations.cif_filter import CifFilterCalculation
+from aiida_codtools.calculations.functions.run_cod_tools_script import run_cod_tools_script
+
+SCRIPT = """#!/bin/sh
+content=$(cat)
+echo "cif_filter: -(1): WARNING, data name '_test' is not recognised" >&2
+case "$content" in
+    *data_fail*) ;;
+    *) printf '%s\\n' "$content" ;;
+esac
+"""
+
+
+@pytest.fixture
+def generate_code(tmp_path, fixture_localhost):
+    """Return a stored `Code` for the `codtools.cif_filter` plugin whose executable echoes the CIF to stdout.
+
+    The content of CIFs whose data block is called `fail` is not echoed, such that the parser fails for them.
+    """
+    filepath = tmp_path / 'cif_filter'
+    filepath.write_text(SCRIPT)
+    os.chmod(filepath, os.stat(filepath).st_mode | stat.S_IEXEC)
+
+    code = orm.Code(input_plugin_name='codtools.cif_filter', remote_computer_exec=[fixture_localhost, str(filepath)])
+    return code.store()
+
+
+def generate_cif(name):
+    """Return a `CifData` with a single data block with the given name."""
+    return orm.CifData(file=io.BytesIO(f'data_{name}\n_cell_length_a 1.0\n'.encode('utf-8')))
+
+
+def test_run_cod_tools_script(clear_database, generate_code):
+    """Test that the outputs of each CIF are returned in its namespace and the failed ones in the `failed` output."""
+    inputs = {'code': generate_code, 'cif_a': generate_cif('a'), 'cif_b': generate_cif('fail')}
+    results, node = run_cod_tools_script.run_get_node(**inputs)
+
+    assert node.is_finished_ok
+    assert sorted(results.keys()) == ['cif_a__cif', 'failed']
+    exit_code = CifFilterCalculation.exit_codes.ERROR_EMPTY_OUTPUT_FILE  # pylint: disable=no-member
+    assert results['failed'].get_dict() == {'cif_b': exit_code.status}
+
+
+def test_run_cod_tools_script_all_failed(clear_database, generate_code):
+    """Test that the exit code of the parser is returned if all of the CIFs failed."""
+    inputs = {'code': generate_code, 'cif_a': generate_cif('fail')}
+    _, node = run_cod_tools_script.run_get_node(**inputs)
+
+    exit_code = CifFilterCalculation.exit_codes.ERROR_EMPTY_OUTPUT_FILE  # pylint: disable=no-member
+    assert node.exit_status == exit_code.status
+
+
+def test_run_cod_tools_script_options(clear_database, generate_code):
+    """Test that the `options` input is passed on to the parser."""
+    inputs = {'code': generate_code, 'cif_a': generate_cif('a')}
+
+    results = run_cod_tools_script(**inputs)
+    assert 'cif_a__messages' not in results
+
+    options = orm.Dict(dict={'attach_messages': True})
+    results = run_cod_tools_script(options=options, **inputs)
+    assert results['cif_a__messages']['warnings'] == ["data name '_test' is not recognised"]
+
+    options = orm.Dict(dict={'attach_messages': True, 'max_messages': 0})
+    results = run_cod_tools_script(options=options, **inputs)
+    assert results['cif_a__messages']['number_of_warnings'] == 1
+    assert results['cif_a__messages']['warnings'] == []
+
+
+def test_run_cod_tools_script_unsupported_option(clear_database, generate_code):
+    """Test that an unsupported key in the `options` input raises."""
+    options = orm.Dict(dict={'withmpi': True})
+
+    with pytest.raises(ValueError, match='not supported'):
+        run_cod_tools_script(code=generate_code, options=options, cif_a=generate_cif('a'))
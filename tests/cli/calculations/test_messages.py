@@ -0,0 +1,68 @@
+# -*- coding: utf-8 -*-
+# pylint: disable=unused-argument,redefined-outer-name
+"""Tests for the `aiida-codtools calculation messages` CLI command."""
+from aiida import orm
+from aiida.common.links import LinkType
+import pytest
+
+from aiida_codtools.cli.calculations.messages import calculation_messages
+
+
+@pytest.fixture
+def generate_calculation():
+    """Return a factory for a stored calculation with a `messages` output with the given counts per code."""
+
+    def _generate_calculation(error_codes=None, warning_codes=None, link_label='messages'):
+        calculation = orm.CalculationNode()
+        calculation.set_process_label('CifFilterCalculation')
+        calculation.store()
+
+        attributes = {'error_codes': error_codes or {}, 'warning_codes': warning_codes or {}}
+        messages = orm.Dict(dict=attributes)
+        messages.add_incoming(calculation, link_type=LinkType.CREATE, link_label=link_label)
+        messages.store()
+
+        return calculation
+
+    return _generate_calculation
+
+
+def get_pks(output):
+    """Return the pks of the calculations listed in the output of the command."""
+    return [int(line.split()[0]) for line in output.splitlines()[2:]]
+
+
+def test_calculation_messages(clear_database, run_cli_command, generate_calculation):
+    """Test that the calculations are selected on the keys of both the error and warning codes, most recent first."""
+    error = generate_calculation(error_codes={'SYNTAX_ERROR': 2})
+    warning = generate_calculation(warning_codes={'SYNTAX_ERROR': 1, 'UNIT_CELL': 3})
+    both = generate_calculation(error_codes={'SYNTAX_ERROR': 1}, warning_codes={'SYNTAX_ERROR': 4})
+    generate_calculation(warning_codes={'OCCUPANCY': 1})
+    generate_calculation(warning_codes={'SYNTAX_ERROR': 1}, link_label='output_parameters')
+
+    result = run_cli_command(calculation_messages, ['syntax_error'])
+    assert get_pks(result.output) == [both.pk, warning.pk, error.pk]
+    assert 'SYNTAX_ERROR: 5' in result.output.splitlines()[2]
+
+    result = run_cli_command(calculation_messages, ['SYNTAX_ERROR', '-k', 'error'])
+    assert get_pks(result.output) == [both.pk, error.pk]
+
+    result = run_cli_command(calculation_messages, ['SYNTAX_ERROR', '-k', 'warning'])
+    assert get_pks(result.output) == [both.pk, warning.pk]
+
+    result = run_cli_command(calculation_messages, ['UNIT_CELL', 'SYNTAX_ERROR', '-k', 'warning', '-l', 1])
+    assert get_pks(result.output) == [both.pk]
+
+    result = run_cli_command(calculation_messages, ['SYNTAX_ERROR', '--count'])
+    assert result.output.strip() == '3'
+
+
+def test_calculation_messages_empty(clear_database, run_cli_command, generate_calculation):
+    """Test the command when no calculation has messages with the given codes."""
+    generate_calculation(error_codes={'SYNTAX_ERROR': 1})
+
+    result = run_cli_command(calculation_messages, ['UNIT_CELL'])
+    assert get_pks(result.output) == []
+
+    result = run_cli_command(calculation_messages, ['SYNTAX_ERROR', '-k', 'warning', '--count'])
+    assert result.output.strip() == '0'
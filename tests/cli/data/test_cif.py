@@ -1,12 +1,16 @@
 # -*- coding: utf-8 -*-
-# pylint: disable=unused-argument,too-many-arguments
+# pylint: disable=unused-argument,too-many-arguments,redefined-outer-name
 """Tests for the `aiida-codtools data cif` CLI command."""
 
+import pathlib
+import tarfile
 from uuid import uuid4 as UUID
 
 from aiida import orm
+from click.testing import CliRunner
+import pytest
 
-from aiida_codtools.cli.data.cif import launch_cif_import
+from aiida_codtools.cli.data.cif import EXTRA_IMPORT_CURSOR, launch_cif_import
 
 
 def test_cif_import(clear_database, run_cli_command):
@@ -27,3 +31,212 @@ def test_cif_import(clear_database, run_cli_command):
     group = orm.Group(UUID()).store()
     run_cli_command(launch_cif_import, ['-G', group.pk, '-M', max_entries, '--skip-partial-occupancies'])
     assert group.count() == max_entries
+
+
+@pytest.fixture
+def generate_source(tmp_path):
+    """Return a factory for a local mirror directory with a copy of the `Si.cif` fixture for each of the given ids."""
+    content = (pathlib.Path(__file__).parent.parent.parent / 'fixtures' / 'cif' / 'Si.cif').read_bytes()
+
+    def _generate_source(*source_ids):
+        directory = tmp_path / 'mirror'
+        directory.mkdir(exist_ok=True)
+
+        for source_id in source_ids:
+            (directory / f'{source_id}.cif').write_bytes(content)
+
+        return directory
+
+    return _generate_source
+
+
+def get_source_ids(group):
+    """Return the sorted source ids of the `CifData` nodes in the given group."""
+    return sorted(node.source['id'] for node in group.nodes)
+
+
+@pytest.mark.parametrize('jobs', (1, 3))
+def test_cif_import_source(clear_database, run_cli_command, generate_source, jobs):
+    """Test the `--source` option, importing from a local directory, with a different number of `--jobs`."""
+    source_ids = [f'100000{index}' for index in range(5)]
+    directory = generate_source(*source_ids)
+
+    group = orm.Group(str(UUID())).store()
+    run_cli_command(launch_cif_import, ['-G', group.pk, '-s', str(directory), '-j', jobs, '-b', 2])
+    assert get_source_ids(group) == source_ids
+
+    cursor = group.get_extra(EXTRA_IMPORT_CURSOR)
+    assert cursor['processed'] == {'ranges': [[1000000, 1000004]], 'others': []}
+    assert cursor['counters'] == {'stored': 5, 'present': 0, 'skipped': 0, 'failed': 0}
+
+    # A second import should skip all entries, which are already present in the group
+    run_cli_command(launch_cif_import, ['-G', group.pk, '-s', str(directory), '-j', jobs])
+    assert get_source_ids(group) == source_ids
+    assert group.get_extra(EXTRA_IMPORT_CURSOR)['counters'] == {'stored': 0, 'present': 5, 'skipped': 0, 'failed': 0}
+
+
+def test_cif_import_lookup_chunk_size(clear_database, run_cli_command, generate_source, monkeypatch):
+    """Test the `--lookup-chunk-size` option with more entries already present in the group than the chunk size."""
+    from aiida_codtools.common import utils
+
+    source_ids = [f'100000{index}' for index in range(5)]
+    directory = generate_source(*source_ids)
+    group = orm.Group(str(UUID())).store()
+    run_cli_command(launch_cif_import, ['-G', group.pk, '-s', str(directory)])
+
+    chunks = []
+    iter_chunks = utils.iter_chunks
+
+    def mock_iter_chunks(iterable, chunk_size):
+        for chunk in iter_chunks(iterable, chunk_size):
+            chunks.append([entry.source['id'] for entry in chunk])
+            yield chunk
+
+    monkeypatch.setattr(utils, 'iter_chunks', mock_iter_chunks)
+
+    # Interleave the new entries with the existing ones, such that chunks contain both
+    generate_source('0999999', '1000002a', '1000005')
+    run_cli_command(launch_cif_import, ['-G', group.pk, '-s', str(directory), '-L', 2])
+    assert get_source_ids(group) == sorted(source_ids + ['0999999', '1000002a', '1000005'])
+    assert chunks == [['0999999', '1000000'], ['1000001', '1000002'], ['1000002a', '1000003'], ['1000004', '1000005']]
+
+    counters = group.get_extra(EXTRA_IMPORT_CURSOR)['counters']
+    assert counters == {'stored': 3, 'present': 5, 'skipped': 0, 'failed': 0}
+
+
+ELEMENTS_CONTENT = """data_test
+_cell_length_a 5.0
+_cell_length_b 5.0
+_cell_length_c 5.0
+_cell_angle_alpha 90
+_cell_angle_beta 90
+_cell_angle_gamma 90
+loop_
+_atom_site_label
+_atom_site_type_symbol
+_atom_site_fract_x
+_atom_site_fract_y
+_atom_site_fract_z
+{sites}
+"""
+
+
+@pytest.mark.parametrize('options, expected', (
+    (['-I', 'Si'], ['1000000']),
+    (['-I', 'Si', '-I', 'O'], ['1000000', '1000001']),
+    (['-E', 'O'], ['1000000', '1000002']),
+    (['-E', 'O', '-E', 'Na'], ['1000000']),
+    (['-I', 'Na', '-I', 'Cl', '-I', 'Si', '-E', 'Si'], ['1000002']),
+    (['-I', 'Si', '-I', 'O', '-E', 'Si'], []),
+))
+def test_cif_import_elements(clear_database, run_cli_command, tmp_path, options, expected):
+    """Test the `--include-elements` and `--exclude-elements` options, separately and combined."""
+    directory = tmp_path / 'mirror'
+    directory.mkdir()
+
+    for source_id, elements in (('1000000', ['Si']), ('1000001', ['Si', 'O']), ('1000002', ['Na', 'Cl'])):
+        sites = '\n'.join(f'{element}1 {element} 0.{i} 0.{i} 0.{i}' for i, element in enumerate(elements))
+        (directory / f'{source_id}.cif').write_text(ELEMENTS_CONTENT.format(sites=sites))
+
+    group = orm.Group(str(UUID())).store()
+    run_cli_command(launch_cif_import, ['-G', group.pk, '-s', str(directory)] + options)
+    assert get_source_ids(group) == expected
+
+    counters = group.get_extra(EXTRA_IMPORT_CURSOR)['counters']
+    assert counters == {'stored': len(expected), 'present': 0, 'skipped': 3 - len(expected), 'failed': 0}
+
+
+def test_cif_import_resume(clear_database, run_cli_command, generate_source):
+    """Test the `--resume` option, which should skip the entries that were processed by the previous invocations."""
+    directory = generate_source('1000000', '1000001', '1000002', '1000003')
+    group = orm.Group(str(UUID())).store()
+    options = ['-G', group.pk, '-s', str(directory), '-b', 1]
+
+    # The `--max-entries` applies to each invocation separately
+    run_cli_command(launch_cif_import, options + ['-M', 2])
+    assert get_source_ids(group) == ['1000000', '1000001']
+    assert group.get_extra(EXTRA_IMPORT_CURSOR)['processed'] == {'ranges': [[1000000, 1000001]], 'others': []}
+
+    # Entries that were added since should not be skipped, regardless of their id, and the counters should accumulate
+    generate_source('0999999', '1000004')
+    run_cli_command(launch_cif_import, options + ['-M', 2, '--resume'])
+    assert get_source_ids(group) == ['0999999', '1000000', '1000001', '1000002']
+
+    run_cli_command(launch_cif_import, options + ['--resume'])
+    assert get_source_ids(group) == ['0999999', '1000000', '1000001', '1000002', '1000003', '1000004']
+
+    cursor = group.get_extra(EXTRA_IMPORT_CURSOR)
+    assert cursor['processed'] == {'ranges': [[1000000, 1000004]], 'others': ['0999999']}
+    assert cursor['counters'] == {'stored': 6, 'present': 0, 'skipped': 0, 'failed': 0}
+
+    # Without resuming, all entries are considered again and the counters are reset
+    run_cli_command(launch_cif_import, options)
+    assert group.get_extra(EXTRA_IMPORT_CURSOR)['counters'] == {'stored': 0, 'present': 6, 'skipped': 0, 'failed': 0}
+
+
+def test_cif_import_resume_invalid(clear_database, generate_source):
+    """Test that `--resume` fails without a cursor, with a cursor of an older format or for a different query."""
+    directory = generate_source('1000000')
+    group = orm.Group(str(UUID())).store()
+
+    result = CliRunner().invoke(launch_cif_import, ['-G', group.pk, '-s', str(directory), '--resume'])
+    assert result.exit_code != 0
+
+    query_parameters = {'source': str(directory)}
+    group.set_extra(EXTRA_IMPORT_CURSOR, {'database': 'cod', 'query_parameters': query_parameters, 'source_id': '1'})
+    result = CliRunner().invoke(launch_cif_import, ['-G', group.pk, '-s', str(directory), '--resume'])
+    assert result.exit_code != 0
+
+    cursor = {'database': 'cod', 'query_parameters': {}, 'processed': {}, 'counters': {}}
+    group.set_extra(EXTRA_IMPORT_CURSOR, cursor)
+    result = CliRunner().invoke(launch_cif_import, ['-G', group.pk, '-s', str(directory), '--resume'])
+    assert result.exit_code != 0
+
+
+def test_cif_import_resume_unordered(clear_database, run_cli_command, generate_source, tmp_path):
+    """Test that `--resume` works when the query results are not ordered by their source id."""
+    source_ids = ['1000003', '1000000', 'abc', '1000002', '1000001']
+    directory = generate_source(*source_ids)
+    filepath = tmp_path / 'mirror.tar'
+
+    with tarfile.open(str(filepath), 'w') as archive:
+        for source_id in source_ids:
+            archive.add(str(directory / f'{source_id}.cif'), arcname=f'{source_id}.cif')
+
+    group = orm.Group(str(UUID())).store()
+    options = ['-G', group.pk, '-s', str(filepath), '-b', 1]
+
+    run_cli_command(launch_cif_import, options + ['-M', 3])
+    assert get_source_ids(group) == ['1000000', '1000003', 'abc']
+    assert group.get_extra(EXTRA_IMPORT_CURSOR)['processed'] == {
+        'ranges': [[1000000, 1000000], [1000003, 1000003]], 'others': ['abc']
+    }
+
+    run_cli_command(launch_cif_import, options + ['--resume'])
+    assert get_source_ids(group) == sorted(source_ids)
+
+    cursor = group.get_extra(EXTRA_IMPORT_CURSOR)
+    assert cursor['processed'] == {'ranges': [[1000000, 1000003]], 'others': ['abc']}
+    assert cursor['counters'] == {'stored': 5, 'present': 0, 'skipped': 0, 'failed': 0}
+
+
+def test_cif_import_cursor_batch(clear_database, run_cli_command, generate_source, monkeypatch):
+    """Test that the cursor is only written when a batch is stored and once at the end of the import."""
+    directory = generate_source('1000000', '1000001', '1000002', '1000003', '1000004')
+    group = orm.Group(str(UUID())).store()
+    group.add_nodes([orm.CifData(file=str(directory / '1000000.cif'), source={'id': '1000000'}).store()])
+
+    cursors = []
+    set_extra = orm.Group.set_extra
+
+    def mock_set_extra(self, key, value):
+        cursors.append(value['processed']['ranges'])
+        set_extra(self, key, value)
+
+    monkeypatch.setattr(orm.Group, 'set_extra', mock_set_extra)
+
+    # The entry that is already present should not trigger writing the cursor, even though no batch is pending
+    run_cli_command(launch_cif_import, ['-G', group.pk, '-s', str(directory), '-b', 2])
+    assert get_source_ids(group) == ['1000000', '1000001', '1000002', '1000003', '1000004']
+    assert cursors == [[[1000000, 1000002]], [[1000000, 1000004]], [[1000000, 1000004]]]
+    assert group.get_extra(EXTRA_IMPORT_CURSOR)['counters'] == {'stored': 4, 'present': 1, 'skipped': 0, 'failed': 0}
@@ -0,0 +1,74 @@
+# -*- coding: utf-8 -*-
+# pylint: disable=unused-argument
+"""Tests for the `aiida-codtools launch cif-clean` CLI command."""
+import time
+from types import SimpleNamespace
+from uuid import uuid4 as UUID
+
+from aiida import orm
+from aiida.engine import launch
+from click.testing import CliRunner
+import pytest
+
+from aiida_codtools.cli.workflows.cif_clean import launch_cif_clean
+from aiida_codtools.common import utils
+
+
+@pytest.mark.parametrize('option', (['-C', '2', '-d'], ['-M', '10']))
+def test_cif_clean_bulk_invalid_options(clear_database, fixture_code, option):
+    """Test that options that do not apply to a bulk launch are rejected together with `--bulk-chunk-size`."""
+    cif_filter = fixture_code('codtools.cif_filter').store()
+    cif_select = fixture_code('codtools.cif_select').store()
+
+    options = ['-F', str(cif_filter.pk), '-S', str(cif_select.pk), '-B', '10'] + option
+    result = CliRunner().invoke(launch_cif_clean, options)
+
+    assert result.exit_code != 0
+    assert '--bulk-chunk-size' in result.output
+
+
+def test_cif_clean_max_workers_requires_bulk(clear_database, fixture_code):
+    """Test that the `--max-workers` option is rejected without `--bulk-chunk-size`."""
+    cif_filter = fixture_code('codtools.cif_filter').store()
+    cif_select = fixture_code('codtools.cif_select').store()
+
+    options = ['-F', str(cif_filter.pk), '-S', str(cif_select.pk), '-W', '2']
+    result = CliRunner().invoke(launch_cif_clean, options)
+
+    assert result.exit_code != 0
+    assert '--max-workers' in result.output
+
+
+def test_cif_clean_max_concurrent(clear_database, run_cli_command, fixture_code, generate_cif_data, monkeypatch):
+    """Test that with `--max-concurrent` a workchain is only submitted when fewer than that number are active."""
+    cif_filter = fixture_code('codtools.cif_filter').store()
+    cif_select = fixture_code('codtools.cif_select').store()
+    group = orm.Group(str(UUID())).store()
+    group.add_nodes([generate_cif_data('Si').store() for _ in range(4)])
+
+    running = set()
+    submitted = []
+    sleeps = []
+
+    def mock_submit(process_class, **inputs):
+        assert len(running) < 2, 'submitted while the number of active workchains is at the limit'
+        pk = len(submitted) + 1
+        running.add(pk)
+        submitted.append(pk)
+        return SimpleNamespace(pk=pk)
+
+    def mock_sleep(seconds):
+        # Each time the command waits, the oldest active workchain terminates
+        sleeps.append(seconds)
+        running.remove(min(running))
+
+    monkeypatch.setattr(launch, 'submit', mock_submit)
+    monkeypatch.setattr(utils, 'get_active_process_pks', lambda pks: set(pks) & running)
+    monkeypatch.setattr(time, 'sleep', mock_sleep)
+
+    options = ['-F', str(cif_filter.pk), '-S', str(cif_select.pk), '-r', str(group.pk), '-f']
+    run_cli_command(launch_cif_clean, options + ['-d', '-C', '2', '-I', '5'])
+
+    assert submitted == [1, 2, 3, 4]
+    assert sleeps == [5, 5]
+    assert running == {3, 4}
@@ -0,0 +1,77 @@
+# -*- coding: utf-8 -*-
+"""Tests for the raw CIF content utilities."""
+import os
+
+import pytest
+
+from aiida_codtools.common.cif import (
+    get_content_hash, get_element, has_partial_occupancies, parse_float, scan_atom_sites, scan_tag_values
+)
+
+CONTENT = """data_test
+_cell_length_a 5.0
+_publ_section_title
+;
+Text field with a loop_ and _atom_site_label Xx1
+;
+loop_
+_atom_site_label
+_atom_site_type_symbol
+_atom_site_fract_x
+_atom_site_occupancy
+Fe1 Fe3+ 0.0 0.5(1)
+O1 O2- 'not 0.5' 1
+Na1 ? 0.5 .
+loop_
+_atom_type_symbol
+Cl
+"""
+
+
+@pytest.mark.parametrize(('value', 'expected'), (('Fe3+', 'Fe'), ('O1', 'O'), ('?', None), ('1A', None)))
+def test_get_element(value, expected):
+    """Test `get_element`."""
+    assert get_element(value) == expected
+
+
+@pytest.mark.parametrize(('value', 'expected'), (('0.5(1)', 0.5), ('1', 1.0), ('?', None), ('.', None)))
+def test_parse_float(value, expected):
+    """Test `parse_float`."""
+    assert parse_float(value) == expected
+
+
+def test_scan_atom_sites():
+    """Test `scan_atom_sites` for a loop of atom sites with text fields, quoted and undefined values."""
+    result = scan_atom_sites(CONTENT)
+    assert result == {'elements': {'Fe', 'O', 'Na'}, 'occupancies': [0.5, 1.0], 'number_of_sites': 3}
+    assert has_partial_occupancies(result['occupancies'])
+
+
+def test_scan_tag_values():
+    """Test `scan_tag_values` for values in loops, text fields and single values on the same or the next line."""
+    content = CONTENT + "_chemical_formula_sum\n'Cl Fe Na O'\n_atom_site_attached_hydrogens 2\n"
+    tags = ['_atom_site_fract_x', '_atom_site_attached_hydrogens', '_chemical_formula_sum', '_publ_section_title']
+    assert scan_tag_values(content, tags) == {
+        '_atom_site_fract_x': ['0.0', 'not 0.5', '0.5'],
+        '_atom_site_attached_hydrogens': ['2'],
+        '_chemical_formula_sum': ['Cl Fe Na O'],
+        '_publ_section_title': [None],
+    }
+
+
+def test_scan_atom_sites_fixture():
+    """Test `scan_atom_sites` for the `Si.cif` fixture, which does not define occupancies."""
+    filepath = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'fixtures', 'cif', 'Si.cif')
+
+    with open(filepath, 'r') as handle:
+        result = scan_atom_sites(handle.read())
+
+    assert result == {'elements': {'Si'}, 'occupancies': [], 'number_of_sites': 1}
+    assert not has_partial_occupancies(result['occupancies'])
+
+
+def test_get_content_hash():
+    """Test that `get_content_hash` ignores line endings, trailing whitespace and blank lines, but not the content."""
+    content_hash = get_content_hash(CONTENT)
+    assert get_content_hash(CONTENT.replace('\n', '  \r\n\n')) == content_hash
+    assert get_content_hash(CONTENT.replace('0.5(1)', '0.6(1)')) != content_hash
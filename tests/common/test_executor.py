@@ -0,0 +1,18 @@
+# -*- coding: utf-8 -*-
+"""Tests for the local script executor utilities."""
+from aiida_codtools.common.executor import run_script, run_scripts
+
+
+def test_run_script():
+    """Test that `run_script` writes the content to stdin and captures stdout and stderr."""
+    stdout, stderr = run_script(['sh', '-c', 'cat; echo "warning" >&2'], b'data_test\n')
+    assert stdout == b'data_test\n'
+    assert stderr == 'warning\n'
+
+
+def test_run_scripts():
+    """Test that `run_scripts` returns the results in the same order as the contents."""
+    contents = [f'data_{index}\n'.encode('utf-8') for index in range(10)]
+    results = run_scripts(['cat'], contents, max_workers=4)
+    assert [stdout for stdout, _ in results] == contents
+    assert all(stderr == '' for _, stderr in results)
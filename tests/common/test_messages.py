@@ -0,0 +1,29 @@
+# -*- coding: utf-8 -*-
+"""Tests for the catalog of cod-tools messages."""
+import collections
+
+import pytest
+
+from aiida_codtools.common.messages import MESSAGE_CODE_UNCLASSIFIED, classify_message, count_message_codes
+
+
+@pytest.mark.parametrize(('message', 'expected'), (
+    ("data name '_cod_related_entry_id' is not recognised.", 'UNRECOGNISED_DATA_NAME'),
+    ('_journal_name_full is undefined.', 'UNDEFINED_DATA_NAME'),
+    ('neither _journal_year nor _journal_volume is defined.', 'UNDEFINED_DATA_NAME_ALTERNATIVES'),
+    ("unknown option 'invalid'", 'UNKNOWN_OPTION'),
+    ('something entirely different', MESSAGE_CODE_UNCLASSIFIED),
+))
+def test_classify_message(message, expected):
+    """Test `classify_message`."""
+    assert classify_message(message) == expected
+
+
+def test_count_message_codes():
+    """Test that `count_message_codes` sums the occurrences of all messages with the same code."""
+    messages = collections.Counter({
+        '_journal_name_full is undefined.': 2,
+        '_publ_section_title is undefined.': 1,
+        'something entirely different': 4,
+    })
+    assert count_message_codes(messages) == {'UNDEFINED_DATA_NAME': 3, MESSAGE_CODE_UNCLASSIFIED: 4}
@@ -0,0 +1,93 @@
+# -*- coding: utf-8 -*-
+"""Tests for the local sources of CIF files."""
+import tarfile
+import zipfile
+
+import pytest
+
+from aiida_codtools.common.sources import SourceIdSet, iterate_local_entries
+
+CONTENTS = {'1/1000000.cif': b'data_1000000\n', '2/2000000.cif': b'data_2000000\n'}
+
+
+@pytest.fixture
+def directory(tmp_path):
+    """Return a directory with a tree of CIF files and a file that should be ignored."""
+    for filename, content in CONTENTS.items():
+        filepath = tmp_path / 'mirror' / filename
+        filepath.parent.mkdir(parents=True, exist_ok=True)
+        filepath.write_bytes(content)
+
+    (tmp_path / 'mirror' / 'README').write_text('ignored')
+
+    return tmp_path / 'mirror'
+
+
+def test_iterate_local_entries_directory(directory):
+    """Test `iterate_local_entries` for a directory."""
+    entries = list(iterate_local_entries(str(directory), 'cod'))
+
+    assert [entry.source['id'] for entry in entries] == ['1000000', '2000000']
+    assert [entry.cif for entry in entries] == ['data_1000000\n', 'data_2000000\n']
+    assert all(entry.source['db_name'] == 'COD' for entry in entries)
+    assert all(entry.source['source_md5'] is not None for entry in entries)
+
+
+def test_iterate_local_entries_tar(directory, tmp_path):
+    """Test `iterate_local_entries` for a compressed tar archive."""
+    filepath = str(tmp_path / 'mirror.tar.gz')
+
+    with tarfile.open(filepath, 'w:gz') as archive:
+        archive.add(str(directory), arcname='mirror')
+
+    entries = list(iterate_local_entries(filepath, 'cod'))
+    assert sorted((entry.source['id'], entry.cif) for entry in entries) == [
+        ('1000000', 'data_1000000\n'), ('2000000', 'data_2000000\n')
+    ]
+
+
+def test_iterate_local_entries_zip(tmp_path):
+    """Test `iterate_local_entries` for a zip archive."""
+    filepath = str(tmp_path / 'mirror.zip')
+
+    with zipfile.ZipFile(filepath, 'w') as archive:
+        for filename, content in CONTENTS.items():
+            archive.writestr(filename, content)
+
+    entries = list(iterate_local_entries(filepath, 'cod'))
+    assert [(entry.source['id'], entry.cif) for entry in entries] == [
+        ('1000000', 'data_1000000\n'), ('2000000', 'data_2000000\n')
+    ]
+
+
+def test_iterate_local_entries_invalid(tmp_path):
+    """Test `iterate_local_entries` raises for a path that is neither a directory nor an archive."""
+    filepath = tmp_path / 'file.txt'
+    filepath.write_text('content')
+
+    with pytest.raises(ValueError):
+        iterate_local_entries(str(filepath), 'cod')
+
+
+def test_source_id_set():
+    """Test that `SourceIdSet` merges consecutive integer ids into ranges regardless of the order they are added."""
+    source_ids = SourceIdSet()
+
+    for source_id in ['1000003', '1000000', 'abc', '1000001', '1000005', '0999999', 1000002]:
+        source_ids.add(source_id)
+
+    assert source_ids.get_dict() == {'ranges': [[1000000, 1000003], [1000005, 1000005]], 'others': ['0999999', 'abc']}
+    assert len(source_ids) == 7
+    assert '1000002' in source_ids
+    assert 1000005 in source_ids
+    assert '1000004' not in source_ids
+    assert '999999' not in source_ids
+    assert '0999999' in source_ids
+
+    source_ids.add('1000004')
+    assert source_ids.get_dict()['ranges'] == [[1000000, 1000005]]
+
+    restored = SourceIdSet(**source_ids.get_dict())
+    assert restored.get_dict() == source_ids.get_dict()
+    assert all(source_id in restored for source_id in ['1000000', '1000004', 'abc', '0999999'])
+    assert 'def' not in restored
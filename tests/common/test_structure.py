@@ -0,0 +1,234 @@
+# -*- coding: utf-8 -*-
+"""Tests for the structure utilities."""
+import io
+import os
+
+import pytest
+
+from aiida_codtools.common.structure import (
+    EXTRAS_SEEKPATH_PARAMETERS, build_structure, get_overlapping_sites, get_primitive_structure_key,
+    get_seekpath_results, parse_structure
+)
+
+
+@pytest.fixture
+def cif_content():
+    """Return the content of the `Si.cif` fixture."""
+    filepath = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'fixtures', 'cif', 'Si.cif')
+
+    with open(filepath, 'r') as handle:
+        return handle.read()
+
+
+@pytest.mark.parametrize('parse_engine', ('ase', 'pymatgen'))
+def test_parse_structure(cif_content, parse_engine):
+    """Test `parse_structure` for the supported parse engines."""
+    structure, exit_code = parse_structure(cif_content, parse_engine, 5E-4)
+    assert exit_code is None
+    assert len(structure) > 0
+
+
+def test_parse_structure_invalid(cif_content):
+    """Test `parse_structure` for invalid content and an unsupported parse engine."""
+    assert parse_structure('invalid', 'pymatgen', 5E-4) == (None, 'ERROR_CIF_STRUCTURE_PARSING_FAILED')
+    assert parse_structure(cif_content, 'unsupported', 5E-4) == (None, 'ERROR_CIF_STRUCTURE_PARSING_FAILED')
+
+
+def test_get_seekpath_results(cif_content):
+    """Test `get_seekpath_results` returns the primitive cell."""
+    structure, _ = parse_structure(cif_content, 'ase', 5E-4)
+    structure_tuple = (structure.get_cell(), structure.get_scaled_positions(), structure.get_atomic_numbers())
+
+    parameters, exit_code = get_seekpath_results(structure_tuple, 5E-3)
+    assert exit_code is None
+    assert 'spacegroup_number' in parameters
+    assert len(parameters['primitive_types']) <= len(structure)
+
+
+@pytest.mark.parametrize('structure_tuple, bravais_lattice_extended, primitive_lattice', (
+    (
+        ([[3, 0, 0], [0, 4, 0], [0, 0, 5]], [[0, 0, 0], [0, .5, .5], [.5, 0, .3], [.5, .5, .8]], [1, 1, 8, 8]),
+        'oA1', [[0, 2, -2.5], [0, 2, 2.5], [3, 0, 0]]
+    ),
+    (
+        ([[6, 0, 0], [0, 4, 0], [-1.5, 0, 5]], [[0, 0, 0], [.5, .5, 0], [.3, 0, .2], [.8, .5, .2], [.7, 0, .8],
+                                                 [.2, .5, .8]], [1, 1, 8, 8, 8, 8]),
+        'mC1', [[3, 2, 0], [-3, 2, 0], [-1.5, 0, 5]]
+    ),
+))
+def test_get_seekpath_results_conventions(structure_tuple, bravais_lattice_extended, primitive_lattice):
+    """Test that `get_seekpath_results` returns the primitive cell following the HPKOT conventions with all extras.
+
+    For the oA and mC lattices these conventions differ from those of `spglib.standardize_cell`.
+    """
+    import numpy
+
+    parameters, exit_code = get_seekpath_results(structure_tuple, 1E-3)
+    assert exit_code is None
+    assert all(key in parameters for key in EXTRAS_SEEKPATH_PARAMETERS)
+    assert parameters['bravais_lattice_extended'] == bravais_lattice_extended
+    assert numpy.allclose(parameters['primitive_lattice'], primitive_lattice)
+
+
+def test_get_seekpath_results_failed():
+    """Test that `get_seekpath_results` returns the name of the exit code if the symmetry detection fails."""
+    structure_tuple = ([[1, 0, 0], [0, 1, 0], [0, 0, 1]], [[0, 0, 0], [0, 0, 0]], [1, 1])
+    assert get_seekpath_results(structure_tuple, 1E-3) == (None, 'ERROR_SEEKPATH_SYMMETRY_DETECTION_FAILED')
+
+
+def test_get_primitive_structure_key(cif_content):
+    """Test that `get_primitive_structure_key` depends on the normalized content and all the parsing inputs."""
+    key = get_primitive_structure_key(cif_content, 'pymatgen', 5E-3, 5E-4)
+    assert get_primitive_structure_key(cif_content.replace('\n', '\r\n'), 'pymatgen', 5E-3, 5E-4) == key
+    assert get_primitive_structure_key(cif_content, 'ase', 5E-3, 5E-4) != key
+    assert get_primitive_structure_key(cif_content, 'pymatgen', 1E-3, 5E-4) != key
+    assert get_primitive_structure_key(cif_content, 'pymatgen', 5E-3, 1E-4) != key
+
+
+def get_cif_content(sites, space_group='P 1', lattice=(5, 5, 5, 90, 90, 90)):
+    """Return the content of a CIF file with the given sites, given as tuples of type symbol, occupancy and position."""
+    lines = ['data_test']
+    lines.extend(f'_cell_{key} {value}' for key, value in zip(
+        ('length_a', 'length_b', 'length_c', 'angle_alpha', 'angle_beta', 'angle_gamma'), lattice
+    ))
+    lines.append(f"_symmetry_space_group_name_H-M '{space_group}'")
+    lines.extend([
+        'loop_',
+        '_atom_site_label', '_atom_site_type_symbol', '_atom_site_occupancy',
+        '_atom_site_fract_x', '_atom_site_fract_y', '_atom_site_fract_z',
+    ])
+    lines.extend(
+        f'{symbol}{index} {symbol} {occupancy} {x:.6f} {y:.6f} {z:.6f}'
+        for index, (symbol, occupancy, (x, y, z)) in enumerate(sites)
+    )
+    return '\n'.join(lines) + '\n'
+
+
+def assert_same_structure(content, site_tolerance=5E-4):
+    """Assert that `build_structure` gives the same structure as `CifParser.get_structures` for the given content."""
+    import numpy
+    from pymatgen.io.cif import CifParser
+
+    expected = CifParser(io.StringIO(content), site_tolerance=site_tolerance).get_structures(primitive=False)[0]
+    structure = build_structure(CifParser(io.StringIO(content), site_tolerance=site_tolerance), site_tolerance)
+
+    assert structure.lattice == expected.lattice
+    assert [site.species for site in structure] == [site.species for site in expected]
+    assert numpy.allclose(structure.frac_coords, expected.frac_coords, rtol=0, atol=1E-10)
+
+
+@pytest.mark.parametrize('chunk_size', (1, 2, 65536))
+def test_get_overlapping_sites(chunk_size):
+    """Test `get_overlapping_sites` including periodic images and chains of overlapping sites."""
+    positions = [
+        [0.0, 0.0, 0.0],
+        [0.9999, 0.0001, 0.0],  # Periodic image of the first site within the tolerance
+        [0.0, 0.0, 0.0],  # Same position as the first site, which is merged regardless of the species
+        [0.5, 0.5, 0.5],
+        [0.5, 0.5, 0.51],  # Beyond the tolerance
+        [0.5004, 0.5, 0.5],
+        [0.5008, 0.5, 0.5],  # Only overlaps with the previous site, which is not a representative so is not merged
+        [0.5004, 0.5, 0.5],  # Overlaps with the fourth and the seventh site, and is merged with the first of them
+    ]
+    groups = get_overlapping_sites(positions, 5E-4, chunk_size=chunk_size)
+    assert groups.tolist() == [0, 0, 0, 3, 4, 3, 6, 3]
+
+
+@pytest.mark.parametrize('chunk_size', (1, 65536))
+def test_get_overlapping_sites_images(chunk_size):
+    """Test `get_overlapping_sites` where a site overlaps with a preceding one through one of its images."""
+    positions = [[0.25, 0.25, 0.25], [0.75, 0.75, 0.75], [0.1, 0.2, 0.3], [0.7502, 0.7502, 0.7502]]
+    images = [[[value + 0.5 for value in position], [-value for value in position]] for position in positions]
+    assert get_overlapping_sites(positions, 5E-4).tolist() == [0, 1, 2, 1]
+    # The last site overlaps with the second site through its first image, but is assigned to the first site, which
+    # its second image overlaps with, since the second site is no longer a representative
+    groups = get_overlapping_sites(positions, 5E-4, images=images, chunk_size=chunk_size)
+    assert groups.tolist() == [0, 0, 2, 0]
+
+
+@pytest.mark.parametrize('filename', (
+    os.path.join('fixtures', 'cif', 'Si.cif'),
+    os.path.join('parsers', 'fixtures', 'cif_split_primitive', 'default', 'split', 'input_1000000.cif'),
+))
+def test_build_structure(filename):
+    """Test that `build_structure` gives the same structure as the `CifParser` of pymatgen for real CIF files."""
+    filepath = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), filename)
+
+    with open(filepath, 'r') as handle:
+        assert_same_structure(handle.read())
+
+
+@pytest.mark.parametrize('sites, space_group', (
+    # Chain of sites that are each within the tolerance of the previous one, but not all of the first one
+    ((('Fe', 0.5, (0.1, 0.1, 0.1)), ('Co', 0.3, (0.1004, 0.1, 0.1)), ('Ni', 0.2, (0.1008, 0.1, 0.1))), 'P 1'),
+    # Sites that overlap with the periodic image of a preceding site, just within and just beyond the tolerance
+    ((('Fe', 0.5, (0.99985, 0.5, 0.5)), ('Co', 0.5, (0.0003, 0.5, 0.5)), ('Ni', 1, (0.0007, 0.5, 0.5))), 'P 1'),
+    # Sites close to a center of inversion, whose images are merged just within and just beyond the tolerance
+    ((('Fe', 1, (0.0002, 0.5, 0.5)), ('Co', 1, (0.5, 0.0003, 0.5)), ('Ni', 1, (0.2, 0.2, 0.2))), 'P -1'),
+    # Sites of which the second is beyond the tolerance of the image of the first, and the third is merged with it
+    ((('Fe', 0.5, (0.2, 0.3, 0.4)), ('Fe', 0.5, (0.8007, 0.7, 0.6)), ('Fe', 0.5, (0.2004, 0.3, 0.4))), 'P -1'),
+    # Sites with the same composition, whose images are deduplicated together
+    ((('Fe', 1, (0.2, 0.3, 0.4)), ('Fe', 1, (0.8007, 0.7, 0.6)), ('Co', 1, (0.5, 0.5, 0.5))), 'P -1'),
+))
+def test_build_structure_borderline(sites, space_group):
+    """Test that `build_structure` gives the same structure as the `CifParser` of pymatgen for borderline cases."""
+    assert_same_structure(get_cif_content(sites, space_group))
+
+
+def test_build_structure_borderline_hexagonal():
+    """Test `build_structure` against the `CifParser` for sites perturbed around a special position of a hexagonal
+    space group, whose symmetry operations change the component-wise distances between the images."""
+    import numpy
+
+    random = numpy.random.default_rng(0)
+    site_tolerance = 5E-4
+
+    for _ in range(20):
+        sites = [
+            (symbol, 0.2, numpy.array([1 / 3, 2 / 3, 1 / 4]) + random.uniform(-2, 2, 3) * site_tolerance)
+            for symbol in random.choice(['Fe', 'Co'], size=4)
+        ]
+        sites.append(('O', 1, (0, 0, 0)))
+        assert_same_structure(get_cif_content(sites, 'P 63/m m c', (5, 5, 6, 90, 90, 120)), site_tolerance)
+
+
+@pytest.mark.parametrize('content', (
+    '\n'.join(['data_test', '_cell_length_a 5', '_cell_length_b 5', '_cell_length_c 5', '_cell_angle_alpha 90',
+               '_cell_angle_beta 90', '_cell_angle_gamma 90', '_atom_site_label Fe1', '_atom_site_fract_x 0',
+               '_atom_site_fract_y 0', '_atom_site_fract_z 0']),
+    get_cif_content([('Wat', 1, (0.1, 0.2, 0.3))]),
+    get_cif_content([('Fe', 1, (0.1, 0.2, 0.3))]) + 'loop_\n_atom_type_symbol\n_atom_type_oxidation_number\nFe 2\n',
+))
+def test_build_structure_not_implemented(content):
+    """Test that `build_structure` raises for unsupported features, which are parsed by the `CifParser` instead."""
+    from pymatgen.io.cif import CifParser
+
+    with pytest.raises(NotImplementedError):
+        build_structure(CifParser(io.StringIO(content)), 1E-4)
+
+    structure, exit_code = parse_structure(content, 'pymatgen', 1E-4)
+    assert exit_code is None
+    assert len(structure) == 1
+
+
+@pytest.mark.parametrize('occupancy, expected', ((0.5, None), (0.9, 'ERROR_CIF_HAS_INVALID_OCCUPANCIES')))
+def test_build_structure_disordered(occupancy, expected):
+    """Test that `build_structure` merges overlapping sites of different species, summing their occupancies."""
+    sites = [
+        ('Fe', 0.5, (0.3333, 0.6667, 0.25)),
+        ('Co', occupancy, (0.6667, 0.3333, 0.75)),  # Symmetry image of the first site, within the tolerance
+        ('O', 1, (0, 0, 0)),
+    ]
+    content = get_cif_content(sites, 'P 63/m m c', (5, 5, 6, 90, 90, 120))
+    structure, exit_code = parse_structure(content, 'pymatgen', 5E-4)
+    assert exit_code == expected
+
+    if expected is None:
+        assert_same_structure(content)
+        assert structure.composition.reduced_formula == 'FeCoO2'
+        assert sum(1 for site in structure if not site.is_ordered) == 2
+    else:
+        from pymatgen.io.cif import CifParser
+
+        with pytest.raises(ValueError):
+            build_structure(CifParser(io.StringIO(content), site_tolerance=5E-4), 5E-4)
@@ -0,0 +1,137 @@
+# -*- coding: utf-8 -*-
+"""Tests for the common utilities."""
+import time
+
+import pytest
+
+from aiida_codtools.common.utils import (
+    clear_input_node_cache, get_active_process_pks, get_input_node, iter_chunks, iterate_unprocessed_nodes, map_ordered,
+    store_nodes
+)
+
+
+def test_map_ordered():
+    """Test that `map_ordered` yields the results in the order of the iterable, regardless of completion order."""
+
+    def function(element):
+        time.sleep(0.01 * (5 - element))
+        return element ** 2
+
+    results = [(element, future.result()) for element, future in map_ordered(function, range(5), max_workers=5)]
+    assert results == [(element, element ** 2) for element in range(5)]
+
+
+def test_map_ordered_exception():
+    """Test that exceptions raised by the function are only raised when the result of the future is requested."""
+
+    def function(element):
+        if element == 1:
+            raise ValueError
+        return element
+
+    futures = list(map_ordered(function, range(3), max_workers=2))
+    assert futures[0][1].result() == 0
+    assert futures[2][1].result() == 2
+
+    with pytest.raises(ValueError):
+        futures[1][1].result()
+
+
+def test_map_ordered_bounded():
+    """Test that `map_ordered` consumes the iterable lazily, with at most `max_pending` pending elements."""
+    consumed = []
+
+    def iterable():
+        for element in range(100):
+            consumed.append(element)
+            yield element
+
+    generator = map_ordered(lambda element: element, iterable(), max_workers=2, max_pending=4)
+    next(generator)
+    generator.close()
+
+    assert len(consumed) == 4
+
+
+def test_iter_chunks():
+    """Test that `iter_chunks` yields lists of at most the chunk size with the remainder in the last chunk."""
+    assert list(iter_chunks(iter(range(5)), 2)) == [[0, 1], [2, 3], [4]]
+    assert list(iter_chunks([], 2)) == []
+
+
+def test_store_nodes(clear_database, generate_cif_data):
+    """Test that `store_nodes` stores the nodes and adds them to the group."""
+    from aiida import orm
+
+    group = orm.Group(label='test_store_nodes').store()
+    nodes = [generate_cif_data('Si'), orm.Int(1)]
+
+    assert store_nodes(nodes, group) is nodes
+    assert all(node.is_stored for node in nodes)
+    assert {node.pk for node in group.nodes} == {node.pk for node in nodes}
+
+
+def test_iterate_unprocessed_nodes(clear_database, generate_cif_data):
+    """Test that `iterate_unprocessed_nodes` skips the nodes that are input of a workchain in the workchain group."""
+    from aiida import orm
+    from aiida.common.links import LinkType
+
+    group = orm.Group(label='raw').store()
+    group_workchain = orm.Group(label='workchain').store()
+    nodes = [generate_cif_data('Si').store() for _ in range(5)]
+    group.add_nodes(nodes)
+
+    workchain = orm.WorkChainNode()
+    workchain.add_incoming(nodes[1], link_type=LinkType.INPUT_WORK, link_label='cif')
+    workchain.store()
+    group_workchain.add_nodes([workchain])
+
+    expected = [node.pk for index, node in enumerate(nodes) if index != 1]
+    assert list(iterate_unprocessed_nodes(group, group_workchain, page_size=2)) == expected
+    assert list(iterate_unprocessed_nodes(group, page_size=2)) == [node.pk for node in nodes]
+
+
+def test_get_active_process_pks(clear_database):
+    """Test that `get_active_process_pks` only returns the pks of processes that have not terminated."""
+    from aiida import orm
+    from aiida.engine import ProcessState
+
+    nodes = []
+
+    for state in (ProcessState.CREATED, ProcessState.WAITING, ProcessState.FINISHED, ProcessState.EXCEPTED):
+        node = orm.WorkChainNode()
+        node.set_process_state(state)
+        nodes.append(node.store())
+
+    assert get_active_process_pks([node.pk for node in nodes]) == {nodes[0].pk, nodes[1].pk}
+    assert get_active_process_pks([]) == set()
+
+
+def test_get_input_node(clear_database):
+    """Test that `get_input_node` returns the same node for equal values and invalidates the cache if necessary."""
+    from aiida import orm
+    from aiida.tools.graph.deletions import delete_nodes
+
+    clear_input_node_cache()
+
+    node = get_input_node(orm.Dict, {'a': 1, 'b': {'c': True}})
+    assert node.is_stored
+    assert get_input_node(orm.Dict, {'b': {'c': True}, 'a': 1}).pk == node.pk
+    assert get_input_node(orm.Dict, {'a': 2}).pk != node.pk
+
+    # A node that was stored before the cache was cleared should be found through its hash
+    clear_input_node_cache()
+    assert get_input_node(orm.Dict, {'a': 1, 'b': {'c': True}}).pk == node.pk
+
+    # A node that was not stored through `get_input_node` should also be found through its hash
+    stored = orm.Dict(dict={'c': [1, 2], 'd': 'value'}).store()
+    assert get_input_node(orm.Dict, {'d': 'value', 'c': [1, 2]}).pk == stored.pk
+
+    node = get_input_node(orm.Float, 5E-4)
+    assert get_input_node(orm.Float, 5E-4).pk == node.pk
+
+    delete_nodes([node.pk], dry_run=False)
+    assert get_input_node(orm.Float, 5E-4).pk != node.pk
+
+    with pytest.raises(NotImplementedError):
+        get_input_node(orm.List, [])
@@ -14,7 +14,8 @@ pytest_plugins = ['aiida.manage.tests.pytest_fixtures']  # pylint: disable=inval
 def run_cli_command():
     """Run a `click` command with the given options.
 
-    The call will raise if the command triggered an exception or the exit code returned is non-zero
+    The call will raise if the command triggered an exception or the exit code returned is non-zero, otherwise the
+    result is returned.
     """
 
     def _run_cli_command(command, options):
@@ -29,6 +30,8 @@ def run_cli_command():
         assert result.exception is None, ''.join(traceback.format_exception(*result.exc_info))
         assert result.exit_code == 0, result.output
 
+        return result
+
     return _run_cli_command
 
 
@@ -88,17 +91,36 @@ def fixture_calc_job():
     return _fixture_calc_job
 
 
+@pytest.fixture(scope='function')
+def generate_workchain():
+    """Fixture to construct a new `WorkChain` instance, whose steps can then be called individually for testing."""
+
+    def _generate_workchain(entry_point_name, inputs):
+        """Return an instance of the `WorkChain` of the given entry point with the given inputs."""
+        from aiida.engine.utils import instantiate_process
+        from aiida.manage.manager import get_manager
+        from aiida.plugins import WorkflowFactory
+
+        runner = get_manager().get_runner()
+        process_class = WorkflowFactory(entry_point_name)
+
+        return instantiate_process(runner, process_class, **inputs)
+
+    return _generate_workchain
+
+
 @pytest.fixture(scope='function')
 def fixture_calc_job_node():
     """Fixture to generate a mock `CalcJobNode` for testing parsers."""
 
-    def _fixture_calc_job_node(entry_point_name, computer, test_name, attributes=None):
+    def _fixture_calc_job_node(entry_point_name, computer, test_name, attributes=None, inputs=None):
         """Fixture to generate a mock `CalcJobNode` for testing parsers.
 
         :param entry_point_name: entry point name of the calculation class
         :param computer: a `Computer` instance
         :param test_name: relative path of directory with test output files in the `fixtures/{entry_point_name}` folder
         :param attributes: any optional attributes to set on the node
+        :param inputs: optional dictionary of input nodes to link to the node, where the keys are the link labels
         :return: `CalcJobNode` instance with an attached `FolderData` as the `retrieved` node
         """
         from aiida.common.links import LinkType
@@ -117,6 +139,10 @@ def fixture_calc_job_node():
         if attributes:
             node.set_attribute_many(attributes)
 
+        for link_label, input_node in (inputs or {}).items():
+            input_node.store()
+            node.add_incoming(input_node, link_type=LinkType.INPUT_CALC, link_label=link_label)
+
         node.store()
 
         basepath = os.path.dirname(os.path.abspath(__file__))
@@ -0,0 +1,76 @@
+# -*- coding: utf-8 -*-
+# pylint: disable=unused-argument
+"""Tests for the `CifBaseBatchParser`."""
+import pytest
+
+from aiida_codtools.calculations.cif_base_batch import CifBaseBatchCalculation
+
+
+@pytest.fixture
+def generate_inputs(generate_cif_data):
+    """Return a factory for the `cifs` input namespace of a `CifBaseBatchCalculation` with the given labels."""
+
+    def _generate_inputs(*labels):
+        return {f'cifs__{label}': generate_cif_data('Si') for label in labels}
+
+    return _generate_inputs
+
+
+def test_cif_base_batch(clear_database, fixture_localhost, fixture_calc_job_node, generate_parser, generate_inputs):
+    """Test a default `cif_base_batch` calculation."""
+    entry_point_calc_job = 'codtools.cif_base_batch'
+    entry_point_parser = 'codtools.cif_base_batch'
+
+    attributes = {'attach_messages': True}
+    inputs = generate_inputs('cod_1000000', 'cod_1000002')
+
+    node = fixture_calc_job_node(entry_point_calc_job, fixture_localhost, 'default', attributes, inputs)
+    parser = generate_parser(entry_point_parser)
+    results, calcfunction = parser.parse_from_node(node, store_provenance=False)
+
+    assert calcfunction.is_finished_ok
+    assert calcfunction.exit_status == 0
+    assert sorted(results['cifs'].keys()) == ['cod_1000000', 'cod_1000002']
+    assert sorted(results['messages'].keys()) == ['cod_1000000', 'cod_1000002']
+    assert len(results['messages']['cod_1000000']['warnings']) == 2
+    assert not results['messages']['cod_1000002']['warnings']
+
+
+def test_cif_base_batch_partial(
+    clear_database, fixture_localhost, fixture_calc_job_node, generate_parser, generate_inputs
+):
+    """Test that an invalid CIF for one of the inputs results in `ERROR_PARSING_CIF_DATA_PARTIAL`."""
+    entry_point_calc_job = 'codtools.cif_base_batch'
+    entry_point_parser = 'codtools.cif_base_batch'
+
+    inputs = generate_inputs('cod_1000000', 'cod_1000002')
+
+    node = fixture_calc_job_node(entry_point_calc_job, fixture_localhost, 'partial', inputs=inputs)
+    parser = generate_parser(entry_point_parser)
+    results, calcfunction = parser.parse_from_node(node, store_provenance=False)
+
+    assert calcfunction.is_finished
+    assert not calcfunction.is_finished_ok
+    exit_code = CifBaseBatchCalculation.exit_codes.ERROR_PARSING_CIF_DATA_PARTIAL  # pylint: disable=no-member
+    assert calcfunction.exit_status == exit_code.status
+    assert list(results['cifs'].keys()) == ['cod_1000000']
+
+
+def test_cif_base_batch_missing(
+    clear_database, fixture_localhost, fixture_calc_job_node, generate_parser, generate_inputs
+):
+    """Test that an input without output files, e.g. when the job was killed, results in a partial failure."""
+    entry_point_calc_job = 'codtools.cif_base_batch'
+    entry_point_parser = 'codtools.cif_base_batch'
+
+    inputs = generate_inputs('cod_1000000', 'cod_1000001', 'cod_1000002')
+
+    node = fixture_calc_job_node(entry_point_calc_job, fixture_localhost, 'default', inputs=inputs)
+    parser = generate_parser(entry_point_parser)
+    results, calcfunction = parser.parse_from_node(node, store_provenance=False)
+
+    assert calcfunction.is_finished
+    assert not calcfunction.is_finished_ok
+    exit_code = CifBaseBatchCalculation.exit_codes.ERROR_PARSING_CIF_DATA_PARTIAL  # pylint: disable=no-member
+    assert calcfunction.exit_status == exit_code.status
+    assert sorted(results['cifs'].keys()) == ['cod_1000000', 'cod_1000002']
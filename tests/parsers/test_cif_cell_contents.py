@@ -15,3 +15,26 @@ def test_cif_cell_contents_standard(clear_database, fixture_localhost, fixture_c
     assert node.exit_status in (None, 0)
     assert 'formulae' in results
     assert results['formulae']['1000017'] == 'Al2 O3'
+
+
+def test_cif_cell_contents_multiple(clear_database, fixture_localhost, fixture_calc_job_node, generate_parser):
+    """Test that every line is parsed, skipping blank lines and ignoring surrounding whitespace."""
+    node = fixture_calc_job_node('codtools.cif_cell_contents', fixture_localhost, 'multiple')
+    parser = generate_parser('codtools.cif_cell_contents')
+    results, calcfunction = parser.parse_from_node(node, store_provenance=False)
+
+    assert calcfunction.is_finished_ok
+    assert results['formulae'].get_dict() == {'1000017': 'Al2 O3', '1000018': 'C', '1000019': 'H2 O'}
+
+
+def test_cif_cell_contents_invalid(clear_database, fixture_localhost, fixture_calc_job_node, generate_parser):
+    """Test that a line that cannot be parsed returns `ERROR_PARSING_OUTPUT_DATA` without any output."""
+    from aiida_codtools.calculations.cif_cell_contents import CifCellContentsCalculation
+
+    node = fixture_calc_job_node('codtools.cif_cell_contents', fixture_localhost, 'invalid')
+    parser = generate_parser('codtools.cif_cell_contents')
+    results, calcfunction = parser.parse_from_node(node, store_provenance=False)
+
+    exit_code = CifCellContentsCalculation.exit_codes.ERROR_PARSING_OUTPUT_DATA  # pylint: disable=no-member
+    assert calcfunction.exit_status == exit_code.status
+    assert 'formulae' not in results
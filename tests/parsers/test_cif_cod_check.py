@@ -17,3 +17,4 @@ def test_cif_cod_check(clear_database, fixture_localhost, fixture_calc_job_node,
     assert node.exit_status in (None, 0)
     assert 'messages' in results
     assert '_journal_name_full is undefined.' in results['messages']['warnings']
+    assert results['messages']['warning_codes'] == {'UNDEFINED_DATA_NAME': 3, 'UNDEFINED_DATA_NAME_ALTERNATIVES': 2}
@@ -16,3 +16,30 @@ def test_cif_cod_numbers(clear_database, fixture_localhost, fixture_calc_job_nod
     assert 'numbers' in results
     assert results['numbers']['1000017']['count'] == 1
     assert results['numbers']['1000017']['formula'] == 'Al2_O3'
+
+
+def test_cif_cod_numbers_multiple(clear_database, fixture_localhost, fixture_calc_job_node, generate_parser):
+    """Test that every line is parsed, skipping blank lines and ignoring surrounding whitespace."""
+    node = fixture_calc_job_node('codtools.cif_cod_numbers', fixture_localhost, 'multiple')
+    parser = generate_parser('codtools.cif_cod_numbers')
+    results, calcfunction = parser.parse_from_node(node, store_provenance=False)
+
+    assert calcfunction.is_finished_ok
+    assert results['numbers'].get_dict() == {
+        '1000017': {'count': 1, 'formula': 'Al2_O3'},
+        '1000018': {'count': 2, 'formula': 'C'},
+        '1000019': {'count': 1, 'formula': 'H2_O'},
+    }
+
+
+def test_cif_cod_numbers_invalid(clear_database, fixture_localhost, fixture_calc_job_node, generate_parser):
+    """Test that a line that cannot be parsed returns `ERROR_PARSING_OUTPUT_DATA` without any output."""
+    from aiida_codtools.calculations.cif_cod_numbers import CifCodNumbersCalculation
+
+    node = fixture_calc_job_node('codtools.cif_cod_numbers', fixture_localhost, 'invalid')
+    parser = generate_parser('codtools.cif_cod_numbers')
+    results, calcfunction = parser.parse_from_node(node, store_provenance=False)
+
+    exit_code = CifCodNumbersCalculation.exit_codes.ERROR_PARSING_OUTPUT_DATA  # pylint: disable=no-member
+    assert calcfunction.exit_status == exit_code.status
+    assert 'numbers' not in results
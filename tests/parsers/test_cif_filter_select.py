@@ -0,0 +1,42 @@
+# -*- coding: utf-8 -*-
+# pylint: disable=unused-argument
+"""Tests for the `CifFilterSelectParser`."""
+
+
+def test_cif_filter_select(clear_database, fixture_localhost, fixture_calc_job_node, generate_parser):
+    """Test a default `cif_filter_select` calculation."""
+    entry_point_calc_job = 'codtools.cif_filter_select'
+    entry_point_parser = 'codtools.cif_filter_select'
+
+    attributes = {'attach_messages': True}
+
+    node = fixture_calc_job_node(entry_point_calc_job, fixture_localhost, 'default', attributes)
+    parser = generate_parser(entry_point_parser)
+    results, _ = parser.parse_from_node(node, store_provenance=False)
+
+    assert node.exit_status in (None, 0)
+    assert 'cif' in results
+    assert "data name '_cod_related_entry_id' is not recognised." in results['messages']['warnings']
+
+
+def test_cif_filter_select_messages(clear_database, fixture_localhost, fixture_calc_job_node, generate_parser):
+    """Test the `max_messages` and `attach_messages_file` options."""
+    import gzip
+
+    entry_point_calc_job = 'codtools.cif_filter_select'
+    entry_point_parser = 'codtools.cif_filter_select'
+
+    attributes = {'attach_messages': True, 'attach_messages_file': True, 'max_messages': 1}
+
+    node = fixture_calc_job_node(entry_point_calc_job, fixture_localhost, 'default', attributes)
+    parser = generate_parser(entry_point_parser)
+    results, _ = parser.parse_from_node(node, store_provenance=False)
+
+    assert node.exit_status in (None, 0)
+    assert len(results['messages']['warnings']) == 1
+    assert results['messages']['warning_counts'] == [1]
+    assert results['messages']['number_of_warnings'] == 2
+    assert results['messages']['number_of_errors'] == 0
+
+    with results['messages_file'].open(mode='rb') as handle:
+        assert b'is not recognised.' in gzip.decompress(handle.read())
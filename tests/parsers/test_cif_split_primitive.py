@@ -1,6 +1,7 @@
 # -*- coding: utf-8 -*-
 # pylint: disable=unused-argument
 """Tests for the `CifSplitPrimitiveParser`."""
+import threading
 
 
 def test_cif_split_primitive(clear_database, fixture_localhost, fixture_calc_job_node, generate_parser):
@@ -15,3 +16,61 @@ def test_cif_split_primitive(clear_database, fixture_localhost, fixture_calc_job
     assert node.exit_status in (None, 0)
     assert 'input_1000000' in results['cifs']
     assert 'input_1000002' in results['cifs']
+
+
+def test_cif_split_primitive_lazy(clear_database, fixture_localhost, fixture_calc_job_node, generate_parser):
+    """Test that with the `lazy` parse policy the `CifData` outputs are only parsed when their values are accessed."""
+    entry_point_calc_job = 'codtools.cif_split_primitive'
+    entry_point_parser = 'codtools.cif_split_primitive'
+
+    attributes = {'parse_policy': 'lazy'}
+
+    node = fixture_calc_job_node(entry_point_calc_job, fixture_localhost, 'default', attributes)
+    parser = generate_parser(entry_point_parser)
+    results, _ = parser.parse_from_node(node, store_provenance=False)
+
+    assert node.exit_status in (None, 0)
+    assert sorted(results['cifs'].keys()) == ['input_1000000', 'input_1000002']
+
+    cif = results['cifs']['input_1000000']
+    assert cif.get_attribute('parse_policy') == 'lazy'
+    assert cif.get_attribute('formulae') is None
+    assert cif.get_formulae()
+
+
+def test_cif_split_primitive_parser_workers(
+    clear_database, fixture_localhost, fixture_calc_job_node, generate_parser, monkeypatch
+):
+    """Test that with multiple `parser_workers` the outputs are the same and the database is only accessed and the
+    outputs only created in the parser thread."""
+    from aiida.orm import CifData
+
+    from aiida_codtools.parsers.cif_split_primitive import CifSplitPrimitiveParser
+
+    entry_point_calc_job = 'codtools.cif_split_primitive'
+    entry_point_parser = 'codtools.cif_split_primitive'
+
+    attributes = {'parser_workers': 2}
+    threads = []
+    constructor = CifData.__init__
+    retrieved = CifSplitPrimitiveParser.retrieved
+
+    def __init__(self, *args, **kwargs):
+        threads.append(threading.current_thread())
+        constructor(self, *args, **kwargs)
+
+    def get_retrieved(self):
+        threads.append(threading.current_thread())
+        return retrieved.fget(self)
+
+    monkeypatch.setattr(CifData, '__init__', __init__)
+    monkeypatch.setattr(CifSplitPrimitiveParser, 'retrieved', property(get_retrieved))
+
+    node = fixture_calc_job_node(entry_point_calc_job, fixture_localhost, 'default', attributes)
+    parser = generate_parser(entry_point_parser)
+    results, _ = parser.parse_from_node(node, store_provenance=False)
+
+    assert node.exit_status in (None, 0)
+    assert sorted(results['cifs'].keys()) == ['input_1000000', 'input_1000002']
+    assert results['cifs']['input_1000000'].get_formulae()
+    assert threads and all(thread is threading.current_thread() for thread in threads)
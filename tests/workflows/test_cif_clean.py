@@ -0,0 +1,232 @@
+# -*- coding: utf-8 -*-
+# pylint: disable=unused-argument,redefined-outer-name
+"""Tests for the `CifCleanWorkChain`."""
+import io
+from uuid import uuid4 as UUID
+
+from aiida import orm
+from aiida.common.links import LinkType
+import pytest
+
+from aiida_codtools.calculations.cif_filter_select import CifFilterSelectCalculation
+from aiida_codtools.common.structure import EXTRA_PRIMITIVE_STRUCTURE_KEY, get_primitive_structure_key
+from aiida_codtools.workflows import cif_clean
+from aiida_codtools.workflows.cif_clean import CifCleanWorkChain
+
+CONTENT = """data_test
+_chemical_formula_sum '{formula}'
+_cell_length_a 5.0
+_cell_length_b 5.0
+_cell_length_c 5.0
+_cell_angle_alpha 90
+_cell_angle_beta 90
+_cell_angle_gamma 90
+loop_
+_atom_site_label
+_atom_site_fract_x
+_atom_site_fract_y
+_atom_site_fract_z
+_atom_site_attached_hydrogens
+{sites}
+"""
+
+
+@pytest.fixture
+def generate_inputs(fixture_code):
+    """Return a factory for the inputs of a `CifCleanWorkChain` that runs the precheck on a CIF with given content."""
+
+    def _generate_inputs(formula='O2 Si', sites='Si1 0.0 0.0 0.0 0\nO1 0.5 0.5 0.5 0'):
+        content = CONTENT.format(formula=formula, sites=sites)
+        inputs = {
+            'cif': orm.CifData(file=io.BytesIO(content.encode('utf-8')), filename='test.cif').store(),
+            'precheck': orm.Bool(True),
+            'group_structure': orm.Group(str(UUID())).store(),
+        }
+
+        for namespace in ['cif_filter', 'cif_select']:
+            inputs[namespace] = {
+                'code': fixture_code(f'codtools.{namespace}').store(),
+                'metadata': {
+                    'options': {
+                        'resources': {
+                            'num_machines': 1
+                        }
+                    }
+                }
+            }
+
+        return inputs
+
+    return _generate_inputs
+
+
+@pytest.mark.parametrize('kwargs, exit_code', (
+    ({}, None),
+    ({'formula': 'O2 Xx'}, 'ERROR_CIF_HAS_UNKNOWN_SPECIES'),
+    ({'sites': 'Si1 0.0 0.0 0.0 0\nO1 0.5 ? 0.5 0'}, 'ERROR_CIF_HAS_UNDEFINED_ATOMIC_SITES'),
+    ({'sites': 'Si1 0.0 0.0 0.0 0\nO1 0.5 0.5 0.5 1'}, 'ERROR_CIF_HAS_ATTACHED_HYDROGENS'),
+    ({'formula': '', 'sites': 'Si1 0.0 0.0 0.0 .\nO1 0.5 0.5 0.5 ?'}, None),
+    ({'sites': 'Si1 0.0 0.0\n;\nText field\n;\n0\nO1 0.5 0.5 0.5\n;\nText field\n;'}, None),
+))  # yapf: disable
+def test_run_precheck(clear_database, generate_workchain, generate_inputs, kwargs, exit_code):
+    """Test that the precheck only exits for conditions that are certain, skipping empty and text field values."""
+    process = generate_workchain('codtools.cif_clean', generate_inputs(**kwargs))
+    process.setup()
+
+    assert process.should_run_precheck()
+
+    if exit_code is None:
+        assert process.run_precheck() is None
+    else:
+        assert process.run_precheck() == getattr(CifCleanWorkChain.exit_codes, exit_code)  # pylint: disable=no-member
+
+
+def test_get_primitive_structure_cached(clear_database, generate_cif_data, monkeypatch):
+    """Test that a cached structure is returned without checking, and therefore parsing, the `CifData`."""
+    cif = generate_cif_data('Si').store()
+    parse_engine, symprec, site_tolerance = orm.Str('pymatgen'), orm.Float(5E-3), orm.Float(5E-4)
+
+    structure = orm.StructureData(cell=[[1, 0, 0], [0, 1, 0], [0, 0, 1]])
+    structure.append_atom(position=(0, 0, 0), symbols='Si')
+    key = get_primitive_structure_key(cif.get_content(), parse_engine.value, symprec.value, site_tolerance.value)
+    structure.store().set_extra(EXTRA_PRIMITIVE_STRUCTURE_KEY, key)
+
+    def get_cif_exit_code(cif):
+        raise AssertionError('the `CifData` should not be checked on a cache hit')
+
+    monkeypatch.setattr(cif_clean, 'get_cif_exit_code', get_cif_exit_code)
+
+    result, exit_code = cif_clean.get_primitive_structure(cif, parse_engine, symprec, site_tolerance, use_cache=True)
+    assert exit_code is None
+    assert result.uuid == structure.uuid
+
+
+def test_deduplication_key(clear_database, generate_workchain, generate_inputs):
+    """Test that the deduplication key is stored in the extras and only depends on the content and the settings."""
+    inputs = generate_inputs()
+    process = generate_workchain('codtools.cif_clean', inputs)
+    process.setup()
+    key = process.node.get_extra(cif_clean.EXTRA_DEDUPLICATION_KEY)
+
+    # A different `CifData` node with the same content but different line endings should give the same key
+    content = inputs['cif'].get_content().replace('\n', '\r\n').encode('utf-8')
+    cif = orm.CifData(file=io.BytesIO(content), filename='other.cif').store()
+    process = generate_workchain('codtools.cif_clean', dict(inputs, cif=cif))
+    process.setup()
+    assert process.ctx.key == key
+
+    process = generate_workchain('codtools.cif_clean', dict(inputs, cif=generate_inputs(formula='O3 Si')['cif']))
+    process.setup()
+    assert process.ctx.key != key
+
+    cif_select = dict(inputs['cif_select'], parameters=orm.Dict(dict={'canonicalize-tag-names': True}))
+    process = generate_workchain('codtools.cif_clean', dict(inputs, cif_select=cif_select))
+    process.setup()
+    assert process.ctx.key != key
+
+    process = generate_workchain('codtools.cif_clean', dict(inputs, symprec=orm.Float(1E-2)))
+    process.setup()
+    assert process.ctx.key != key
+
+
+def test_reuse_previous(clear_database, generate_workchain, generate_inputs):
+    """Test that only a previous workchain that finished successfully with the same deduplication key is reused."""
+    inputs = generate_inputs()
+
+    def generate_previous(exit_status):
+        """Return the node of a finished workchain for the inputs with the given exit status and a `cif` output."""
+        process = generate_workchain('codtools.cif_clean', inputs)
+        process.setup()
+        process.node.set_exit_status(exit_status)
+
+        if exit_status == 0:
+            cif = orm.CifData(file=io.BytesIO(inputs['cif'].get_content().encode('utf-8')), filename='clean.cif')
+            cif.store().add_incoming(process.node, link_type=LinkType.RETURN, link_label='cif')
+
+        return process.node
+
+    def should_reuse_previous(**kwargs):
+        """Return the result of `should_reuse_previous` and the process for the inputs updated with the keywords."""
+        process = generate_workchain('codtools.cif_clean', dict(inputs, deduplicate=orm.Bool(True), **kwargs))
+        process.setup()
+        return process.should_reuse_previous(), process
+
+    exit_code = CifCleanWorkChain.exit_codes.ERROR_CIF_SELECT_FAILED  # pylint: disable=no-member
+    failed = generate_previous(exit_code.status)
+    reuse, _ = should_reuse_previous()
+    assert not reuse
+
+    successful = generate_previous(0)
+    reuse, process = should_reuse_previous()
+    assert reuse
+    assert process.ctx.previous.pk == successful.pk != failed.pk
+
+    process.reuse_previous()
+    assert process.ctx.cif.pk == successful.outputs.cif.pk
+
+    reuse, _ = should_reuse_previous(cif=generate_inputs(formula='O3 Si')['cif'])
+    assert not reuse
+
+    # Without the `deduplicate` input, the previous workchain should never be reused
+    process = generate_workchain('codtools.cif_clean', inputs)
+    process.setup()
+    assert not process.should_reuse_previous()
+
+
+def test_pipeline(clear_database, generate_workchain, generate_inputs, generate_cif_data, monkeypatch):
+    """Test that the pipeline runs a `CifFilterSelectCalculation` whose output is parsed into the structure."""
+    inputs = generate_inputs()
+    inputs['pipeline'] = orm.Bool(True)
+    inputs['cif_filter']['parameters'] = orm.Dict(dict={'use-c-parser': True})
+    inputs['cif_select']['parameters'] = orm.Dict(dict={'canonicalize-tag-names': True})
+    process = generate_workchain('codtools.cif_clean', inputs)
+    process.setup()
+
+    calculation = orm.CalculationNode().store()
+    submitted = []
+
+    def mock_submit(process_class, **kwargs):
+        submitted.append((process_class, kwargs))
+        return calculation
+
+    monkeypatch.setattr(process, 'submit', mock_submit)
+
+    assert process.should_run_pipeline()
+    process.run_pipeline_calculation()
+
+    process_class, kwargs = submitted[0]
+    assert process_class is CifFilterSelectCalculation
+    assert kwargs['cif'].pk == inputs['cif'].pk
+    assert kwargs['code'].pk == inputs['cif_filter']['code'].pk
+    assert kwargs['select_code'].pk == inputs['cif_select']['code'].pk
+    assert kwargs['parameters'].pk == inputs['cif_filter']['parameters'].pk
+    assert kwargs['select_parameters'].pk == inputs['cif_select']['parameters'].pk
+    assert kwargs['metadata']['call_link_label'] == 'cif_filter_select'
+    assert 'parser_name' not in kwargs['metadata']['options']
+
+    # The `cif` output of the pipeline calculation should be passed on to the structure step
+    cif = generate_cif_data('Si')
+    cif.add_incoming(calculation, link_type=LinkType.CREATE, link_label='cif')
+    cif.store()
+
+    process.ctx.cif_filter_select = calculation
+    assert process.inspect_pipeline_calculation() is None
+    assert process.ctx.cif.pk == cif.pk
+
+    assert process.should_parse_cif_structure()
+    process.parse_cif_structure()
+    assert process.ctx.structure.creator.get_incoming(link_label_filter='cif').one().node.pk == cif.pk
+
+    assert process.results() is None
+    assert process.outputs['cif'].pk == cif.pk
+    assert process.outputs['structure'].pk == process.ctx.structure.pk
+
+
+def test_pipeline_failed(clear_database, generate_workchain, generate_inputs):
+    """Test that the workchain exits if the `CifFilterSelectCalculation` did not return a `cif` output."""
+    process = generate_workchain('codtools.cif_clean', dict(generate_inputs(), pipeline=orm.Bool(True)))
+    process.setup()
+    process.ctx.cif_filter_select = orm.CalculationNode().store()
+
+    exit_code = CifCleanWorkChain.exit_codes.ERROR_CIF_FILTER_SELECT_FAILED  # pylint: disable=no-member
+    assert process.inspect_pipeline_calculation() == exit_code
@@ -0,0 +1,132 @@
+# -*- coding: utf-8 -*-
+# pylint: disable=unused-argument,redefined-outer-name
+"""Tests for the `CifCleanBulkWorkChain`."""
+from uuid import uuid4 as UUID
+
+from aiida import orm
+import pytest
+
+from aiida_codtools.workflows.cif_clean import CifCleanWorkChain
+from aiida_codtools.workflows.cif_clean_bulk import CifCleanBulkWorkChain, create_summary
+
+
+@pytest.fixture
+def generate_inputs(fixture_code):
+    """Return a factory for the inputs of a `CifCleanBulkWorkChain`."""
+
+    def _generate_inputs(**kwargs):
+        inputs = {}
+
+        for namespace in ['cif_filter', 'cif_select']:
+            inputs[namespace] = {
+                'code': fixture_code('codtools.cif_base_batch').store(),
+                'metadata': {
+                    'options': {
+                        'resources': {
+                            'num_machines': 1
+                        }
+                    }
+                }
+            }
+
+        inputs.update(kwargs)
+        return inputs
+
+    return _generate_inputs
+
+
+def test_setup_no_cifs(clear_database, generate_workchain, generate_inputs):
+    """Test that the workchain exits if neither the `cifs` nor the `group` input define any nodes."""
+    group = orm.Group(str(UUID())).store()
+    process = generate_workchain('codtools.cif_clean_bulk', generate_inputs(group=group))
+
+    assert process.setup() == CifCleanBulkWorkChain.exit_codes.ERROR_NO_CIFS  # pylint: disable=no-member
+
+
+def test_waves(clear_database, generate_workchain, generate_inputs, generate_cif_data):
+    """Test that the nodes of the `cifs` namespace and the `group` input are processed in waves in order of pk."""
+    cifs = [generate_cif_data('Si').store() for _ in range(5)]
+    group = orm.Group(str(UUID())).store()
+    group.add_nodes(cifs[1:])
+
+    inputs = generate_inputs(
+        cifs={'cif': cifs[0]}, group=group, chunk_size=orm.Int(2), max_concurrent_batches=orm.Int(2)
+    )
+    process = generate_workchain('codtools.cif_clean_bulk', inputs)
+    pks = sorted(cif.pk for cif in cifs)
+
+    assert process.setup() is None
+    assert process.should_run_wave()
+    assert process.ctx.pks == pks[:4]
+    assert all(result['exit_status'] is None for result in process.ctx.results.values())
+    assert [len(chunk) for chunk in process.get_chunks(process.ctx.pks)] == [2, 2]
+
+    process.finalize_wave()
+    assert process.ctx.last_pk == pks[3]
+    assert process.should_run_wave()
+    assert process.ctx.pks == pks[4:]
+    assert list(process.ctx.results) == [str(pks[4])]
+
+    process.finalize_wave()
+    assert not process.should_run_wave()
+    assert process.ctx.totals == {'0': 5}
+
+
+def test_finalize_wave(clear_database, generate_workchain, generate_inputs, generate_cif_data):
+    """Test that `finalize_wave` adds the cleaned nodes of the wave to the group and counts the exit statuses."""
+    cifs = [generate_cif_data('Si').store() for _ in range(3)]
+    group_cif = orm.Group(str(UUID())).store()
+    inputs = generate_inputs(cifs={f'cif_{index}': cif for index, cif in enumerate(cifs)}, group_cif=group_cif)
+    process = generate_workchain('codtools.cif_clean_bulk', inputs)
+    process.setup()
+    process.should_run_wave()
+
+    failed = CifCleanWorkChain.exit_codes.ERROR_CIF_SELECT_FAILED.status  # pylint: disable=no-member
+    cleaned = generate_cif_data('Si').store()
+    process.ctx.totals = {'0': 1, str(failed): 2}
+    process.ctx.cifs = {str(cifs[0].pk): cleaned.pk}
+    process.ctx.results[str(cifs[1].pk)]['exit_status'] = failed
+    process.ctx.results[str(cifs[2].pk)]['exit_status'] = failed
+
+    process.finalize_wave()
+
+    assert process.ctx.totals == {'0': 2, str(failed): 4}
+    assert process.ctx.last_pk == max(cif.pk for cif in cifs)
+    assert [node.pk for node in group_cif.nodes] == [cleaned.pk]
+
+
+def test_create_summary(clear_database):
+    """Test the `create_summary` calculation function."""
+    summary = create_summary(orm.Dict(dict={'0': 2, '410': 1}))
+
+    assert summary.is_stored
+    assert summary.get_dict() == {'totals': {'0': 2, '410': 1}, 'number_of_cifs': 3}
+
+
+def test_results(clear_database, generate_workchain, generate_inputs, generate_cif_data):
+    """Test that the `results` step attaches the summary created by a calculation function."""
+    cif = generate_cif_data('Si').store()
+    process = generate_workchain('codtools.cif_clean_bulk', generate_inputs(cifs={'cif': cif}))
+    process.setup()
+
+    failed = CifCleanWorkChain.exit_codes.ERROR_CIF_SELECT_FAILED.status  # pylint: disable=no-member
+    process.ctx.totals = {'0': 1, str(failed): 1}
+
+    assert process.results() is None
+
+    summary = process.outputs['summary']
+    assert summary.creator is not None
+    assert summary.get_dict()['totals'] == {'0': 1, str(failed): 1}
+
+
+def test_results_all_failed(clear_database, generate_workchain, generate_inputs, generate_cif_data):
+    """Test that the `results` step returns `ERROR_ALL_FAILED` if none of the inputs was cleaned successfully."""
+    cif = generate_cif_data('Si').store()
+    process = generate_workchain('codtools.cif_clean_bulk', generate_inputs(cifs={'cif': cif}))
+    process.setup()
+
+    failed = CifCleanWorkChain.exit_codes.ERROR_CIF_FILTER_FAILED.status  # pylint: disable=no-member
+    process.ctx.totals = {str(failed): 1}
+
+    assert process.results() == CifCleanBulkWorkChain.exit_codes.ERROR_ALL_FAILED  # pylint: disable=no-member
+    assert process.outputs['summary'].get_dict()['totals'] == {str(failed): 1}
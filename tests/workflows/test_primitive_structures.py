@@ -0,0 +1,42 @@
+# -*- coding: utf-8 -*-
+# pylint: disable=unused-argument
+"""Tests for the `PrimitiveStructuresWorkChain`."""
+from aiida import orm
+from aiida.engine import run_get_node
+
+from aiida_codtools.workflows.primitive_structures import PrimitiveStructuresWorkChain
+
+
+def test_primitive_structures(clear_database, generate_cif_data):
+    """Test that the outputs of the `primitive_structures_from_cifs` calculation function are returned."""
+    inputs = {
+        'cifs': {
+            'cif_a': generate_cif_data('Si'),
+            'cif_b': generate_cif_data('Si'),
+        },
+        'parse_engine': orm.Str('ase'),
+    }
+    results, node = run_get_node(PrimitiveStructuresWorkChain, **inputs)
+
+    assert node.is_finished_ok
+    assert sorted(results['structures'].keys()) == ['cif_a', 'cif_b']
+    assert results['exit_statuses'].get_dict() == {'cif_a': 0, 'cif_b': 0}
+    assert all(isinstance(structure, orm.StructureData) for structure in results['structures'].values())
+
+
+def test_primitive_structures_max_workers(clear_database, generate_cif_data):
+    """Test that the `max_workers` input is passed to the `primitive_structures_from_cifs` calculation function."""
+    inputs = {
+        'cifs': {
+            'cif_a': generate_cif_data('Si'),
+        },
+        'parse_engine': orm.Str('ase'),
+        'max_workers': orm.Int(1),
+    }
+    results, node = run_get_node(PrimitiveStructuresWorkChain, **inputs)
+
+    assert node.is_finished_ok
+    assert results['exit_statuses'].get_dict() == {'cif_a': 0}
+
+    calculation = node.get_outgoing(link_label_filter='primitive_structures_from_cifs').one().node
+    assert calculation.get_incoming(link_label_filter='max_workers').one().node.value == 1